@@ -0,0 +1,108 @@
+"""
+Training time, artifact size and held-out AUC of the prediction forest with the
+full embedding features against PCA and random-projection reductions, plus the
+size and error of the int8 embedding cache.
+
+Uses synthetic data shaped like the production features (structured columns
+next to 768-dim embeddings whose signal lives in a low-dimensional subspace).
+
+    python -m benchmarks.embedding_reduction [--samples 4000] [--dim 64]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+
+from chalkbio.models.compiled_forest import CompiledForest
+from chalkbio.models.embedding_cache import EmbeddingCache, embedding_key
+from chalkbio.models.embedding_reducer import EmbeddingReducer
+from chalkbio.models.registry import ModelRegistry
+from chalkbio.models.train import N_ESTIMATORS
+
+EMBEDDING_DIM = 768
+N_STRUCTURED = 15
+SIGNAL_RANK = 16
+
+
+def _synthetic_data(n_samples: int, rng: np.random.Generator):
+    latent = rng.normal(size=(n_samples, SIGNAL_RANK))
+    embeddings = latent @ rng.normal(size=(SIGNAL_RANK, EMBEDDING_DIM)) + 0.5 * rng.normal(size=(n_samples, EMBEDDING_DIM))
+    structured = rng.normal(size=(n_samples, N_STRUCTURED))
+    logits = latent[:, 0] - 0.8 * latent[:, 1] * latent[:, 2] + 0.7 * structured[:, 0]
+    y = (logits + rng.normal(size=n_samples) > 0).astype(int)
+    return structured, embeddings.astype(np.float32), y
+
+
+class _DiskOnlyRegistry(ModelRegistry):
+    """Writes real version directories but skips the ml_models bookkeeping."""
+    def _record(self, version, metrics, notes, activate):
+        pass
+
+
+def _evaluate(label, reducer, structured, embeddings, y, train_idx, test_idx, registry):
+    features = embeddings if reducer is None else reducer.transform(embeddings)
+    X = np.hstack([structured, features])
+
+    model = RandomForestClassifier(n_estimators=N_ESTIMATORS, max_depth=10, random_state=42, n_jobs=1)
+    started = time.perf_counter()
+    model.fit(X[train_idx], y[train_idx])
+    fit_seconds = time.perf_counter() - started
+    auc = roc_auc_score(y[test_idx], model.predict_proba(X[test_idx])[:, 1])
+
+    columns = [f"s_{i}" for i in range(N_STRUCTURED)] + [f"embed_{i}" for i in range(features.shape[1])]
+    version = registry.publish(
+        "bench", model, columns, {}, compiled_forest=CompiledForest.from_sklearn(model), embedding_reducer=reducer
+    )
+    size_mb = sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory, _, names in os.walk(version.artifact_path) for name in names
+    ) / 1e6
+    print(f"{label:<24} {X.shape[1]:>8} {fit_seconds:>9.2f} {size_mb:>9.2f} {auc:>7.4f}")
+
+
+def _int8_cache_report(embeddings: np.ndarray, cache_dir: str):
+    keys = [embedding_key(str(i), "bench") for i in range(len(embeddings))]
+    sizes, errors = {}, {}
+    for quantize in (False, True):
+        cache = EmbeddingCache("bench", cache_dir=cache_dir, quantize_int8=quantize)
+        cache.put_many(keys, embeddings)
+        cached = cache.get_many(keys)
+        restored = np.stack([cached[key] for key in keys])
+        sizes[quantize] = sum(os.path.getsize(os.path.join(cache.directory, name)) for name in os.listdir(cache.directory))
+        errors[quantize] = np.abs(restored - embeddings).max() / np.abs(embeddings).max()
+    print(
+        f"Embedding cache for {len(keys)} rows: float32 {sizes[False] / 1e6:.2f} MB, "
+        f"int8 {sizes[True] / 1e6:.2f} MB, int8 max relative error {errors[True]:.4f}"
+    )
+
+
+def main(n_samples: int, dim: int):
+    rng = np.random.default_rng(42)
+    structured, embeddings, y = _synthetic_data(n_samples, rng)
+
+    train_idx, test_idx = train_test_split(np.arange(len(y)), test_size=0.25, random_state=0, stratify=y)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        registry = _DiskOnlyRegistry("embedding_reduction_benchmark", root_dir=tmp_dir)
+        print(f"{'embedding features':<24} {'columns':>8} {'fit s':>9} {'size MB':>9} {'AUC':>7}")
+        _evaluate(f"full ({EMBEDDING_DIM})", None, structured, embeddings, y, train_idx, test_idx, registry)
+        for method in ("pca", "random_projection"):
+            # Fitted on the training rows only, as train.py does
+            reducer = EmbeddingReducer.fit(embeddings[train_idx], method, dim)
+            _evaluate(
+                f"{method} ({reducer.n_components})", reducer, structured, embeddings, y, train_idx, test_idx, registry
+            )
+        _int8_cache_report(embeddings, os.path.join(tmp_dir, "cache"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark embedding reduction for the prediction model.")
+    parser.add_argument("--samples", type=int, default=4000, help="Synthetic training trials.")
+    parser.add_argument("--dim", type=int, default=64, help="Reduced embedding dimension.")
+    args = parser.parse_args()
+    main(args.samples, args.dim)
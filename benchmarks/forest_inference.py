@@ -0,0 +1,55 @@
+"""
+Latency of sklearn's RandomForestClassifier.predict_proba against the flattened
+CompiledForest evaluator, on a forest shaped like the production model
+(100 trees, max_depth 10, numeric + one-hot + 768-dim embedding features).
+
+    python -m benchmarks.forest_inference [--repeats 200]
+"""
+import argparse
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from chalkbio.models.compiled_forest import CompiledForest
+from chalkbio.models.train import N_ESTIMATORS
+
+BATCH_SIZES = (1, 8, 64, 512, 2048)
+N_FEATURES = 3 + 12 + 768
+
+
+def _median_ms(fn, X, repeats: int) -> float:
+    fn(X)  # Warm up
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(X)
+        timings.append(time.perf_counter() - started)
+    return float(np.median(timings) * 1000)
+
+
+def main(repeats: int):
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(2000, N_FEATURES)).astype(np.float32)
+    y = (X[:, 0] + X[:, 20] * X[:, 40] > 0).astype(int)
+    model = RandomForestClassifier(n_estimators=N_ESTIMATORS, max_depth=10, random_state=42).fit(X, y)
+    compiled = CompiledForest.from_sklearn(model)
+
+    queries = rng.normal(size=(max(BATCH_SIZES), N_FEATURES))
+    max_error = np.abs(compiled.predict_proba(queries) - model.predict_proba(queries)).max()
+    print(f"Max abs difference from sklearn: {max_error:.2e}")
+
+    print(f"{'rows':>6} {'sklearn ms':>12} {'compiled ms':>12} {'speedup':>8}")
+    for batch_size in BATCH_SIZES:
+        batch = queries[:batch_size]
+        # Fewer repeats for the big batches, which take far longer per call
+        n = max(5, repeats // batch_size) if batch_size > 64 else repeats
+        sklearn_ms = _median_ms(model.predict_proba, batch, n)
+        compiled_ms = _median_ms(compiled.predict_proba, batch, n)
+        print(f"{batch_size:>6} {sklearn_ms:>12.3f} {compiled_ms:>12.3f} {sklearn_ms / compiled_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark single-row and batch forest inference.")
+    parser.add_argument("--repeats", type=int, default=200, help="Timed calls per batch size.")
+    main(parser.parse_args().repeats)
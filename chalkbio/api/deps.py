@@ -1,3 +1,3 @@
 # This file is intentionally left simple.
-# It re-exports get_db for easy importing in endpoint files.
-from ..core.db import get_db
\ No newline at end of file
+# It re-exports get_db (and get_async_db for the async read endpoints) for easy importing in endpoint files.
+from ..core.db import get_db, get_async_db
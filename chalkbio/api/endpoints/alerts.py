@@ -1,19 +1,41 @@
 from fastapi import APIRouter, Depends, status, Query
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 import uuid
-from ...schemas.alert import AlertResponse
+from ...schemas.alert import AlertPage
 from ...models.orm import Alert
 
-from ..deps import get_db
+from ...core.metrics import InstrumentedRoute
+from ..deps import get_async_db
+from ..pagination import encode_cursor, decode_cursor
 
-router = APIRouter(redirect_slashes=True)
+router = APIRouter(redirect_slashes=True, route_class=InstrumentedRoute)
 
-@router.get("/alerts", response_model=List[AlertResponse])
-def get_user_alerts(
+@router.get("/alerts", response_model=AlertPage)
+async def get_user_alerts(
     user_id: uuid.UUID = Query(..., description="The UUID of the user to retrieve alerts for"),
-    db: Session = Depends(get_db)
+    limit: int = Query(50, ge=1, le=200, description="Maximum number of alerts to return"),
+    cursor: str | None = Query(None, description="The next_cursor from the previous page"),
+    unread_only: bool = Query(False, description="Only return alerts that have not been clicked"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Retrieves all alerts for a given user."""
-    alerts = db.query(Alert).filter(Alert.user_id == user_id).order_by(Alert.created_at.desc()).all()
-    return alerts
\ No newline at end of file
+    """
+    Retrieves a user's alerts, newest first, one keyset page at a time.
+    Each page is a bounded range scan on (user_id, created_at, alert_id).
+    """
+    query = select(Alert).where(Alert.user_id == user_id)
+    if unread_only:
+        query = query.where(Alert.clicked_at == None)
+    if cursor:
+        created_at, alert_id = decode_cursor(cursor)
+        query = query.where(tuple_(Alert.created_at, Alert.alert_id) < tuple_(created_at, alert_id))
+
+    # Fetch one extra row to learn whether there is a next page
+    result = await db.execute(query.order_by(Alert.created_at.desc(), Alert.alert_id.desc()).limit(limit + 1))
+    alerts = result.scalars().all()
+
+    next_cursor = None
+    if len(alerts) > limit:
+        alerts = alerts[:limit]
+        next_cursor = encode_cursor(alerts[-1].created_at, alerts[-1].alert_id)
+    return AlertPage(items=alerts, next_cursor=next_cursor)
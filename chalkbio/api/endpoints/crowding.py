@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy import text
 from typing import List
-from sqlalchemy.orm import Session
-from ...schemas.crowding import CrowdingIndexResponse
-from ..deps import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from ...schemas.crowding import CrowdingIndexResponse, CrowdingHistoryPoint
+from ...core.metrics import InstrumentedRoute
+from ..deps import get_async_db
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 class CrowdingIndexRecord(CrowdingIndexResponse):
     """Subclass to allow creation from raw SQL row."""
@@ -19,8 +20,29 @@ class CrowdingIndexRecord(CrowdingIndexResponse):
         )
 
 @router.get("/crowding/leaderboard", response_model=List[CrowdingIndexResponse])
-def get_crowding_leaderboard(db: Session = Depends(get_db)):
+async def get_crowding_leaderboard(db: AsyncSession = Depends(get_async_db)):
     """Retrieves the mechanism crowding index leaderboard."""
     query = text("SELECT * FROM mechanism_crowding ORDER BY crowding_risk_score DESC, competitor_count DESC;")
-    results = db.execute(query).fetchall()
-    return [CrowdingIndexRecord.from_orm(row) for row in results]
\ No newline at end of file
+    results = (await db.execute(query)).fetchall()
+    return [CrowdingIndexRecord.from_orm(row) for row in results]
+
+@router.get("/crowding/history", response_model=List[CrowdingHistoryPoint])
+async def get_crowding_history(
+    mechanism_of_action: str | None = Query(None, description="Only return this mechanism of action"),
+    phase: str | None = Query(None, description="Only return this phase, e.g. 'Phase II'"),
+    days: int = Query(90, ge=1, le=730, description="How many days of history to return"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Retrieves daily mechanism crowding snapshots, oldest first, for charting."""
+    query = text("""
+    SELECT snapshot_date, mechanism_of_action, phase, competitor_count, crowding_risk_score
+    FROM mechanism_crowding_history
+    WHERE snapshot_date > CURRENT_DATE - :days
+      AND (CAST(:mechanism_of_action AS TEXT) IS NULL OR mechanism_of_action = :mechanism_of_action)
+      AND (CAST(:phase AS TEXT) IS NULL OR phase = :phase)
+    ORDER BY snapshot_date, mechanism_of_action, phase;
+    """)
+    results = (await db.execute(
+        query, {'days': days, 'mechanism_of_action': mechanism_of_action, 'phase': phase}
+    )).mappings().all()
+    return [CrowdingHistoryPoint(**row) for row in results]
@@ -1,10 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from pydantic import TypeAdapter, ValidationError
 from sqlalchemy.orm import Session
+from typing import AsyncIterator, List
+from datetime import datetime, timezone
+import uuid
 from ...schemas.user_event import UserEventCreate
 from ...models.orm import UserEvent
+from ...core.config import settings
+from ...core.event_buffer import event_buffer, EventBufferFull
+from ...core.trending import trending_counter
+from ...core.metrics import InstrumentedRoute
 from ..deps import get_db
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
+
+# Upper bound on the number of events accepted in one batch request
+MAX_EVENTS_PER_BATCH = 10000
+# Upper bound on a batch request's body, checked before it is read or parsed
+MAX_BATCH_BODY_BYTES = 16 * 1024 * 1024
+
+_event_list_adapter = TypeAdapter(List[UserEventCreate])
+
+
+def _to_row(event: UserEventCreate) -> dict:
+    """
+    Converts an event into a user_events row for the buffered writer. IDs and
+    timestamps are assigned on receipt, not when the buffer is flushed.
+    """
+    row = event.model_dump()
+    row['event_id'] = uuid.uuid4()
+    row['timestamp'] = datetime.now(timezone.utc)
+    return row
+
+
+def _submit_to_buffer(rows: List[dict]):
+    try:
+        event_buffer.submit(rows)
+    except EventBufferFull:
+        # Back-pressure: tell the client to retry rather than queueing without bound
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Event ingestion is busy. Please retry shortly.",
+            headers={"Retry-After": "1"}
+        )
+
 
 @router.post("/events", status_code=status.HTTP_201_CREATED)
 def log_user_event(
@@ -14,16 +53,21 @@ def log_user_event(
     """
     Receives and logs a single user event to the database.
     """
+    if settings.EVENT_BUFFER_SINGLE_EVENTS:
+        row = _to_row(event)
+        _submit_to_buffer([row])
+        return {"status": "success", "event_id": row['event_id']}
+
     # Convert the Pydantic model to a dictionary
     event_data = event.model_dump()
-    
+
     # Handle the 'metadata' name clash
     if 'metadata' in event_data:
         event_data['metadata_'] = event_data.pop('metadata')
 
     # Create a new UserEvent database object from the modified dictionary
     db_event = UserEvent(**event_data)
-    
+
     try:
         db.add(db_event)
         db.commit()
@@ -36,5 +80,77 @@ def log_user_event(
             status_code=500,
             detail="Failed to log user event."
         )
-        
-    return {"status": "success", "event_id": db_event.event_id}
\ No newline at end of file
+
+    trending_counter.record_user_events([event.model_dump()])
+    return {"status": "success", "event_id": db_event.event_id}
+
+
+def _too_large(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+
+
+async def _limited_body(request: Request) -> AsyncIterator[bytes]:
+    """
+    Streams the request body, rejecting it up front when Content-Length is over
+    MAX_BATCH_BODY_BYTES and part-way through when a body sent without one is.
+    """
+    too_large = f"Batch bodies are limited to {MAX_BATCH_BODY_BYTES} bytes."
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > MAX_BATCH_BODY_BYTES:
+        raise _too_large(too_large)
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > MAX_BATCH_BODY_BYTES:
+            raise _too_large(too_large)
+        yield chunk
+
+
+async def _read_ndjson(request: Request) -> List[UserEventCreate]:
+    """Validates NDJSON line by line as it arrives, stopping at the first line past MAX_EVENTS_PER_BATCH."""
+    events: List[UserEventCreate] = []
+
+    def add(line: bytes):
+        if not line.strip():
+            return
+        if len(events) == MAX_EVENTS_PER_BATCH:
+            raise _too_large(f"At most {MAX_EVENTS_PER_BATCH} events can be sent per request.")
+        events.append(UserEventCreate.model_validate_json(line))
+
+    pending = b""
+    async for chunk in _limited_body(request):
+        *lines, pending = (pending + chunk).split(b"\n")
+        for line in lines:
+            add(line)
+    add(pending)
+    return events
+
+
+@router.post("/events/batch", status_code=status.HTTP_202_ACCEPTED)
+async def log_user_events_batch(request: Request):
+    """
+    Receives many user events at once and queues them for bulk insertion.
+    - Body: a JSON array of events, or NDJSON (one event per line) with
+      `Content-Type: application/x-ndjson`.
+    Returns 413 for bodies over MAX_BATCH_BODY_BYTES or batches over
+    MAX_EVENTS_PER_BATCH, and 503 with Retry-After when the ingestion buffer is full.
+    """
+    content_type = request.headers.get("content-type", "")
+
+    try:
+        if "ndjson" in content_type or "jsonlines" in content_type:
+            events = await _read_ndjson(request)
+        else:
+            events = _event_list_adapter.validate_json(b"".join([chunk async for chunk in _limited_body(request)]))
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=e.errors(include_url=False, include_context=False)
+        )
+
+    if len(events) > MAX_EVENTS_PER_BATCH:
+        raise _too_large(f"At most {MAX_EVENTS_PER_BATCH} events can be sent per request.")
+
+    rows = [_to_row(event) for event in events]
+    _submit_to_buffer(rows)
+    return {"status": "accepted", "accepted": len(rows), "event_ids": [row['event_id'] for row in rows]}
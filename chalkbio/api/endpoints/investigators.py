@@ -1,19 +1,21 @@
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from ...schemas.investigator import Investigator as InvestigatorSchema
 from ...models.orm import Investigator as InvestigatorModel
-from ..deps import get_db
+from ...core.metrics import InstrumentedRoute
+from ..deps import get_async_db
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 @router.get("/investigators/top", response_model=List[InvestigatorSchema])
-def get_top_investigators(
+async def get_top_investigators(
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Retrieves a list of top investigators based on their influence score."""
-    top_investigators = db.query(InvestigatorModel).order_by(
-        InvestigatorModel.influence_score.desc()
-    ).limit(limit).all()
-    return top_investigators
\ No newline at end of file
+    result = await db.execute(
+        select(InvestigatorModel).order_by(InvestigatorModel.influence_score.desc()).limit(limit)
+    )
+    return result.scalars().all()
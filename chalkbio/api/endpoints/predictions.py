@@ -1,32 +1,66 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from ...schemas.prediction import PredictionResponse
+from ...schemas.prediction import (
+    PredictionResponse, BatchPredictionRequest, BatchPredictionItem, BatchPredictionResponse
+)
 from ...models import predict
+from ...core.metrics import InstrumentedRoute
 from ..deps import get_db
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 @router.get("/predictions/trial/{trial_id}", response_model=PredictionResponse)
-def predict_trial_success(trial_id: str, db: Session = Depends(get_db)):
+async def predict_trial_success(trial_id: str):
     """
     Predicts the Phase II->III success probability for a given trial ID.
     - **trial_id**: The unique identifier for the clinical trial (e.g., NCT123456).
+
+    Requests are micro-batched: concurrent requests are scored together on the
+    inference thread, and concurrent requests for the same trial share one result.
     """
     try:
-        # In a real app, this would fetch features for the trial_id
-        # and then pass them to the prediction function.
-        # We will simulate this for now.
-        prediction_data = predict.get_prediction_for_trial(db=db, trial_id=trial_id)
-
-        if not prediction_data:
-            raise HTTPException(
-                status_code=404,
-                detail=f"No prediction available for trial ID: {trial_id}"
-            )
-        return prediction_data
+        # Shielded: other requests may be waiting on the same Future, and this one
+        # being cancelled (e.g. a client disconnect) must not cancel it for them
+        prediction_data = await asyncio.shield(asyncio.wrap_future(predict.prediction_batcher.submit(trial_id)))
     except Exception as e:
         # In production, you would log the error `e`
         raise HTTPException(
             status_code=500,
             detail="An internal error occurred while making a prediction."
-        )
\ No newline at end of file
+        )
+
+    if not prediction_data:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No prediction available for trial ID: {trial_id}"
+        )
+    return prediction_data
+
+@router.post("/predictions/batch", response_model=BatchPredictionResponse)
+def predict_trial_success_batch(request: BatchPredictionRequest, db: Session = Depends(get_db)):
+    """
+    Predicts the Phase II->III success probability for many trials at once.
+    - **trial_ids**: The trial IDs to score. Unknown IDs get their own not-found entry.
+    """
+    try:
+        predictions = predict.get_predictions_for_trials(db=db, trial_ids=request.trial_ids)
+    except Exception as e:
+        # In production, you would log the error `e`
+        raise HTTPException(
+            status_code=500,
+            detail="An internal error occurred while making batch predictions."
+        )
+
+    results = []
+    for trial_id in dict.fromkeys(request.trial_ids):
+        prediction_data = predictions.get(trial_id)
+        if prediction_data:
+            results.append(BatchPredictionItem(trial_id=trial_id, found=True, prediction=prediction_data))
+        else:
+            results.append(BatchPredictionItem(
+                trial_id=trial_id,
+                found=False,
+                detail=f"No prediction available for trial ID: {trial_id}"
+            ))
+    return BatchPredictionResponse(results=results)
@@ -1,13 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from redis.exceptions import RedisError
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 import uuid
 
-from ...schemas.watchlist import WatchlistCreate, WatchlistResponse
+from ...schemas.watchlist import (
+    WatchlistCreate, WatchlistResponse, WatchlistPage, WatcherCountResponse, MostWatchedEntry
+)
 from ...models.orm import Watchlist
-from ..deps import get_db
+from ...core.watchers import watcher_index
+from ...core.trending import trending_counter, WINDOWS
+from ...core.metrics import InstrumentedRoute
+from ..deps import get_db, get_async_db
+from ..pagination import encode_cursor, decode_cursor
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 @router.post("/watchlists", response_model=WatchlistResponse, status_code=status.HTTP_201_CREATED)
 def add_to_watchlist(
@@ -29,20 +38,108 @@ def add_to_watchlist(
             status_code=500,
             detail=f"Failed to add item to watchlist: {e}"
         )
-        
+
+    watcher_index.add(db_item.entity_type, db_item.entity_id, db_item.user_id)
+    trending_counter.record_watch(db_item.entity_type, db_item.entity_id, added=True)
     return db_item
 
-@router.get("/watchlists", response_model=List[WatchlistResponse])
-def get_user_watchlist(
+@router.get("/watchlists", response_model=WatchlistPage)
+async def get_user_watchlist(
     user_id: uuid.UUID = Query(..., description="The UUID of the user whose watchlist to retrieve"),
-    db: Session = Depends(get_db)
+    limit: int = Query(50, ge=1, le=200, description="Maximum number of items to return"),
+    cursor: str | None = Query(None, description="The next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Retrieves all active items in a user's watchlist.
+    Retrieves the active items in a user's watchlist, most recently added first,
+    one keyset page at a time.
     """
-    watchlist_items = db.query(Watchlist).filter(
+    query = select(Watchlist).where(
         Watchlist.user_id == user_id,
         Watchlist.removed_at == None
-    ).all()
-    
-    return watchlist_items
\ No newline at end of file
+    )
+    if cursor:
+        added_at, item_id = decode_cursor(cursor)
+        query = query.where(tuple_(Watchlist.added_at, Watchlist.id) < tuple_(added_at, item_id))
+
+    # Fetch one extra row to learn whether there is a next page
+    result = await db.execute(query.order_by(Watchlist.added_at.desc(), Watchlist.id.desc()).limit(limit + 1))
+    watchlist_items = result.scalars().all()
+
+    next_cursor = None
+    if len(watchlist_items) > limit:
+        watchlist_items = watchlist_items[:limit]
+        next_cursor = encode_cursor(watchlist_items[-1].added_at, watchlist_items[-1].id)
+    return WatchlistPage(items=watchlist_items, next_cursor=next_cursor)
+
+@router.delete("/watchlists/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
+def remove_from_watchlist(
+    item_id: uuid.UUID,
+    db: Session = Depends(get_db)
+):
+    """
+    Removes an entity from a user's watchlist (the row is kept, with removed_at set).
+    """
+    db_item = db.query(Watchlist).filter(Watchlist.id == item_id, Watchlist.removed_at == None).first()
+    if not db_item:
+        raise HTTPException(status_code=404, detail=f"No active watchlist item with ID: {item_id}")
+
+    try:
+        db_item.removed_at = func.now()
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to remove item from watchlist: {e}"
+        )
+    trending_counter.record_watch(db_item.entity_type, db_item.entity_id, added=False)
+
+    # The user may still watch the entity through another active row
+    still_watching = db.query(Watchlist.id).filter(
+        Watchlist.user_id == db_item.user_id,
+        Watchlist.entity_type == db_item.entity_type,
+        Watchlist.entity_id == db_item.entity_id,
+        Watchlist.removed_at == None
+    ).first()
+    if not still_watching:
+        watcher_index.remove(db_item.entity_type, db_item.entity_id, db_item.user_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.get("/watchlists/watchers/count", response_model=WatcherCountResponse)
+def get_watcher_count(
+    entity_type: str = Query(..., description="The type of the watched entity, e.g. 'drug'"),
+    entity_id: str = Query(..., description="The ID of the watched entity")
+):
+    """
+    Returns how many users are actively watching an entity.
+    """
+    return WatcherCountResponse(
+        entity_type=entity_type,
+        entity_id=entity_id,
+        watcher_count=watcher_index.count(entity_type, entity_id)
+    )
+
+@router.get("/watchlists/most-watched", response_model=List[MostWatchedEntry])
+def get_most_watched(
+    window: str = Query("24h", description="Trending window: 24h, 7d or 30d"),
+    limit: int = Query(10, ge=1, le=100, description="Number of entities to return"),
+    entity_type: str | None = Query(None, description="Only return entities of this type, e.g. 'drug'")
+):
+    """
+    Returns the most watched entities over a sliding window, highest score first.
+    Watches count 1, unwatches -1 and views TRENDING_VIEW_WEIGHT each.
+    """
+    if window not in WINDOWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown window '{window}'. Expected one of: {', '.join(WINDOWS)}."
+        )
+    try:
+        return trending_counter.top(window, limit=limit, entity_type=entity_type)
+    except RedisError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Trending data is temporarily unavailable. Please retry shortly.",
+            headers={"Retry-After": "30"}
+        )
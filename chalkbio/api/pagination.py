@@ -0,0 +1,20 @@
+import base64
+import uuid
+from datetime import datetime
+from fastapi import HTTPException
+
+
+def encode_cursor(sort_value: datetime, row_id: uuid.UUID) -> str:
+    """Encodes a keyset position (sort timestamp, tie-breaking ID) as an opaque cursor."""
+    raw = f"{sort_value.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Decodes a cursor produced by encode_cursor, or raises a 400 if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        sort_value, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(sort_value), uuid.UUID(row_id)
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
@@ -1,5 +1,8 @@
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
 from .config import settings
+from .db import configure_worker_engine
+from .metrics import mark_process_dead
 
 # Create the central Celery application object
 celery_app = Celery(
@@ -12,6 +15,13 @@ celery_app = Celery(
         'chalkbio.jobs.weekly.retrain_model',
         'chalkbio.jobs.daily.update_crowding_index',
         'chalkbio.jobs.triggers.fda_alerts',
+        'chalkbio.jobs.daily.score_trials',
+        'chalkbio.jobs.daily.sync_trials',
+        'chalkbio.jobs.weekly.harvest_collaborations',
+        'chalkbio.jobs.weekly.update_influence_scores',
+        'chalkbio.jobs.daily.maintain_user_events',
+        # Not tasks: signal handlers that log every task run to job_run_logs
+        'chalkbio.jobs.telemetry',
     ]
 )
 
@@ -21,4 +31,18 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
-)
\ No newline at end of file
+)
+
+@worker_init.connect
+def _init_worker_main_db(**kwargs):
+    # Covers --pool=solo and threads too, where no child process is forked
+    configure_worker_engine()
+
+@worker_process_init.connect
+def _init_worker_db(**kwargs):
+    # Prefork children must not share the parent's pooled connections
+    configure_worker_engine()
+
+@worker_process_shutdown.connect
+def _shutdown_worker_metrics(pid=None, **kwargs):
+    mark_process_dead(pid)
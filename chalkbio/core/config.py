@@ -8,6 +8,17 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
 
+    # Connection pooling, for the sync and async engines in the API and in Celery workers
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 10.0  # Wait for a free connection before failing the request
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Per-statement limit in milliseconds (0 disables it), applied to API requests only. Workers run
+    # long batch jobs, so they get their own; CLI runs (training, scrapers) have no limit.
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+    CELERY_DB_STATEMENT_TIMEOUT_MS: int = 0
+
     # Other Services
     REDIS_URL: str
 
@@ -15,6 +26,65 @@ class Settings(BaseSettings):
     SLACK_WEBHOOK_URL: str
     PUBMED_API_KEY: str | None = None
 
+    # Text Embedding Model
+    EMBEDDING_MODEL_NAME: str = "pritamdeka/S-BioBert-snli-multinli-stsb"
+    # Optional local directory holding the model; takes precedence over the name
+    EMBEDDING_MODEL_PATH: str | None = None
+    # When true, never reach out to the Hugging Face Hub (offline deployments)
+    EMBEDDING_LOCAL_FILES_ONLY: bool = False
+    EMBEDDING_CACHE_DIR: str = "./models_volume/embedding_cache"
+    # Store cached embeddings as int8 with a per-row scale (4x smaller, small rounding error)
+    EMBEDDING_CACHE_INT8: bool = False
+    # Optional reduction of the embed_* features before training: "pca" or "random_projection"
+    EMBEDDING_REDUCTION: str | None = None
+    EMBEDDING_REDUCTION_DIM: int = 64
+
+    # User Event Ingestion Buffer
+    EVENT_BUFFER_MAX_BATCH_SIZE: int = 1000
+    EVENT_BUFFER_FLUSH_INTERVAL_SECONDS: float = 1.0
+    EVENT_BUFFER_MAX_PENDING: int = 50000
+    # Route POST /api/events through the buffer too (returns before the row is written)
+    EVENT_BUFFER_SINGLE_EVENTS: bool = False
+
+    # "Most Watched" trending: how much one entity view counts relative to one watch
+    TRENDING_VIEW_WEIGHT: float = 0.1
+
+    # Prediction micro-batching: single-trial requests arriving within the wait are scored together
+    PREDICTION_BATCH_MAX_SIZE: int = 32
+    PREDICTION_BATCH_MAX_WAIT_MS: float = 5.0
+
+    # Job run telemetry: a successful run is flagged (and posted to Slack) when it takes
+    # FACTOR x the median of the job's last BASELINE_RUNS successful runs, and at least MIN_MS longer
+    JOB_BASELINE_RUNS: int = 20
+    JOB_BASELINE_MIN_RUNS: int = 5
+    JOB_REGRESSION_FACTOR: float = 3.0
+    JOB_REGRESSION_MIN_MS: int = 30000
+
+    # user_events data quality: rates are shares of the day's events. A type's daily volume
+    # is compared with its last VOLUME_BASELINE_DAYS days, in standard deviations
+    DQ_BLANK_EVENT_TYPE_FAIL_RATE: float = 0.01
+    DQ_DUPLICATE_REQUEST_WARN_RATE: float = 0.001
+    DQ_DUPLICATE_REQUEST_FAIL_RATE: float = 0.01
+    DQ_VOLUME_BASELINE_DAYS: int = 28
+    DQ_VOLUME_MIN_BASELINE_DAYS: int = 7
+    DQ_VOLUME_WARN_SIGMA: float = 3.0
+    DQ_VOLUME_FAIL_SIGMA: float = 6.0
+
+    # user_events partitions: months created ahead of time, and how many months of raw
+    # events are kept (older months survive only as daily rollups)
+    USER_EVENTS_PARTITIONS_AHEAD: int = 2
+    USER_EVENTS_RETENTION_MONTHS: int = 13
+    USER_EVENTS_LATE_ARRIVAL_DAYS: int = 3  # The previous month is rolled up again on the first days of each month
+
+    # Model Registry: versioned artifacts, and how often the API checks for a newly activated model
+    MODEL_REGISTRY_DIR: str = "./models_volume/registry"
+    MODEL_WATCH_INTERVAL_SECONDS: float = 30.0
+
+    # ClinicalTrials.gov Scraper
+    CLINICALTRIALS_REQUESTS_PER_SECOND: float = 20.0  # Shared by all scraper workers in a process
+    CLINICALTRIALS_CONCURRENCY: int = 4
+    CLINICALTRIALS_CHECKPOINT_PATH: str = "./models_volume/ctgov_sync_checkpoint.json"
+
     # This is a Pydantic v2 feature to create a computed property.
     # It will automatically build the DATABASE_URL from the other fields.
     @computed_field
@@ -25,6 +95,14 @@ class Settings(BaseSettings):
             f"@{self.POSTGRES_HOST}:5432/{self.POSTGRES_DB}"
         )
 
+    @computed_field
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        return (
+            f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
+            f"@{self.POSTGRES_HOST}:5432/{self.POSTGRES_DB}"
+        )
+
     class Config:
         # This tells Pydantic to look for variables in a file named .env
         env_file = ".env"
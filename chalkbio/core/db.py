@@ -1,13 +1,81 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from .config import settings
+from .metrics import instrument_engine
 
-engine = create_engine(settings.DATABASE_URL)
+
+def _pool_options() -> dict:
+    """Pool settings shared by the sync and async engines, in the API and in Celery workers."""
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+# Applied to every new connection. No limit by default, so CLI training and scraper
+# runs are never cancelled; the API applies DB_STATEMENT_TIMEOUT_MS at startup
+# (configure_api_engine) and Celery workers CELERY_DB_STATEMENT_TIMEOUT_MS.
+_statement_timeout_ms = 0
+
+engine = create_engine(settings.DATABASE_URL, **_pool_options())
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+@event.listens_for(engine, "do_connect")
+def _set_statement_timeout(dialect, connection_record, cargs, cparams):
+    # Sent as a startup option, so it holds for the connection's whole life
+    # without an extra round trip or a SET that a rollback could undo
+    cparams["options"] = f"-c statement_timeout={_statement_timeout_ms}"
+
+
+# asyncpg engine for the read endpoints: waiting on Postgres doesn't hold a threadpool slot
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    connect_args={"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}},
+    **_pool_options(),
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Per-statement timings for /metrics
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
+
+def configure_api_engine():
+    """
+    Called from the API lifespan: applies the API statement timeout to the sync
+    engine's connections (the async engine always sends it), replacing any
+    opened before startup.
+    """
+    global _statement_timeout_ms
+    _statement_timeout_ms = settings.DB_STATEMENT_TIMEOUT_MS
+    engine.dispose()
+
+
+def configure_worker_engine():
+    """
+    Called when a Celery worker starts and in each prefork child after the fork:
+    drops connections inherited from the parent (without closing the parent's
+    sockets) and applies the worker statement timeout to the connections opened
+    from here on.
+    """
+    global _statement_timeout_ms
+    _statement_timeout_ms = settings.CELERY_DB_STATEMENT_TIMEOUT_MS
+    engine.dispose(close=False)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
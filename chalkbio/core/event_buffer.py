@@ -0,0 +1,143 @@
+import threading
+import time
+from typing import Callable, Dict, List
+
+from sqlalchemy import insert
+
+from .config import settings
+from .db import engine
+from .trending import trending_counter
+from ..models.orm import UserEvent
+
+# A batch that fails this many writes in a row is dropped, so one bad row cannot wedge the buffer
+MAX_WRITE_ATTEMPTS = 5
+
+
+class EventBufferFull(Exception):
+    """Raised when accepting more events would exceed the buffer's capacity."""
+
+
+def write_user_events(rows: List[Dict]):
+    """
+    Writes a batch of user_events rows in one transaction. SQLAlchemy turns the
+    executemany into multi-row INSERT ... VALUES statements. Entity views are
+    counted towards "Most Watched" once the rows are committed.
+    """
+    with engine.begin() as conn:
+        conn.execute(insert(UserEvent.__table__), rows)
+    trending_counter.record_user_events(rows)
+
+
+class EventBuffer:
+    """
+    In-process buffer in front of the user_events table.
+
+    Events are queued by the API and written by a background thread in batches,
+    either once `max_batch_size` events are pending or every
+    `flush_interval_seconds`, whichever comes first. When `max_pending` events
+    are already queued, submit() raises EventBufferFull so the API can push back
+    on the client instead of growing without bound.
+    """
+
+    def __init__(
+        self,
+        writer: Callable[[List[Dict]], None],
+        max_batch_size: int,
+        flush_interval_seconds: float,
+        max_pending: int,
+    ):
+        self._writer = writer
+        self.max_batch_size = max_batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_pending = max_pending
+
+        self._pending: List[Dict] = []
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()  # One writer at a time
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self._backing_off = False  # Set after a failed write; wait a full interval before retrying
+        self._failed_attempts = 0
+
+    def submit(self, rows: List[Dict]):
+        """Queues rows for writing, or raises EventBufferFull if there is no room."""
+        with self._condition:
+            if len(self._pending) + len(rows) > self.max_pending:
+                raise EventBufferFull(f"Event buffer is full ({len(self._pending)} events pending).")
+            self._pending.extend(rows)
+            if len(self._pending) >= self.max_batch_size:
+                self._condition.notify()
+
+    def pending_count(self) -> int:
+        with self._condition:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        """Writes everything currently pending. Returns the number of rows written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._condition:
+                    batch = self._pending[:self.max_batch_size]
+                    del self._pending[:len(batch)]
+                if not batch:
+                    self._backing_off = False
+                    return written
+                try:
+                    self._writer(batch)
+                except Exception as e:
+                    self._failed_attempts += 1
+                    if self._failed_attempts >= MAX_WRITE_ATTEMPTS:
+                        print(f"Dropping {len(batch)} user events after {self._failed_attempts} failed writes: {e}")
+                        self._failed_attempts = 0
+                        continue
+                    # Put the batch back at the front so events keep their order, and let
+                    # the next flush retry. Capacity checks in submit() still apply.
+                    with self._condition:
+                        self._pending[:0] = batch
+                        self._backing_off = True
+                    print(f"Error flushing {len(batch)} user events: {e}")
+                    return written
+                self._failed_attempts = 0
+                written += len(batch)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                deadline = time.monotonic() + self.flush_interval_seconds
+                while not self._stopping:
+                    if len(self._pending) >= self.max_batch_size and not self._backing_off:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def start(self):
+        """Starts the background flusher thread (idempotent)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="event-buffer-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stops the flusher thread after a final flush of pending events."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+event_buffer = EventBuffer(
+    writer=write_user_events,
+    max_batch_size=settings.EVENT_BUFFER_MAX_BATCH_SIZE,
+    flush_interval_seconds=settings.EVENT_BUFFER_FLUSH_INTERVAL_SECONDS,
+    max_pending=settings.EVENT_BUFFER_MAX_PENDING,
+)
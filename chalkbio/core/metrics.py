@@ -0,0 +1,142 @@
+import hashlib
+import os
+import re
+import time
+from functools import lru_cache
+from typing import Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from fastapi import Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from starlette.exceptions import HTTPException
+
+# Set by the process manager (see README). When present, every API and Celery
+# worker process writes its samples there and /metrics aggregates them all.
+MULTIPROC_DIR_ENV = "PROMETHEUS_MULTIPROC_DIR"
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "chalkbio_http_request_duration_seconds", "API request latency by route template.",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "chalkbio_http_requests_in_progress", "API requests currently being handled, by route template.",
+    ["method", "route"], multiprocess_mode="livesum",
+)
+DB_QUERY_SECONDS = Histogram(
+    "chalkbio_db_query_duration_seconds", "SQL statement latency by statement fingerprint.",
+    ["operation", "fingerprint"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+PREDICTION_STAGE_SECONDS = Histogram(
+    "chalkbio_prediction_stage_duration_seconds", "Time spent in each live prediction stage.",
+    ["stage"],  # encode, features, predict_proba
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+PREDICTIONS = Counter(
+    "chalkbio_predictions_total", "Predictions served, by model version and whether they were precomputed.",
+    ["model_version", "source"],  # source: stored or live
+)
+CACHE_LOOKUPS = Counter(
+    "chalkbio_cache_lookups_total", "Cache lookups on the prediction path.",
+    ["cache", "result"],  # cache: stored_prediction or embedding; result: hit or miss
+)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+# A bound parameter in any driver's style, with an optional bind cast (asyncpg renders "$1::UUID")
+_PLACEHOLDER = r"(?:%\([^)]+\)s|\$\d+|\?|%s)(?:::\w+(?:\(\d+\))?)?"
+_PLACEHOLDER_LISTS = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})*\s*\)")
+# Multi-row VALUES (executemany batches are rendered as one tuple per row)
+_REPEATED_LISTS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def statement_fingerprint(statement: str) -> Tuple[str, str]:
+    """
+    (operation, fingerprint) for a SQL statement. Literals, expanded IN lists and
+    multi-row VALUES are normalized away, so every execution of the same query
+    shares one label however many parameters or rows it was rendered with.
+    """
+    normalized = _WHITESPACE.sub(" ", statement).strip()
+    normalized = _REPEATED_LISTS.sub("(?)", _PLACEHOLDER_LISTS.sub("(?)", normalized))
+    normalized = _LITERALS.sub("?", normalized)
+    operation = normalized.split(" ", 1)[0].upper() if normalized else "UNKNOWN"
+    if operation == "WITH":
+        operation = "CTE"
+    return operation, hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started_at"].pop()
+    operation, fingerprint = statement_fingerprint(statement)
+    DB_QUERY_SECONDS.labels(operation, fingerprint).observe(time.perf_counter() - started)
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started_at"):
+        connection.info["query_started_at"].pop()
+
+
+def instrument_engine(engine):
+    """Times every statement run through a (sync) SQLAlchemy engine."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+class InstrumentedRoute(APIRoute):
+    """
+    APIRoute that records per-route latency and in-flight requests, labeled by
+    the path template so /trial/NCT1 and /trial/NCT2 share one series. Used as
+    the route_class of every API router.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        route = self.path_format
+
+        async def instrumented_handler(request: Request):
+            in_progress = HTTP_REQUESTS_IN_PROGRESS.labels(request.method, route)
+            in_progress.inc()
+            started = time.perf_counter()
+            status = 500
+            try:
+                response = await handler(request)
+                status = response.status_code
+                return response
+            except HTTPException as e:
+                status = e.status_code
+                raise
+            except RequestValidationError:
+                status = 422
+                raise
+            finally:
+                in_progress.dec()
+                HTTP_REQUEST_SECONDS.labels(request.method, route, str(status)).observe(time.perf_counter() - started)
+
+        return instrumented_handler
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """The /metrics payload: this process's samples, or every worker's in multiprocess mode."""
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int | None = None):
+    """Drops an exiting worker's live gauges from the multiprocess aggregate."""
+    if os.environ.get(MULTIPROC_DIR_ENV):
+        multiprocess.mark_process_dead(pid or os.getpid())
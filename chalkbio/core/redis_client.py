@@ -0,0 +1,11 @@
+import redis
+from .config import settings
+
+_client = None
+
+def get_redis() -> redis.Redis:
+    """Returns a process-wide Redis client (connections are pooled by redis-py)."""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _client
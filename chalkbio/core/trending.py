@@ -0,0 +1,158 @@
+import logging
+import time
+from typing import Callable, Dict, Iterable, List
+
+from redis.exceptions import RedisError
+
+from .config import settings
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Sliding windows, in hourly buckets
+WINDOWS: Dict[str, int] = {"24h": 24, "7d": 7 * 24, "30d": 30 * 24}
+BUCKET_SECONDS = 3600
+# Buckets must outlive the longest window, plus slack for a late expiry run
+BUCKET_TTL_SLACK_HOURS = 48
+BUCKET_TTL_HOURS = max(WINDOWS.values()) + BUCKET_TTL_SLACK_HOURS
+BUCKET_TTL_SECONDS = BUCKET_TTL_HOURS * BUCKET_SECONDS
+
+WATCH_WEIGHT = 1.0
+VIEW_EVENT_TYPES = frozenset({"view", "entity_view"})
+
+ALL_TYPES = "all"
+TYPES_KEY = "trending:types"
+BUCKET_KEY = "trending:bucket:{entity_type}:{hour}"
+WINDOW_KEY = "trending:window:{window}:{entity_type}"
+# Last hourly bucket already subtracted from a window
+EXPIRED_KEY = "trending:expired:{window}"
+
+
+def _current_hour() -> int:
+    return int(time.time() // BUCKET_SECONDS)
+
+
+def _member(entity_type: str, entity_id: str) -> str:
+    return f"{entity_type}|{entity_id}"
+
+
+class TrendingCounter:
+    """
+    Windowed "most watched" scores per entity, kept in Redis sorted sets.
+
+    Every watch, unwatch or view increments the entity's score in an hourly bucket
+    and in one running sorted set per window (24h, 7d, 30d), both overall and per
+    entity type. An hourly job subtracts buckets as they slide out of each window,
+    so nothing ever rescans watchlists or user_events, and a top-K query is a
+    single ZREVRANGE.
+    """
+
+    def __init__(self, redis_factory: Callable = get_redis):
+        self._redis_factory = redis_factory
+
+    def record(self, increments: Iterable[tuple], hour: int | None = None):
+        """
+        Applies (entity_type, entity_id, weight) increments to the current bucket
+        and all windows, in one pipeline. Redis failures are logged, not raised.
+        """
+        hour = _current_hour() if hour is None else hour
+        increments = [(t, i, w) for t, i, w in increments if t and i and w]
+        if not increments:
+            return
+        try:
+            pipe = self._redis_factory().pipeline(transaction=False)
+            for entity_type, entity_id, weight in increments:
+                member = _member(entity_type, entity_id)
+                bucket_key = BUCKET_KEY.format(entity_type=entity_type, hour=hour)
+                pipe.zincrby(bucket_key, weight, member)
+                pipe.expire(bucket_key, BUCKET_TTL_SECONDS)
+                pipe.sadd(TYPES_KEY, entity_type)
+                for window in WINDOWS:
+                    pipe.zincrby(WINDOW_KEY.format(window=window, entity_type=entity_type), weight, member)
+                    pipe.zincrby(WINDOW_KEY.format(window=window, entity_type=ALL_TYPES), weight, member)
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Could not update trending counters: {e}")
+
+    def record_watch(self, entity_type: str, entity_id: str, added: bool = True):
+        self.record([(entity_type, entity_id, WATCH_WEIGHT if added else -WATCH_WEIGHT)])
+
+    def record_user_events(self, rows: Iterable[dict]):
+        """Counts entity views from a batch of user_events rows."""
+        weight = settings.TRENDING_VIEW_WEIGHT
+        self.record(
+            (row.get('entity_type'), row.get('entity_id'), weight)
+            for row in rows
+            if row.get('event_type') in VIEW_EVENT_TYPES
+        )
+
+    def expire(self, now_hour: int | None = None) -> int:
+        """
+        Subtracts every bucket that has slid out of each window since the last run.
+        Returns the number of bucket/window subtractions applied.
+        """
+        now_hour = _current_hour() if now_hour is None else now_hour
+        client = self._redis_factory()
+        entity_types = client.smembers(TYPES_KEY)
+        applied = 0
+
+        for window, hours in WINDOWS.items():
+            expired_key = EXPIRED_KEY.format(window=window)
+            # Buckets at or before this hour are outside the window
+            boundary = now_hour - hours
+            last_expired = client.get(expired_key)
+            last_expired = boundary if last_expired is None else int(last_expired)
+
+            # Buckets that slid out this long ago may already have hit their TTL, and a
+            # missing bucket can't be subtracted: rebuild from the live buckets instead
+            max_lag = BUCKET_TTL_HOURS - hours
+            if boundary - last_expired > hours or boundary - last_expired >= max_lag:
+                self._rebuild_window(client, window, hours, now_hour, entity_types)
+            else:
+                for hour in range(last_expired + 1, boundary + 1):
+                    for entity_type in entity_types:
+                        bucket_key = BUCKET_KEY.format(entity_type=entity_type, hour=hour)
+                        if not client.exists(bucket_key):
+                            continue
+                        for target in (entity_type, ALL_TYPES):
+                            window_key = WINDOW_KEY.format(window=window, entity_type=target)
+                            client.zunionstore(window_key, {window_key: 1, bucket_key: -1})
+                            applied += 1
+                for target in list(entity_types) + [ALL_TYPES]:
+                    # Drop entities whose score is back to zero (allowing for float error). Only exact
+                    # zeros are safe to drop: a negative net still has later buckets to cancel out.
+                    client.zremrangebyscore(WINDOW_KEY.format(window=window, entity_type=target), -1e-9, 1e-9)
+            client.set(expired_key, boundary)
+        return applied
+
+    def _rebuild_window(self, client, window: str, hours: int, now_hour: int, entity_types: Iterable[str]):
+        all_buckets = []
+        for entity_type in entity_types:
+            buckets = [
+                BUCKET_KEY.format(entity_type=entity_type, hour=hour)
+                for hour in range(now_hour - hours + 1, now_hour + 1)
+            ]
+            buckets = [key for key in buckets if client.exists(key)]
+            all_buckets.extend(buckets)
+            window_key = WINDOW_KEY.format(window=window, entity_type=entity_type)
+            client.delete(window_key)
+            if buckets:
+                client.zunionstore(window_key, buckets)
+        all_key = WINDOW_KEY.format(window=window, entity_type=ALL_TYPES)
+        client.delete(all_key)
+        if all_buckets:
+            client.zunionstore(all_key, all_buckets)
+
+    def top(self, window: str, limit: int = 10, entity_type: str | None = None) -> List[dict]:
+        """Returns the top entities for a window, highest score first."""
+        key = WINDOW_KEY.format(window=window, entity_type=entity_type or ALL_TYPES)
+        results = []
+        for member, score in self._redis_factory().zrevrange(key, 0, limit - 1, withscores=True):
+            if score <= 0:
+                break
+            member_type, member_id = member.split("|", 1)
+            results.append({"entity_type": member_type, "entity_id": member_id, "score": score})
+        return results
+
+
+trending_counter = TrendingCounter()
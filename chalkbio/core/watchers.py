@@ -0,0 +1,128 @@
+import logging
+from typing import Callable, Set
+
+from sqlalchemy import text
+from redis.exceptions import RedisError, WatchError
+
+from .db import SessionLocal
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+WATCHERS_KEY = "watchers:{entity_type}:{entity_id}"
+# Marks a watcher set as loaded from Postgres. It expires so the set is
+# periodically rebuilt, healing any update missed while Redis was unreachable.
+READY_KEY = "watchers:ready:{entity_type}:{entity_id}"
+READY_TTL_SECONDS = 24 * 60 * 60
+# Bumped by every add and remove. A rebuild watches it, so one that read Postgres
+# before a concurrent change is aborted rather than overwriting that change.
+VERSION_KEY = "watchers:version:{entity_type}:{entity_id}"
+REBUILD_ATTEMPTS = 3
+
+# Served by the idx_watchlists_active_entity partial index
+ACTIVE_WATCHERS_QUERY = text("""
+SELECT DISTINCT user_id FROM watchlists
+WHERE entity_type = :entity_type AND entity_id = :entity_id AND removed_at IS NULL;
+""")
+
+
+class WatcherIndex:
+    """
+    Reverse index from an entity to the set of users actively watching it.
+
+    Each entity's watchers are a Redis set, kept in sync by the watchlist add and
+    remove endpoints and loaded lazily from Postgres the first time an entity is
+    looked up. If Redis is unavailable, lookups fall back to the partial index on
+    watchlists, so callers never have to handle cache failures themselves.
+    """
+
+    def __init__(self, redis_factory: Callable = get_redis, session_factory: Callable = SessionLocal):
+        self._redis_factory = redis_factory
+        self._session_factory = session_factory
+
+    @staticmethod
+    def _keys(entity_type: str, entity_id: str):
+        return (
+            WATCHERS_KEY.format(entity_type=entity_type, entity_id=entity_id),
+            READY_KEY.format(entity_type=entity_type, entity_id=entity_id),
+            VERSION_KEY.format(entity_type=entity_type, entity_id=entity_id),
+        )
+
+    def _load_from_db(self, entity_type: str, entity_id: str) -> Set[str]:
+        db = self._session_factory()
+        try:
+            rows = db.execute(ACTIVE_WATCHERS_QUERY, {'entity_type': entity_type, 'entity_id': entity_id})
+            return {str(row[0]) for row in rows}
+        finally:
+            db.close()
+
+    def _ensure_loaded(self, entity_type: str, entity_id: str) -> bool:
+        """
+        Loads the entity's watcher set from Postgres unless it is already loaded.
+        False if the rebuild kept racing concurrent adds and removes, in which
+        case the set cannot be trusted yet.
+        """
+        client = self._redis_factory()
+        watchers_key, ready_key, version_key = self._keys(entity_type, entity_id)
+        if client.exists(ready_key):
+            return True
+        for _ in range(REBUILD_ATTEMPTS):
+            with client.pipeline(transaction=True) as pipe:
+                try:
+                    pipe.watch(version_key)
+                    user_ids = self._load_from_db(entity_type, entity_id)
+                    pipe.multi()
+                    pipe.delete(watchers_key)
+                    if user_ids:
+                        pipe.sadd(watchers_key, *user_ids)
+                    pipe.set(ready_key, 1, ex=READY_TTL_SECONDS)
+                    pipe.execute()
+                    return True
+                except WatchError:
+                    continue
+        logger.info(f"Watcher index for {entity_type}:{entity_id} changed during every rebuild; querying Postgres.")
+        return False
+
+    def _update(self, entity_type: str, entity_id: str, user_id, added: bool):
+        watchers_key, _, version_key = self._keys(entity_type, entity_id)
+        try:
+            pipe = self._redis_factory().pipeline(transaction=True)
+            if added:
+                pipe.sadd(watchers_key, str(user_id))
+            else:
+                pipe.srem(watchers_key, str(user_id))
+            pipe.incr(version_key)
+            pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Could not update watcher index for {entity_type}:{entity_id}: {e}")
+
+    def add(self, entity_type: str, entity_id: str, user_id):
+        """Records that a user started watching an entity."""
+        self._update(entity_type, entity_id, user_id, added=True)
+
+    def remove(self, entity_type: str, entity_id: str, user_id):
+        """Records that a user stopped watching an entity."""
+        self._update(entity_type, entity_id, user_id, added=False)
+
+    def watchers(self, entity_type: str, entity_id: str) -> Set[str]:
+        """Returns the IDs of users actively watching the entity."""
+        try:
+            if self._ensure_loaded(entity_type, entity_id):
+                watchers_key, _, _ = self._keys(entity_type, entity_id)
+                return set(self._redis_factory().smembers(watchers_key))
+        except RedisError as e:
+            logger.warning(f"Watcher index unavailable, querying Postgres: {e}")
+        return self._load_from_db(entity_type, entity_id)
+
+    def count(self, entity_type: str, entity_id: str) -> int:
+        """Returns how many users are actively watching the entity (O(1) once loaded)."""
+        try:
+            if self._ensure_loaded(entity_type, entity_id):
+                watchers_key, _, _ = self._keys(entity_type, entity_id)
+                return self._redis_factory().scard(watchers_key)
+        except RedisError as e:
+            logger.warning(f"Watcher index unavailable, querying Postgres: {e}")
+        return len(self._load_from_db(entity_type, entity_id))
+
+
+watcher_index = WatcherIndex()
@@ -0,0 +1,246 @@
+from ...core.celery_app import celery_app
+from ...core.config import settings
+from ...core.db import SessionLocal
+from ..telemetry import report_records_processed
+from .run_validations import post_to_slack
+from datetime import date, datetime, timezone
+from typing import Iterable, List, Set, Tuple
+from sqlalchemy import text
+import re
+
+# Monthly partitions of user_events are named user_events_pYYYYMM
+PARTITION_PREFIX = "user_events_p"
+PARTITION_NAME = re.compile(r"^user_events_p(\d{4})(\d{2})$")
+
+LIST_PARTITIONS_QUERY = text("""
+SELECT child.relname
+FROM pg_inherits
+JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+WHERE pg_inherits.inhparent = 'user_events'::regclass;
+""")
+
+ROLLED_UP_PARTITIONS_QUERY = text("SELECT partition_name FROM user_event_rollup_log;")
+
+# Reads one month through the parent, so only that partition is scanned. Upserts,
+# so a month can be rolled up again to count events that were flushed into it late.
+ROLLUP_MONTH = text("""
+INSERT INTO user_event_daily_rollups (day, event_type, entity_type, entity_id, events, unique_users)
+SELECT ("timestamp" AT TIME ZONE 'UTC')::date, event_type, coalesce(entity_type, ''), coalesce(entity_id, ''),
+       count(*), count(DISTINCT user_id)
+FROM user_events
+WHERE "timestamp" >= :month_start AND "timestamp" < :month_end
+GROUP BY 1, 2, 3, 4
+ON CONFLICT (day, event_type, entity_type, entity_id) DO UPDATE SET
+    events = EXCLUDED.events,
+    unique_users = EXCLUDED.unique_users;
+""")
+
+# The default partition catches events outside every created month. Postgres refuses
+# to create a month while the default still holds rows for it, so those are moved
+# out first: detach the default, create the month, move the rows, re-attach.
+DEFAULT_PARTITION = "user_events_default"
+
+DEFAULT_HAS_MONTH_QUERY = text("""
+SELECT EXISTS (
+    SELECT 1 FROM user_events_default WHERE "timestamp" >= :month_start AND "timestamp" < :month_end
+);
+""")
+
+DETACH_DEFAULT = text("ALTER TABLE user_events DETACH PARTITION user_events_default;")
+
+MOVE_FROM_DEFAULT = text("""
+WITH moved AS (
+    DELETE FROM user_events_default
+    WHERE "timestamp" >= :month_start AND "timestamp" < :month_end
+    RETURNING *
+)
+INSERT INTO user_events SELECT * FROM moved;
+""")
+
+ATTACH_DEFAULT = text("ALTER TABLE user_events ATTACH PARTITION user_events_default DEFAULT;")
+
+# Months with stray events in the default partition
+DEFAULT_MONTHS_QUERY = text("""
+SELECT date_trunc('month', "timestamp" AT TIME ZONE 'UTC')::date AS month, count(*) AS events
+FROM user_events_default
+GROUP BY 1
+ORDER BY 1;
+""")
+
+PURGE_DEFAULT = text("""DELETE FROM user_events_default WHERE "timestamp" < :cutoff;""")
+
+LOG_ROLLUP = text("""
+INSERT INTO user_event_rollup_log (partition_name, rollup_rows)
+VALUES (:partition_name, :rollup_rows)
+ON CONFLICT (partition_name) DO UPDATE SET
+    rollup_rows = EXCLUDED.rollup_rows,
+    rolled_up_at = NOW();
+""")
+
+
+def add_months(month: date, months: int) -> date:
+    """First day of the month `months` after (or before) the month containing `month`."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+
+def partition_month(name: str) -> date | None:
+    """The month a partition holds, or None for the default partition and anything else."""
+    match = PARTITION_NAME.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def _month_bound(month: date) -> str:
+    # DDL cannot take bind parameters; months are generated here, never user input
+    return f"{month:%Y-%m-%d} 00:00:00+00"
+
+
+def _create_partition(db, month: date):
+    """Creates one month's partition, first moving any of its rows out of the default partition."""
+    bounds = {'month_start': _month_bound(month), 'month_end': _month_bound(add_months(month, 1))}
+    create = text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF user_events "
+        f"FOR VALUES FROM ('{bounds['month_start']}') TO ('{bounds['month_end']}');"
+    )
+    if db.execute(DEFAULT_HAS_MONTH_QUERY, bounds).scalar():
+        print(f"Moving {partition_name(month)} rows out of {DEFAULT_PARTITION}...")
+        # One transaction: inserts wait on the parent's lock rather than finding no default
+        db.execute(DETACH_DEFAULT)
+        db.execute(create)
+        db.execute(MOVE_FROM_DEFAULT, bounds)
+        db.execute(ATTACH_DEFAULT)
+    else:
+        db.execute(create)
+    db.commit()
+
+
+def plan_partition_maintenance(
+    existing: Iterable[date],
+    rolled_up: Iterable[date],
+    today: date,
+    months_ahead: int,
+    retention_months: int,
+    late_arrival_days: int = 0,
+) -> Tuple[List[date], List[date], List[date]]:
+    """
+    (months to create, months to roll up, months to drop). The current month and
+    the next `months_ahead` must exist; every finished month is rolled up, and the
+    previous one again during the first `late_arrival_days` days of the month;
+    raw months older than `retention_months` before the current one are dropped.
+    Months to drop are rolled up as part of the drop, so they are not listed twice.
+    """
+    existing: Set[date] = set(existing)
+    rolled_up: Set[date] = set(rolled_up)
+    current = add_months(today, 0)
+    to_create = [add_months(current, offset) for offset in range(months_ahead + 1)]
+    to_create = [month for month in to_create if month not in existing]
+    cutoff = add_months(current, -retention_months)
+    previous = add_months(current, -1) if today.day <= late_arrival_days else None
+    to_roll_up = sorted(
+        month for month in existing
+        if cutoff <= month < current and (month not in rolled_up or month == previous)
+    )
+    to_drop = sorted(month for month in existing if month < cutoff)
+    return to_create, to_roll_up, to_drop
+
+
+@celery_app.task
+def maintain_user_events_partitions():
+    """
+    Celery task to keep the monthly user_events partitions in shape: creates the
+    upcoming months (so new events never land in the default partition), rolls
+    every finished month up into user_event_daily_rollups, and drops raw months
+    past USER_EVENTS_RETENTION_MONTHS. Events flushed late into a finished month
+    are picked up by rolling the previous month up again on the first
+    USER_EVENTS_LATE_ARRIVAL_DAYS days, and by a last rollup of each month in the
+    same transaction as its DROP. Stray events
+    in the default partition are rolled up and purged on the same schedule, and
+    reported to Slack.
+
+    A month that cannot be created does not hold up rollup and retention; the
+    task still fails at the end so the run is alerted on.
+    """
+    today = datetime.now(timezone.utc).date()
+    current = add_months(today, 0)
+    cutoff = add_months(current, -settings.USER_EVENTS_RETENTION_MONTHS)
+    db = SessionLocal()
+    rollup_rows = 0
+    failed: List[str] = []
+    try:
+        existing = [partition_month(name) for name in db.execute(LIST_PARTITIONS_QUERY).scalars()]
+        rolled_up = [partition_month(name) for name in db.execute(ROLLED_UP_PARTITIONS_QUERY).scalars()]
+        to_create, to_roll_up, to_drop = plan_partition_maintenance(
+            [month for month in existing if month], [month for month in rolled_up if month], today,
+            settings.USER_EVENTS_PARTITIONS_AHEAD, settings.USER_EVENTS_RETENTION_MONTHS,
+            settings.USER_EVENTS_LATE_ARRIVAL_DAYS,
+        )
+
+        for month in to_create:
+            print(f"Creating partition {partition_name(month)}...")
+            try:
+                _create_partition(db, month)
+            except Exception as e:
+                db.rollback()
+                print(f"Could not create partition {partition_name(month)}: {e}")
+                failed.append(partition_name(month))
+
+        # One transaction per month: the rollup and its log entry commit together
+        for month in to_roll_up:
+            result = db.execute(ROLLUP_MONTH, {
+                'month_start': _month_bound(month), 'month_end': _month_bound(add_months(month, 1)),
+            })
+            db.execute(LOG_ROLLUP, {'partition_name': partition_name(month), 'rollup_rows': result.rowcount})
+            db.commit()
+            rollup_rows += result.rowcount
+            print(f"Rolled up {partition_name(month)} into {result.rowcount} daily rows.")
+
+        # Finished months in the default partition have no partition of their own to roll up.
+        # The rollup reads through the parent, and upserts, so repeating it each run is harmless.
+        stray = db.execute(DEFAULT_MONTHS_QUERY).all()
+        for month, _ in stray:
+            if month < current:
+                result = db.execute(ROLLUP_MONTH, {
+                    'month_start': _month_bound(month), 'month_end': _month_bound(add_months(month, 1)),
+                })
+                db.commit()
+                rollup_rows += result.rowcount
+        purged = db.execute(PURGE_DEFAULT, {'cutoff': _month_bound(cutoff)}).rowcount
+        db.commit()
+
+        for month in to_drop:
+            # A final rollup in the DROP's own transaction, with writes to the month
+            # blocked, so events flushed into it since its last rollup are not lost
+            print(f"Rolling up and dropping partition {partition_name(month)} (past retention)...")
+            db.execute(text(f"LOCK TABLE {partition_name(month)} IN SHARE MODE;"))
+            result = db.execute(ROLLUP_MONTH, {
+                'month_start': _month_bound(month), 'month_end': _month_bound(add_months(month, 1)),
+            })
+            db.execute(LOG_ROLLUP, {'partition_name': partition_name(month), 'rollup_rows': result.rowcount})
+            db.execute(text(f"DROP TABLE IF EXISTS {partition_name(month)};"))
+            db.commit()
+            rollup_rows += result.rowcount
+    except Exception as e:
+        db.rollback()
+        print(f"Error maintaining user_events partitions: {e}")
+        raise
+    finally:
+        db.close()
+
+    report_records_processed(rollup_rows)
+    if stray:
+        months = ", ".join(f"{month:%Y-%m} ({events})" for month, events in stray)
+        print(f"{DEFAULT_PARTITION} holds events for: {months}.")
+        post_to_slack(
+            job_name="maintain_user_events_partitions",
+            error_message=f"{DEFAULT_PARTITION} holds events for {months}; {purged} past retention were purged.",
+            status="warning",
+        )
+    if failed:
+        raise RuntimeError(f"Could not create partitions: {', '.join(failed)}")
+    return (
+        f"Created {len(to_create)}, rolled up {len(to_roll_up)} and dropped {len(to_drop)} user_events partitions."
+    )
@@ -1,38 +1,221 @@
-# --- CHANGE THIS LINE ---
 from ...core.celery_app import celery_app
+import json
+import math
+import statistics
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Tuple
 import requests
+from sqlalchemy import text
 from ...core.config import settings
+from ...core.db import SessionLocal
+
+VALIDATION_JOB_NAME = "user_events_validation"
+
+# Severity order: a run's status is its worst anomaly
+STATUSES = ("PASS", "WARN", "FAIL")
+
+# Every check is an aggregate pushed down to Postgres, so only summary rows come
+# back however many events the day holds. The day bounds are half-open UTC ranges
+# on "timestamp", which the BRIN index on user_events can prune.
+DAY_SUMMARY_QUERY = text("""
+SELECT
+    count(*) AS total,
+    count(*) FILTER (WHERE event_type IS NULL OR btrim(event_type) = '') AS blank_event_types
+FROM user_events
+WHERE "timestamp" >= :day_start AND "timestamp" < :day_end;
+""")
+
+DUPLICATE_REQUESTS_QUERY = text("""
+SELECT count(*) AS duplicated_request_ids, coalesce(sum(copies - 1), 0) AS duplicate_rows
+FROM (
+    SELECT count(*) AS copies FROM user_events
+    WHERE "timestamp" >= :day_start AND "timestamp" < :day_end AND request_id IS NOT NULL
+    GROUP BY request_id
+    HAVING count(*) > 1
+) duplicated;
+""")
+
+# Events per type per UTC day, for the day under validation and its baseline window
+DAILY_VOLUME_QUERY = text("""
+SELECT coalesce(event_type, '') AS event_type, ("timestamp" AT TIME ZONE 'UTC')::date AS day, count(*) AS events
+FROM user_events
+WHERE "timestamp" >= :baseline_start AND "timestamp" < :day_end
+GROUP BY 1, 2;
+""")
+
+SCHEMA_VERSIONS_QUERY = text("""
+SELECT schema_version, count(*) AS events
+FROM user_events
+WHERE "timestamp" >= :day_start AND "timestamp" < :day_end
+GROUP BY schema_version;
+""")
+
+# Re-validating a day replaces its earlier result
+UPSERT_QUALITY_LOG = text("""
+INSERT INTO data_quality_logs (job_name, run_date, anomalies, status)
+VALUES (:job_name, :run_date, CAST(:anomalies AS JSONB), :status)
+ON CONFLICT (job_name, run_date) DO UPDATE SET
+    anomalies = EXCLUDED.anomalies,
+    status = EXCLUDED.status,
+    created_at = NOW();
+""")
+
+
+def _rate_severity(rate: float, warn_rate: float, fail_rate: float) -> str | None:
+    if rate >= fail_rate:
+        return "FAIL"
+    if rate >= warn_rate:
+        return "WARN"
+    return None
+
+
+def evaluate_user_events(
+    day: date,
+    summary: Dict[str, int],
+    duplicates: Dict[str, int],
+    daily_volumes: Iterable[Tuple[str, date, int]],
+    schema_versions: Iterable[Tuple[str | None, int]],
+) -> Tuple[str, List[dict]]:
+    """
+    Turns the aggregate query results for one day into a status and a list of
+    anomalies (each a dict with the check name, its severity and the numbers
+    behind it). Pure, so thresholds can be tested without a database.
+    """
+    anomalies: List[dict] = []
+    total = summary["total"]
+    if total == 0:
+        anomalies.append({"check": "volume", "severity": "FAIL", "detail": "No events recorded."})
+        return "FAIL", anomalies
+
+    # Null or blank event types
+    blank = summary["blank_event_types"]
+    severity = "FAIL" if blank / total >= settings.DQ_BLANK_EVENT_TYPE_FAIL_RATE else ("WARN" if blank else None)
+    if severity:
+        anomalies.append({"check": "blank_event_type", "severity": severity, "events": blank, "rate": round(blank / total, 6)})
+
+    # The same request_id logged more than once (a retried or replayed batch)
+    duplicate_rows = duplicates["duplicate_rows"]
+    severity = _rate_severity(
+        duplicate_rows / total, settings.DQ_DUPLICATE_REQUEST_WARN_RATE, settings.DQ_DUPLICATE_REQUEST_FAIL_RATE
+    )
+    if severity:
+        anomalies.append({
+            "check": "duplicate_request_id", "severity": severity,
+            "request_ids": duplicates["duplicated_request_ids"], "duplicate_rows": duplicate_rows,
+            "rate": round(duplicate_rows / total, 6),
+        })
+
+    # Per event type volume against the same type's daily counts over the baseline window
+    baseline_days = [day - timedelta(days=offset) for offset in range(1, settings.DQ_VOLUME_BASELINE_DAYS + 1)]
+    counts: Dict[str, Dict[date, int]] = defaultdict(dict)
+    for event_type, event_day, events in daily_volumes:
+        counts[event_type][event_day] = events
+    for event_type, by_day in sorted(counts.items()):
+        observed = by_day.get(day, 0)
+        history = [by_day.get(baseline_day, 0) for baseline_day in baseline_days]
+        active_days = sum(1 for events in history if events)
+        if active_days == 0:
+            if event_type:
+                anomalies.append({"check": "unknown_event_type", "severity": "WARN", "event_type": event_type, "events": observed})
+            continue
+        if active_days < settings.DQ_VOLUME_MIN_BASELINE_DAYS:
+            continue
+        mean = statistics.fmean(history)
+        # Poisson floor so quiet, steady event types aren't flagged for tiny wobbles
+        spread = max(statistics.pstdev(history), math.sqrt(mean), 1.0)
+        sigma = (observed - mean) / spread
+        if abs(sigma) >= settings.DQ_VOLUME_FAIL_SIGMA:
+            severity = "FAIL"
+        elif abs(sigma) >= settings.DQ_VOLUME_WARN_SIGMA:
+            severity = "WARN"
+        else:
+            continue
+        anomalies.append({
+            "check": "volume", "severity": severity, "event_type": event_type,
+            "events": observed, "baseline_mean": round(mean, 1), "sigma": round(sigma, 2),
+        })
+
+    # More than one schema version in a day: a client still on an old release, or a rollout in flight
+    versions = {version or "null": events for version, events in schema_versions}
+    if len(versions) > 1 or "null" in versions:
+        anomalies.append({"check": "schema_version_mix", "severity": "WARN", "versions": versions})
+
+    status = max((anomaly["severity"] for anomaly in anomalies), key=STATUSES.index, default="PASS")
+    return status, anomalies
+
 
-# --- AND CHANGE THIS LINE ---
 @celery_app.task
-def run_user_events_validation():
+def run_user_events_validation(run_date: str | None = None):
     """
-    Celery task to run the data quality checks on the user_events table.
+    Celery task to run the data quality checks on the user_events table for one
+    UTC day (yesterday by default, or an ISO date) and record the result in
+    data_quality_logs. FAIL results are posted to Slack.
     """
-    print("Running daily user events validation job...")
-    job_failed = False
-    error_message = ""
-    status = "PASS" # Simulate a pass for now
-    
-    if job_failed:
+    # Imported here: telemetry itself imports post_to_slack from this module
+    from ..telemetry import report_records_processed
+
+    day = date.fromisoformat(run_date) if run_date else datetime.now(timezone.utc).date() - timedelta(days=1)
+    day_start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    params = {
+        'day_start': day_start,
+        'day_end': day_start + timedelta(days=1),
+        'baseline_start': day_start - timedelta(days=settings.DQ_VOLUME_BASELINE_DAYS),
+    }
+
+    print(f"Running daily user events validation job for {day}...")
+    db = SessionLocal()
+    try:
+        summary = dict(db.execute(DAY_SUMMARY_QUERY, params).mappings().one())
+        duplicates = dict(db.execute(DUPLICATE_REQUESTS_QUERY, params).mappings().one())
+        daily_volumes = db.execute(DAILY_VOLUME_QUERY, params).all()
+        schema_versions = db.execute(SCHEMA_VERSIONS_QUERY, params).all()
+
+        status, anomalies = evaluate_user_events(day, summary, duplicates, daily_volumes, schema_versions)
+        db.execute(UPSERT_QUALITY_LOG, {
+            'job_name': VALIDATION_JOB_NAME,
+            'run_date': day,
+            'anomalies': json.dumps(anomalies),
+            'status': status,
+        })
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Error validating user events: {e}")
+        raise
+    finally:
+        db.close()
+
+    report_records_processed(summary["total"])
+    if status == "FAIL":
+        failed_checks = sorted({anomaly["check"] for anomaly in anomalies if anomaly["severity"] == "FAIL"})
         post_to_slack(
-            job_name="user_events_validation",
-            error_message=error_message
+            job_name=VALIDATION_JOB_NAME,
+            error_message=f"user_events for {day} failed: {', '.join(failed_checks)}"
         )
-    print("Validation job finished.")
+    print(f"Validation job finished: {status} ({len(anomalies)} anomalies).")
     return f"Validation complete with status: {status}"
 
 
-def post_to_slack(job_name: str, error_message: str):
+# status -> (emoji, headline, detail label)
+SLACK_STATUS_FORMATS = {
+    "failed": (":x:", "Job Failed", "Error"),
+    "slow": (":warning:", "Job Slower Than Baseline", "Details"),
+    "warning": (":warning:", "Job Warning", "Details"),
+}
+
+
+def post_to_slack(job_name: str, error_message: str, status: str = "failed"):
     """Helper function to post a message to a Slack webhook."""
     if not settings.SLACK_WEBHOOK_URL or "YOUR/SLACK/URL" in settings.SLACK_WEBHOOK_URL:
         print("SLACK_WEBHOOK_URL not set. Skipping Slack notification.")
         return
 
+    emoji, headline, label = SLACK_STATUS_FORMATS[status]
     payload = {
-        "text": f":x: Job Failed: *{job_name}*\n*Error*: {error_message}"
+        "text": f"{emoji} {headline}: *{job_name}*\n*{label}*: {error_message}"
     }
     try:
         requests.post(settings.SLACK_WEBHOOK_URL, json=payload)
     except Exception as e:
-        print(f"Failed to post to Slack: {e}")
\ No newline at end of file
+        print(f"Failed to post to Slack: {e}")
@@ -0,0 +1,56 @@
+from ...core.celery_app import celery_app
+from ...core.db import SessionLocal
+from sqlalchemy import text
+from ..telemetry import report_records_processed
+
+# Trials scored per query / encode / predict_proba round trip
+SCORING_CHUNK_SIZE = 500
+
+ACTIVE_TRIALS_QUERY = text("""
+SELECT trial_id FROM trials
+WHERE status = 'Active' AND trial_id > :after
+ORDER BY trial_id
+LIMIT :limit;
+""")
+
+@celery_app.task
+def score_active_trials(chunk_size: int = SCORING_CHUNK_SIZE):
+    """
+    Scores every active trial with the current model and upserts the results
+    into trial_predictions, so the predictions endpoint can serve them directly.
+    Queued after retraining and after each crowding index refresh.
+    """
+    # Imported here so beat and non-scoring workers never load pandas/sklearn
+    from ...models import predict
+
+    # Always reload from disk: the model may have just been retrained
+    predict.load_prediction_assets()
+
+    db = SessionLocal()
+    scored = 0
+    last_trial_id = ""
+    try:
+        print(f"Scoring active trials with model {predict.current_model_version()}...")
+        while True:
+            trial_ids = db.execute(
+                ACTIVE_TRIALS_QUERY, {'after': last_trial_id, 'limit': chunk_size}
+            ).scalars().all()
+            if not trial_ids:
+                break
+            last_trial_id = trial_ids[-1]
+
+            predictions = predict.get_predictions_for_trials(db, trial_ids, use_stored=False)
+            rows = [p for p in predictions.values() if p is not None]
+            predict.store_predictions(db, rows)
+            # Commit per chunk to keep transactions short
+            db.commit()
+            scored += len(rows)
+        print(f"Stored {scored} predictions.")
+        report_records_processed(scored)
+        return f"Scored {scored} active trials."
+    except Exception as e:
+        db.rollback()
+        print(f"Error scoring active trials: {e}")
+        raise
+    finally:
+        db.close()
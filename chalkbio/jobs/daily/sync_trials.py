@@ -0,0 +1,57 @@
+from typing import Iterable, Iterator, List, Tuple
+from ...core.celery_app import celery_app
+from ...core.config import settings
+from ...scrapers.clinicaltrials_scraper import ScrapeCheckpoint, iter_trial_pages
+from ...scrapers.loader import load_in_batches
+from ..telemetry import report_records_processed
+
+# Scraped trials merged per transaction
+SYNC_BATCH_SIZE = 10000
+
+
+def _stream_pages(pages: Iterable[Tuple[int, List[dict]]], page_ends: List[Tuple[int, int]]) -> Iterator[dict]:
+    """Flattens pages into trials, noting how many trials have been streamed by the end of each page."""
+    streamed = 0
+    for page, trials in pages:
+        streamed += len(trials)
+        page_ends.append((page, streamed))
+        yield from trials
+
+
+@celery_app.task
+def sync_clinical_trials(max_pages: int | None = None, batch_size: int = SYNC_BATCH_SIZE):
+    """
+    Celery task to stream ClinicalTrials.gov into the trials and investigators
+    tables. Unchanged trials are skipped by content hash, so a re-run after a
+    failure only rewrites what actually changed.
+
+    A page is checkpointed only once every one of its trials has been committed,
+    so a failed sync resumes after the last stored page, never past unstored ones.
+    """
+    print("Starting ClinicalTrials.gov sync...")
+    checkpoint = ScrapeCheckpoint(settings.CLINICALTRIALS_CHECKPOINT_PATH)
+    page_ends: List[Tuple[int, int]] = []
+    stored = 0  # pages in page_ends whose trials are all committed
+
+    def on_commit(committed: int):
+        nonlocal stored
+        fully_stored = stored
+        while fully_stored < len(page_ends) and page_ends[fully_stored][1] <= committed:
+            fully_stored += 1
+        if fully_stored > stored:
+            stored = fully_stored
+            checkpoint.save(page_ends[stored - 1][0])
+
+    try:
+        pages = iter_trial_pages(max_pages=max_pages, checkpoint_path=checkpoint.path)
+        totals = load_in_batches(_stream_pages(pages, page_ends), batch_size=batch_size, on_commit=on_commit)
+    except Exception as e:
+        print(f"An error occurred during ClinicalTrials.gov sync: {e}")
+        raise
+    # Start over next time once the listing has been read to the end; a bounded
+    # run that stopped short of it resumes from its checkpoint instead
+    if max_pages is None or len(page_ends) < max_pages:
+        checkpoint.clear()
+    print(f"ClinicalTrials.gov sync complete: {totals}")
+    report_records_processed(sum(totals["trials"].values()))
+    return totals
@@ -1,16 +1,20 @@
-# --- CHANGE THIS LINE ---
 from ...core.celery_app import celery_app
+from ...core.trending import trending_counter
+from ..telemetry import report_records_processed
 
-# --- AND CHANGE THIS LINE ---
 @celery_app.task
 def update_most_watched():
     """
-    Celery task to refresh the 'most_watched' materialized view.
+    Celery task to slide the 'Most Watched' windows forward. Counts are kept
+    up to date as watches and views happen; this only subtracts the hourly
+    buckets that have aged out of each window, so it runs hourly.
     """
     print("Updating 'Most Watched' aggregation...")
-    # In a real application, you would get a DB session and run:
-    # with get_db() as db:
-    #     db.execute(text("REFRESH MATERIALIZED VIEW most_watched;"))
-    #     db.commit()
-    print("Aggregation updated successfully.")
-    return "Most Watched updated."
\ No newline at end of file
+    try:
+        applied = trending_counter.expire()
+    except Exception as e:
+        print(f"An error occurred during 'Most Watched' update: {e}")
+        raise
+    print(f"Aggregation updated successfully ({applied} expired buckets applied).")
+    report_records_processed(applied)
+    return "Most Watched updated."
@@ -1,20 +1,63 @@
 from ...core.celery_app import celery_app
 from ...core.db import SessionLocal
+from .score_trials import score_active_trials
 from sqlalchemy import text
 
+# mechanism_crowding is kept current by triggers on trials (see reset_db.sql).
+# A full rebuild is only a fallback: refresh the full view concurrently, then
+# reconcile the incremental table against it.
+REFRESH_FULL_VIEW = text("REFRESH MATERIALIZED VIEW CONCURRENTLY mechanism_crowding_full;")
+
+RECONCILE_UPSERT = text("""
+INSERT INTO mechanism_crowding AS mc (mechanism_of_action, phase, competitor_count, crowding_risk_score)
+SELECT mechanism_of_action, phase, competitor_count, crowding_risk_score FROM mechanism_crowding_full
+ON CONFLICT (mechanism_of_action, phase) DO UPDATE SET
+    competitor_count = EXCLUDED.competitor_count,
+    crowding_risk_score = EXCLUDED.crowding_risk_score,
+    updated_at = NOW()
+WHERE mc.competitor_count <> EXCLUDED.competitor_count;
+""")
+
+RECONCILE_DELETE = text("""
+DELETE FROM mechanism_crowding mc
+WHERE NOT EXISTS (
+    SELECT 1 FROM mechanism_crowding_full f
+    WHERE f.mechanism_of_action = mc.mechanism_of_action AND f.phase = mc.phase
+);
+""")
+
+SNAPSHOT_HISTORY = text("""
+INSERT INTO mechanism_crowding_history (snapshot_date, mechanism_of_action, phase, competitor_count, crowding_risk_score)
+SELECT CURRENT_DATE, mechanism_of_action, phase, competitor_count, crowding_risk_score FROM mechanism_crowding
+ON CONFLICT (snapshot_date, mechanism_of_action, phase) DO UPDATE SET
+    competitor_count = EXCLUDED.competitor_count,
+    crowding_risk_score = EXCLUDED.crowding_risk_score;
+""")
+
 @celery_app.task
-def refresh_crowding_index_view():
-    """Refreshes the mechanism_crowding materialized view."""
+def refresh_crowding_index_view(full_rebuild: bool = False):
+    """
+    Records today's mechanism crowding snapshot in mechanism_crowding_history.
+    With full_rebuild, first recomputes the index from scratch (the fallback if
+    the incremental counts are ever suspected to have drifted).
+    """
     db = SessionLocal()
     try:
-        print("Refreshing mechanism_crowding materialized view...")
-        db.execute(text("REFRESH MATERIALIZED VIEW mechanism_crowding;"))
+        if full_rebuild:
+            print("Rebuilding mechanism_crowding from a concurrent full refresh...")
+            db.execute(REFRESH_FULL_VIEW)
+            db.execute(RECONCILE_UPSERT)
+            db.execute(RECONCILE_DELETE)
+        print("Snapshotting mechanism crowding history...")
+        db.execute(SNAPSHOT_HISTORY)
         db.commit()
-        print("View refreshed successfully.")
+        print("Crowding index updated successfully.")
     except Exception as e:
         db.rollback()
-        print(f"Error refreshing view: {e}")
+        print(f"Error updating crowding index: {e}")
         raise
     finally:
         db.close()
-    return "Crowding Index refreshed."
\ No newline at end of file
+    # Crowding scores are a model feature, so re-score active trials
+    score_active_trials.delay()
+    return "Crowding Index refreshed."
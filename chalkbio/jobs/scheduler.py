@@ -7,16 +7,42 @@ def setup_periodic_tasks(celery_app):
             'task': 'chalkbio.jobs.daily.run_validations.run_user_events_validation',
             'schedule': crontab(hour=1, minute=0),
         },
+        'maintain-user-events-partitions': {
+            'task': 'chalkbio.jobs.daily.maintain_user_events.maintain_user_events_partitions',
+            'schedule': crontab(hour=0, minute=15), # Before validations read yesterday's partition
+        },
         'run-daily-aggregations': {
             'task': 'chalkbio.jobs.daily.update_aggregations.update_most_watched',
-            'schedule': crontab(hour=2, minute=0),
+            'schedule': crontab(minute=5), # Hourly: slides the trending windows forward
         },
         'retrain-prediction-model': {
             'task': 'chalkbio.jobs.weekly.retrain_model.retrain_trial_success_model',
             'schedule': crontab(day_of_week='sunday', hour=4, minute=0),
         },
+        'refit-prediction-model': {
+            'task': 'chalkbio.jobs.weekly.retrain_model.retrain_trial_success_model',
+            'schedule': crontab(day_of_month=1, hour=5, minute=0), # Monthly full refit from scratch
+            'kwargs': {'mode': 'full'},
+        },
+        'sync-clinical-trials': {
+            'task': 'chalkbio.jobs.daily.sync_trials.sync_clinical_trials',
+            'schedule': crontab(hour=0, minute=30), # Before validations, crowding and scoring
+        },
+        'harvest-pubmed-collaborations': {
+            'task': 'chalkbio.jobs.weekly.harvest_collaborations.harvest_pubmed_collaborations',
+            'schedule': crontab(day_of_week='saturday', hour=1, minute=0),
+        },
+        'update-influence-scores': {
+            'task': 'chalkbio.jobs.weekly.update_influence_scores.update_investigator_influence',
+            'schedule': crontab(day_of_week='saturday', hour=2, minute=0), # After the PubMed harvest
+        },
         'refresh-crowding-index': {
             'task': 'chalkbio.jobs.daily.update_crowding_index.refresh_crowding_index_view',
             'schedule': crontab(hour=3, minute=0), # Daily at 3 AM UTC
         },
+        'rebuild-crowding-index': {
+            'task': 'chalkbio.jobs.daily.update_crowding_index.refresh_crowding_index_view',
+            'schedule': crontab(day_of_week='saturday', hour=3, minute=30), # Weekly safety net
+            'kwargs': {'full_rebuild': True},
+        },
     }
\ No newline at end of file
@@ -0,0 +1,156 @@
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict
+
+from celery import states
+from celery.signals import task_postrun, task_prerun
+from sqlalchemy import text
+
+from ..core.config import settings
+from ..core.db import engine
+from .daily.run_validations import post_to_slack
+
+START_RUN = text("""
+INSERT INTO job_run_logs (job_name, start_time, alert_on_fail)
+VALUES (:job_name, :start_time, :alert_on_fail)
+RETURNING job_run_id;
+""")
+
+# Median duration of the job's most recent successful runs, excluding this one
+RECENT_BASELINE = text("""
+SELECT percentile_cont(0.5) WITHIN GROUP (ORDER BY duration_ms) AS median_ms, count(*) AS runs
+FROM (
+    SELECT duration_ms FROM job_run_logs
+    WHERE job_name = :job_name AND success_flag AND duration_ms IS NOT NULL AND job_run_id <> :job_run_id
+    ORDER BY start_time DESC
+    LIMIT :runs
+) recent;
+""")
+
+FINISH_RUN = text("""
+UPDATE job_run_logs SET
+    end_time = :end_time, duration_ms = :duration_ms, success_flag = :success_flag,
+    error_message = :error_message, records_processed = :records_processed,
+    baseline_ms = :baseline_ms, regressed = :regressed
+WHERE job_run_id = :job_run_id;
+""")
+
+# Fallback when the start row could not be written (e.g. the database was briefly unreachable)
+RECORD_RUN = text("""
+INSERT INTO job_run_logs (job_name, start_time, end_time, duration_ms, success_flag, error_message,
+                          records_processed, alert_on_fail, baseline_ms, regressed)
+VALUES (:job_name, :start_time, :end_time, :duration_ms, :success_flag, :error_message,
+        :records_processed, :alert_on_fail, :baseline_ms, :regressed);
+""")
+
+# Runs in progress in this worker process, keyed by Celery task id
+_runs: Dict[str, dict] = {}
+_current = threading.local()
+
+
+def report_records_processed(count: int):
+    """Called by a task to record how many records its run processed."""
+    _current.records_processed = int(count)
+
+
+def job_name_for(task) -> str:
+    """'chalkbio.jobs.daily.score_trials.score_active_trials' -> 'score_active_trials'"""
+    return task.name.rsplit(".", 1)[-1]
+
+
+def is_regression(duration_ms: int, baseline_ms: float | None, baseline_runs: int) -> bool:
+    """
+    A successful run is a regression when it took JOB_REGRESSION_FACTOR times the
+    job's recent median and at least JOB_REGRESSION_MIN_MS longer. Jobs with too
+    few successful runs to have a baseline are never flagged.
+    """
+    if baseline_ms is None or baseline_runs < settings.JOB_BASELINE_MIN_RUNS:
+        return False
+    return (
+        duration_ms > baseline_ms * settings.JOB_REGRESSION_FACTOR
+        and duration_ms - baseline_ms >= settings.JOB_REGRESSION_MIN_MS
+    )
+
+
+def _error_message(state: str, retval) -> str | None:
+    if state == states.SUCCESS:
+        return None
+    # Failed runs pass Celery's ExceptionInfo rather than the exception itself
+    exception = getattr(retval, "exception", retval)
+    if isinstance(exception, BaseException):
+        return f"{type(exception).__name__}: {exception}"
+    return state
+
+
+@task_prerun.connect
+def _start_run(task_id=None, task=None, **kwargs):
+    _current.records_processed = None
+    run = {
+        "job_name": job_name_for(task),
+        "start_time": datetime.now(timezone.utc),
+        "started": time.perf_counter(),
+        "alert_on_fail": getattr(task, "alert_on_fail", True),
+        "job_run_id": None,
+    }
+    _runs[task_id] = run
+    try:
+        with engine.begin() as conn:
+            run["job_run_id"] = conn.execute(START_RUN, {
+                'job_name': run["job_name"], 'start_time': run["start_time"], 'alert_on_fail': run["alert_on_fail"],
+            }).scalar_one()
+    except Exception as e:
+        # Telemetry must never stop the job itself from running
+        print(f"Could not record start of {run['job_name']}: {e}")
+
+
+@task_postrun.connect
+def _finish_run(task_id=None, task=None, retval=None, state=None, **kwargs):
+    run = _runs.pop(task_id, None)
+    if run is None:
+        return
+    duration_ms = int((time.perf_counter() - run["started"]) * 1000)
+    success = state == states.SUCCESS
+    error_message = _error_message(state, retval)
+    params = {
+        'job_name': run["job_name"],
+        'start_time': run["start_time"],
+        'end_time': datetime.now(timezone.utc),
+        'duration_ms': duration_ms,
+        'success_flag': success,
+        'error_message': error_message,
+        'records_processed': getattr(_current, "records_processed", None),
+        'alert_on_fail': run["alert_on_fail"],
+        'job_run_id': run["job_run_id"],
+        'baseline_ms': None,
+        'regressed': False,
+    }
+    _current.records_processed = None
+
+    try:
+        with engine.begin() as conn:
+            if success:
+                baseline = conn.execute(RECENT_BASELINE, {
+                    'job_name': run["job_name"], 'job_run_id': run["job_run_id"] or 0,
+                    'runs': settings.JOB_BASELINE_RUNS,
+                }).one()
+                if baseline.median_ms is not None:
+                    params['baseline_ms'] = int(baseline.median_ms)
+                params['regressed'] = is_regression(duration_ms, baseline.median_ms, baseline.runs)
+            conn.execute(FINISH_RUN if run["job_run_id"] is not None else RECORD_RUN, params)
+    except Exception as e:
+        print(f"Could not record run of {run['job_name']}: {e}")
+
+    print(f"Job {run['job_name']} finished in {duration_ms} ms (state: {state}).")
+    # A retry is not a failure yet: the final attempt decides
+    if state == states.FAILURE and run["alert_on_fail"]:
+        post_to_slack(job_name=run["job_name"], error_message=error_message)
+    elif params['regressed']:
+        post_to_slack(
+            job_name=run["job_name"],
+            error_message=(
+                f"Took {duration_ms / 1000:.1f}s, {duration_ms / max(params['baseline_ms'], 1):.1f}x "
+                f"its recent median of {params['baseline_ms'] / 1000:.1f}s."
+            ),
+            status="slow",
+        )
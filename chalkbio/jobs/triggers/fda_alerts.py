@@ -1,47 +1,83 @@
 from ...core.celery_app import celery_app
 from ...core.db import SessionLocal
-from ...models.orm import Watchlist, Alert
+from ..telemetry import report_records_processed
+from sqlalchemy import text
+import hashlib
 import uuid
 
+# The user_id space is split into this many ranges; each is inserted and committed
+# separately so no single transaction has to cover every watcher of a popular drug.
+ALERT_FANOUT_CHUNKS = 16
+
+FANOUT_SQL = """
+INSERT INTO alerts (user_id, entity_type, entity_id, alert_type, title, message, event_key)
+SELECT DISTINCT w.user_id, 'drug', :drug_id, 'fda_action', :title, :message, :event_key
+FROM watchlists w
+WHERE w.entity_id = :drug_id
+  AND w.entity_type = 'drug'
+  AND w.removed_at IS NULL
+  AND w.user_id >= :lower
+  {upper_clause}
+ON CONFLICT (user_id, alert_type, entity_id, event_key) DO NOTHING;
+"""
+FANOUT_CHUNK_QUERY = text(FANOUT_SQL.format(upper_clause="AND w.user_id < :upper"))
+FANOUT_LAST_CHUNK_QUERY = text(FANOUT_SQL.format(upper_clause=""))
+
+
+def fda_event_key(drug_id: str, approval_message: str) -> str:
+    """Stable identifier for one FDA event, used when the caller does not supply one."""
+    return hashlib.sha256(f"{drug_id}\0{approval_message}".encode("utf-8")).hexdigest()
+
+
+def user_id_ranges(chunks: int):
+    """Splits the UUID space into `chunks` contiguous [lower, upper) ranges; the last upper is None."""
+    bounds = [uuid.UUID(int=(i * (1 << 128)) // chunks) for i in range(chunks)]
+    return list(zip(bounds, bounds[1:] + [None]))
+
+
 @celery_app.task
-def trigger_fda_alert(drug_id: str, approval_message: str):
+def trigger_fda_alert(drug_id: str, approval_message: str, event_id: str | None = None):
     """
-    Finds users watching a drug and creates an alert for them.
+    Creates an alert for every user watching a drug.
+
+    The fan-out runs server-side as INSERT ... SELECT from watchlists, one user_id
+    range at a time. Alerts are unique per (user, alert type, drug, event), so a
+    retried task never creates duplicates. Returns how many alerts were created.
+
+    Always runs against watchlists, never the cached watcher index: an add
+    dropped while Redis was unreachable stays missing there until the set is
+    rebuilt, and would silently cost that user the alert. Each chunk is an index
+    range scan on idx_watchlists_active_entity, cheap when nobody is watching.
     """
+    event_key = event_id or fda_event_key(drug_id, approval_message)
+    params = {
+        'drug_id': drug_id,
+        'title': f'FDA Update for {drug_id}',
+        'message': approval_message,
+        'event_key': event_key,
+    }
+
     db = SessionLocal()
+    created = 0
     try:
         print(f"Triggering FDA alert for drug: {drug_id}")
-        # Find all user_ids watching this drug
-        watchers = db.query(Watchlist.user_id).filter(
-            Watchlist.entity_id == drug_id,
-            Watchlist.entity_type == 'drug',
-            Watchlist.removed_at == None
-        ).distinct().all()
-
-        user_ids = [w[0] for w in watchers]
-        if not user_ids:
-            print("No users watching this drug.")
-            return "No alerts created."
+        for lower, upper in user_id_ranges(ALERT_FANOUT_CHUNKS):
+            if upper is None:
+                result = db.execute(FANOUT_LAST_CHUNK_QUERY, {**params, 'lower': lower})
+            else:
+                result = db.execute(FANOUT_CHUNK_QUERY, {**params, 'lower': lower, 'upper': upper})
+            db.commit()
+            created += result.rowcount
 
-        # Create a new alert object for each user
-        new_alerts = [
-            Alert(
-                user_id=user_id,
-                entity_id=drug_id,
-                entity_type='drug',
-                alert_type='fda_action',
-                title=f'FDA Update for {drug_id}',
-                message=approval_message
-            ) for user_id in user_ids
-        ]
-        
-        db.add_all(new_alerts)
-        db.commit()
-        print(f"Created {len(new_alerts)} alerts.")
-        return f"Created {len(new_alerts)} alerts."
+        if not created:
+            print("No new alerts to create.")
+            return "No alerts created."
+        print(f"Created {created} alerts.")
+        report_records_processed(created)
+        return f"Created {created} alerts."
     except Exception as e:
         db.rollback()
         print(f"Error triggering alert: {e}")
         raise
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
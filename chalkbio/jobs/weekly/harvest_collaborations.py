@@ -0,0 +1,30 @@
+from ...core.celery_app import celery_app
+from ...core.db import SessionLocal
+from ...scrapers.pubmed_scraper import harvest_collaborations
+from ..telemetry import report_records_processed
+
+@celery_app.task
+def harvest_pubmed_collaborations():
+    """
+    Celery task to refresh investigator_collaborations from PubMed co-authorships.
+    Articles already counted for a pair are skipped, so re-runs only add new links.
+    Each batch of investigators is committed as it completes; the task fails at
+    the end if any batch could not be harvested, keeping the ones that were.
+    """
+    print("Starting PubMed collaboration harvest...")
+    db = SessionLocal()
+    try:
+        totals = harvest_collaborations(db)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"An error occurred during PubMed collaboration harvest: {e}")
+        raise
+    finally:
+        db.close()
+
+    print(f"PubMed collaboration harvest complete: {totals}")
+    report_records_processed(totals["new_links"])
+    if totals["failed_batches"]:
+        raise RuntimeError(f"{totals['failed_batches']} PubMed batches could not be harvested")
+    return totals
@@ -1,19 +1,25 @@
 # --- CHANGE THIS LINE ---
 from ...core.celery_app import celery_app
-from ...models import train
+from ..daily.score_trials import score_active_trials
 
 # --- AND CHANGE THIS LINE ---
 @celery_app.task
-def retrain_trial_success_model():
+def retrain_trial_success_model(mode: str = "incremental"):
     """
-    Celery task to trigger the weekly model retraining pipeline.
+    Celery task to trigger the weekly model retraining pipeline. Weekly runs are
+    incremental (only new and changed trials); a monthly run passes mode="full".
     """
-    print("Starting weekly model retraining job...")
+    # Imported here so beat and non-training workers never load sklearn/pandas
+    from ...models import train
+
+    print(f"Starting weekly model retraining job ({mode})...")
     try:
-        train.run_training_pipeline()
+        train.run_training_pipeline(mode=mode)
         print("Model retraining completed successfully.")
+        # Re-score active trials with the new model
+        score_active_trials.delay()
         return "Model retrained."
     except Exception as e:
         print(f"Model retraining failed: {e}")
-        # Here you would add Slack alerting for failures
+        # Job telemetry records the failure and posts it to Slack
         raise
\ No newline at end of file
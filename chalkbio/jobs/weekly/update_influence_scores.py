@@ -0,0 +1,21 @@
+from ...core.celery_app import celery_app
+from ..telemetry import report_records_processed
+
+@celery_app.task
+def update_investigator_influence():
+    """
+    Celery task to recompute investigator influence scores (weighted PageRank
+    over the collaboration graph). Runs after the weekly PubMed harvest.
+    """
+    # Imported here so beat and other workers never load scipy/pandas
+    from ...models.influence import update_influence_scores
+
+    print("Starting investigator influence score update...")
+    try:
+        result = update_influence_scores()
+    except Exception as e:
+        print(f"An error occurred during influence score update: {e}")
+        raise
+    print(f"Influence scores updated: {result}")
+    report_records_processed(result["investigators"])
+    return result
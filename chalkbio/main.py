@@ -1,7 +1,10 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from contextlib import asynccontextmanager
 
 from .core.celery_app import celery_app
+from .core.db import async_engine, configure_api_engine
+from .core.event_buffer import event_buffer
+from .core.metrics import mark_process_dead, render_latest
 from .api.endpoints import predictions, investigators, events, watchlists, alerts, crowding
 from .jobs.scheduler import setup_periodic_tasks
 from .models import predict
@@ -9,10 +12,21 @@ from .models import predict
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # This code runs on startup
+    # Only API requests run under DB_STATEMENT_TIMEOUT_MS
+    configure_api_engine()
     print("Application startup: Loading ML model assets...")
     predict.load_prediction_assets()
+    # Swap in newly activated models from the registry without a restart
+    predict.model_watcher.start()
+    predict.prediction_batcher.start()
+    event_buffer.start()
     yield
-    # This code runs on shutdown (optional)
+    # This code runs on shutdown: write out any buffered user events
+    event_buffer.stop()
+    predict.prediction_batcher.stop()
+    predict.model_watcher.stop()
+    await async_engine.dispose()
+    mark_process_dead()
     print("Application shutdown.")
 
 app = FastAPI(
@@ -35,4 +49,10 @@ setup_periodic_tasks(celery_app)
 
 @app.get("/", tags=["Root"])
 def read_root():
-    return {"message": "Welcome to the ChalkBio API"}
\ No newline at end of file
+    return {"message": "Welcome to the ChalkBio API"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus scrape endpoint (aggregates all workers when PROMETHEUS_MULTIPROC_DIR is set)."""
+    data, content_type = render_latest()
+    return Response(content=data, media_type=content_type)
@@ -0,0 +1,117 @@
+import os
+from typing import Dict
+
+import numpy as np
+
+# Array files written per version, each loadable with mmap_mode="r"
+ARRAY_NAMES = ("feature", "threshold", "children", "missing_left", "value", "roots", "classes")
+
+
+class CompiledForest:
+    """
+    A fitted RandomForestClassifier flattened into contiguous numpy arrays, with
+    the nodes of every tree concatenated and child links stored as global node
+    indices. predict_proba walks all rows through all trees one level at a time,
+    so a single row costs a handful of numpy calls instead of sklearn's input
+    validation and per-tree joblib dispatch.
+
+    Leaves link to themselves with an infinite threshold, so every walk simply
+    runs max_depth steps with no per-node leaf checks. Matches sklearn's
+    predict_proba within float tolerance: inputs are compared as float32 against
+    the float64 thresholds, exactly as sklearn's trees do, and each tree's leaf
+    distribution is normalized before averaging.
+    """
+
+    def __init__(self, feature, threshold, children, missing_left, value, roots, classes, max_depth: int):
+        self.feature = feature            # (n_nodes,) int32, 0 at leaves so gathers stay in bounds
+        self.threshold = threshold        # (n_nodes,) float64, +inf at leaves
+        self.children = children          # (n_nodes * 2,) int32 global ids: [2i] right, [2i + 1] left
+        self.missing_left = missing_left  # (n_nodes,) bool, where NaN inputs go
+        self.value = value                # (n_nodes, n_classes) float64, normalized class distribution
+        self.roots = roots                # (n_trees,) int32
+        self.classes_ = classes
+        self.max_depth = int(max_depth)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @classmethod
+    def from_sklearn(cls, model) -> "CompiledForest":
+        """Flattens a fitted single-output RandomForestClassifier (or any bagged tree classifier)."""
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        if any(tree.n_outputs != 1 for tree in trees):
+            raise ValueError("Only single-output forests can be compiled.")
+
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees])
+        feature, threshold, children, missing_left, value = [], [], [], [], []
+        for tree, offset in zip(trees, offsets):
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(tree.node_count) + offset
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+            # Right then left, so index 2 * node + (x <= threshold) picks the child
+            links = np.stack([tree.children_right + offset, tree.children_left + offset], axis=1)
+            links[is_leaf] = node_ids[is_leaf, None]
+            children.append(links.ravel())
+            missing_left.append(
+                tree.missing_go_to_left.astype(bool) if hasattr(tree, "missing_go_to_left") else np.zeros(tree.node_count, bool)
+            )
+            node_value = tree.value[:, 0, :].astype(np.float64)
+            totals = node_value.sum(axis=1, keepdims=True)
+            totals[totals == 0] = 1
+            value.append(node_value / totals)
+
+        return cls(
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            children=np.concatenate(children).astype(np.int32),
+            missing_left=np.concatenate(missing_left),
+            value=np.ascontiguousarray(np.concatenate(value)),
+            roots=offsets[:-1].astype(np.int32),
+            classes=np.asarray(model.classes_),
+            max_depth=max(tree.max_depth for tree in trees),
+        )
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Global leaf index reached in every tree, shape (n_rows, n_trees)."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.int32) * n_features)[:, None]
+        nodes = np.broadcast_to(self.roots, (n_rows, self.n_trees)).copy()
+        check_missing = bool(np.isnan(flat_X).any())
+
+        for _ in range(self.max_depth):
+            x = np.take(flat_X, row_offsets + np.take(self.feature, nodes))
+            goes_left = x <= np.take(self.threshold, nodes)
+            if check_missing:
+                goes_left |= np.isnan(x) & np.take(self.missing_left, nodes)
+            nodes = np.take(self.children, 2 * nodes + goes_left)
+        return nodes
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """Class probabilities averaged over the trees, shape (n_rows, n_classes)."""
+        return np.take(self.value, self.apply(X), axis=0).mean(axis=1)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+    def save(self, directory: str):
+        """One .npy per array, so each can be memory-mapped on load."""
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, "classes_" if name == "classes" else name))
+        np.save(os.path.join(directory, "max_depth.npy"), np.asarray(self.max_depth))
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "CompiledForest":
+        mmap_mode = "r" if mmap else None
+        arrays: Dict[str, np.ndarray] = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+            for name in ARRAY_NAMES
+        }
+        max_depth = int(np.load(os.path.join(directory, "max_depth.npy")))
+        return cls(max_depth=max_depth, **arrays)
@@ -0,0 +1,161 @@
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Default location, next to the other model artifacts
+EMBEDDING_CACHE_DIR = "./models_volume/embedding_cache"
+
+MATRIX_FILE = "embeddings.f32"
+INT8_MATRIX_FILE = "embeddings.i8"
+SCALES_FILE = "scales.f32"  # One dequantization scale per int8 row
+INDEX_FILE = "index.txt"
+META_FILE = "meta.json"
+LOCK_FILE = ".lock"
+
+
+def embedding_key(text: str, model_id: str) -> str:
+    """Content address for one description: a hash of the model ID plus the text."""
+    digest = hashlib.sha256()
+    digest.update(model_id.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed store of text embeddings for one embedding model.
+
+    On disk the cache is an append-only float32 matrix (memory-mapped for reads)
+    plus an index file holding one key per line; the line number is the row in
+    the matrix. Appends are serialised across processes with an flock, so the
+    API, Celery workers and the training pipeline can share one directory.
+
+    With quantize_int8, rows are stored as int8 with a per-row float32 scale
+    (symmetric, max-abs), a quarter of the size; get_many dequantizes them.
+    """
+
+    def __init__(self, model_id: str, cache_dir: str = EMBEDDING_CACHE_DIR, quantize_int8: bool = False):
+        self.model_id = model_id
+        self.quantize_int8 = quantize_int8
+        # One sub-directory per model (and storage format) so every matrix has a single, fixed width
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_id) + ("-int8" if quantize_int8 else "")
+        self.directory = os.path.join(cache_dir, slug)
+        self._dtype = np.int8 if quantize_int8 else np.float32
+        self._matrix_path = os.path.join(self.directory, INT8_MATRIX_FILE if quantize_int8 else MATRIX_FILE)
+        self._scales_path = os.path.join(self.directory, SCALES_FILE)
+        self._index_path = os.path.join(self.directory, INDEX_FILE)
+        self._meta_path = os.path.join(self.directory, META_FILE)
+        self._lock_path = os.path.join(self.directory, LOCK_FILE)
+
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._row_count = 0
+        self._index_offset = 0  # Bytes of the index file already read
+        self._dim: Optional[int] = None
+        self._matrix: Optional[np.memmap] = None
+        self._scales: Optional[np.memmap] = None
+
+    # --- Internal helpers ---
+
+    def _refresh(self):
+        """Picks up rows appended by this or any other process since the last read."""
+        if self._dim is None and os.path.exists(self._meta_path):
+            with open(self._meta_path, "r") as f:
+                self._dim = json.load(f)["dim"]
+
+        if not os.path.exists(self._index_path):
+            return
+        with open(self._index_path, "r") as f:
+            f.seek(self._index_offset)
+            # Only consume complete lines; a concurrent writer may be mid-append
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                self._rows.setdefault(line.rstrip("\n"), self._row_count)
+                self._row_count += 1
+                self._index_offset += len(line)
+
+        if self._dim and self._row_count and (self._matrix is None or self._matrix.shape[0] < self._row_count):
+            self._matrix = np.memmap(
+                self._matrix_path, dtype=self._dtype, mode="r", shape=(self._row_count, self._dim)
+            )
+            if self.quantize_int8:
+                self._scales = np.memmap(self._scales_path, dtype=np.float32, mode="r", shape=(self._row_count,))
+
+    def _row(self, row: int) -> np.ndarray:
+        if self.quantize_int8:
+            return self._matrix[row].astype(np.float32) * self._scales[row]
+        return np.array(self._matrix[row])
+
+    # --- Public API ---
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Returns the cached vectors for whichever of the keys are present."""
+        with self._lock:
+            if any(key not in self._rows for key in keys):
+                self._refresh()
+            if self._matrix is None:
+                return {}
+            return {key: self._row(self._rows[key]) for key in keys if key in self._rows}
+
+    def put_many(self, keys: List[str], vectors: np.ndarray):
+        """Appends new vectors to the cache. Keys already present are skipped."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        os.makedirs(self.directory, exist_ok=True)
+
+        with self._lock, open(self._lock_path, "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                if self._dim is None:
+                    self._dim = int(vectors.shape[1])
+                    with open(self._meta_path, "w") as f:
+                        json.dump({"model_id": self.model_id, "dim": self._dim}, f)
+                elif vectors.shape[1] != self._dim:
+                    raise ValueError(
+                        f"Embedding width {vectors.shape[1]} does not match cache width {self._dim}."
+                    )
+
+                new_keys, new_rows, seen = [], [], set()
+                for key, vector in zip(keys, vectors):
+                    if key in self._rows or key in seen:
+                        continue
+                    seen.add(key)
+                    new_keys.append(key)
+                    new_rows.append(vector)
+                if not new_keys:
+                    return
+
+                rows = np.stack(new_rows)
+                payloads = [(self._matrix_path, rows)]
+                if self.quantize_int8:
+                    scales = np.abs(rows).max(axis=1) / 127
+                    scales[scales == 0] = 1
+                    quantized = np.clip(np.rint(rows / scales[:, None]), -127, 127).astype(np.int8)
+                    payloads = [(self._matrix_path, quantized), (self._scales_path, scales.astype(np.float32))]
+
+                # Matrix first, index second: an index line never points at a missing row.
+                # Truncating first drops any rows orphaned by a writer that died between the two.
+                for path, payload in payloads:
+                    with open(path, "ab") as f:
+                        f.truncate(self._row_count * payload[0].nbytes)  # Bytes per row
+                        f.write(payload.tobytes())
+                        f.flush()
+                        os.fsync(f.fileno())
+                with open(self._index_path, "a") as f:
+                    f.write("".join(f"{key}\n" for key in new_keys))
+                self._refresh()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return self._row_count
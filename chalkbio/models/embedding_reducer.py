@@ -0,0 +1,68 @@
+import hashlib
+
+import numpy as np
+
+REDUCTION_METHODS = ("pca", "random_projection")
+
+
+class EmbeddingReducer:
+    """
+    Projects description embeddings down to a few dimensions before they become
+    `embed_*` model features: PCA, or a Gaussian random projection that needs no
+    fitting beyond a seed. Fitted in train.py and published with the model, and
+    applied inside FeatureEncoder so training and prediction reduce identically.
+    Stored as plain arrays, so applying it is one matrix product.
+    """
+
+    def __init__(self, method: str, mean: np.ndarray, components: np.ndarray):
+        self.method = method
+        self.mean = np.asarray(mean, dtype=np.float32)              # (input_dim,)
+        self.components = np.asarray(components, dtype=np.float32)  # (input_dim, n_components)
+
+    @property
+    def input_dim(self) -> int:
+        return self.components.shape[0]
+
+    @property
+    def n_components(self) -> int:
+        return self.components.shape[1]
+
+    @classmethod
+    def fit(cls, embeddings: np.ndarray, method: str, n_components: int, random_state: int = 42) -> "EmbeddingReducer":
+        if method not in REDUCTION_METHODS:
+            raise ValueError(f"Unknown embedding reduction '{method}'. Expected one of: {', '.join(REDUCTION_METHODS)}.")
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        n_samples, input_dim = embeddings.shape
+
+        if method == "pca":
+            from sklearn.decomposition import PCA
+            # PCA cannot find more components than there are samples
+            pca = PCA(n_components=min(n_components, n_samples, input_dim), random_state=random_state).fit(embeddings)
+            return cls(method, pca.mean_, pca.components_.T)
+
+        from sklearn.random_projection import GaussianRandomProjection
+        projection = GaussianRandomProjection(n_components=min(n_components, input_dim), random_state=random_state)
+        projection.fit(embeddings)
+        return cls(method, np.zeros(input_dim), projection.components_.T)
+
+    def transform(self, embeddings: np.ndarray) -> np.ndarray:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.ndim != 2 or embeddings.shape[1] != self.input_dim:
+            raise ValueError(f"Expected embeddings of width {self.input_dim}, got shape {embeddings.shape}.")
+        return (embeddings - self.mean) @ self.components
+
+    def fingerprint(self) -> str:
+        """Identifies the projection, so features reduced by a different one are never mixed in."""
+        digest = hashlib.sha256(self.method.encode("utf-8"))
+        digest.update(self.mean.tobytes())
+        digest.update(self.components.tobytes())
+        return digest.hexdigest()
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            np.savez(f, method=np.asarray(self.method), mean=self.mean, components=self.components)
+
+    @classmethod
+    def load(cls, path: str) -> "EmbeddingReducer":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(str(data["method"]), data["mean"], data["components"])
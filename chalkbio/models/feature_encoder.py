@@ -0,0 +1,102 @@
+import numpy as np
+from typing import Dict, List, Mapping, Optional, Sequence
+from .embedding_reducer import EmbeddingReducer
+
+# Raw feature columns, in the order pd.get_dummies used to lay them out
+NUMERIC_COLUMNS = ['sponsor_size', 'investigator_success_rate', 'mechanism_crowding_score']
+CATEGORICAL_COLUMNS = ['phase', 'indication']
+EMBEDDING_PREFIX = 'embed_'
+
+
+def _fill_missing(value):
+    """Mirrors the DataFrame.fillna(0) imputation used by the original pipeline."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return 0
+    return value
+
+
+class FeatureEncoder:
+    """
+    Writes trial feature rows straight into a preallocated numpy matrix laid out
+    exactly like training_columns: numeric fields, one-hot categories, then the
+    text embedding slice. Built once from categories.json and training_columns,
+    and shared by train.py and predict.py so the two cannot drift apart. With an
+    embedding_reducer, raw embeddings are reduced before they are written and
+    the embed_* columns hold the reduced dimensions.
+    """
+
+    def __init__(self, training_columns: Sequence[str], categories: Dict[str, List],
+                 embedding_reducer: Optional[EmbeddingReducer] = None):
+        self.training_columns = list(training_columns)
+        self.categories = categories
+        self.embedding_reducer = embedding_reducer
+        self.n_features = len(self.training_columns)
+        position = {col: i for i, col in enumerate(self.training_columns)}
+
+        self._numeric_positions = [(col, position[col]) for col in NUMERIC_COLUMNS if col in position]
+
+        # value -> output column, per categorical column. Values unseen in training
+        # simply set no column, as pd.Categorical + get_dummies did.
+        self._category_positions = {
+            col: {value: position[f"{col}_{value}"] for value in cats if f"{col}_{value}" in position}
+            for col, cats in categories.items()
+            if col in CATEGORICAL_COLUMNS
+        }
+
+        embedding_positions = []
+        while f"{EMBEDDING_PREFIX}{len(embedding_positions)}" in position:
+            embedding_positions.append(position[f"{EMBEDDING_PREFIX}{len(embedding_positions)}"])
+        self.embedding_dim = len(embedding_positions)
+        start = embedding_positions[0] if embedding_positions else 0
+        if embedding_positions == list(range(start, start + self.embedding_dim)):
+            # The normal case: one contiguous block, written with a single slice assignment
+            self._embedding_index = slice(start, start + self.embedding_dim)
+        else:
+            self._embedding_index = np.array(embedding_positions, dtype=np.intp)
+
+    @classmethod
+    def from_categories(cls, categories: Dict[str, List], embedding_dim: int,
+                        embedding_reducer: Optional[EmbeddingReducer] = None) -> "FeatureEncoder":
+        """
+        Builds the encoder (and so the training column layout) for a fresh training
+        run. embedding_dim is the raw embedding width; a reducer replaces it with its
+        number of components.
+        """
+        if embedding_reducer is not None:
+            embedding_dim = embedding_reducer.n_components
+        columns = list(NUMERIC_COLUMNS)
+        for col in CATEGORICAL_COLUMNS:
+            columns.extend(f"{col}_{value}" for value in categories.get(col, []))
+        columns.extend(f"{EMBEDDING_PREFIX}{i}" for i in range(embedding_dim))
+        return cls(columns, categories, embedding_reducer)
+
+    def transform(self, records: Sequence[Mapping], embeddings: np.ndarray, out: np.ndarray | None = None) -> np.ndarray:
+        """
+        Encodes feature records (dict-like rows from the feature query) and their
+        raw description embeddings into an (n_records, n_features) float matrix.
+        Pass `out` to reuse a preallocated buffer.
+        """
+        n_rows = len(records)
+        if out is None:
+            out = np.zeros((n_rows, self.n_features), dtype=np.float64)
+        else:
+            out[:n_rows] = 0
+
+        for row, record in enumerate(records):
+            for col, pos in self._numeric_positions:
+                out[row, pos] = float(_fill_missing(record.get(col)))
+            for col, positions in self._category_positions.items():
+                pos = positions.get(_fill_missing(record.get(col)))
+                if pos is not None:
+                    out[row, pos] = 1.0
+
+        if self.embedding_dim and n_rows:
+            embeddings = np.asarray(embeddings)
+            if self.embedding_reducer is not None:
+                embeddings = self.embedding_reducer.transform(embeddings)
+            if embeddings.shape != (n_rows, self.embedding_dim):
+                raise ValueError(
+                    f"Expected embeddings of shape {(n_rows, self.embedding_dim)}, got {embeddings.shape}."
+                )
+            out[:n_rows, self._embedding_index] = embeddings
+        return out[:n_rows]
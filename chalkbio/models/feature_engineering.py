@@ -1,36 +1,115 @@
-from sentence_transformers import SentenceTransformer
+import threading
 import numpy as np
 import pandas as pd
-import sys # Import the sys module
-
-# --- THIS IS THE FIX ---
-try:
-    # Load the pre-trained model. This will be downloaded from Hugging Face.
-    print("Loading S-BioBert model... (This may take a few minutes on first run)")
-    model = SentenceTransformer('pritamdeka/S-BioBert-snli-multinli-stsb')
-    print("Model loaded successfully.")
-except Exception as e:
-    # If the download fails for any reason (network, etc.), stop the program.
-    print(f"FATAL: Could not download or load the SentenceTransformer model.")
-    print(f"Error: {e}")
-    print("Please check your internet connection and try again.")
-    # Exit the program with an error code
-    sys.exit(1)
-# -------------------------
+from ..core.config import settings
+from ..core.metrics import CACHE_LOOKUPS
+from .embedding_cache import EmbeddingCache, embedding_key
+
+
+class SentenceTransformerProvider:
+    """
+    Lazily loads a SentenceTransformer model on the first encode call.
+
+    Importing this module no longer pulls in torch or the model weights, so the
+    API, Celery workers and unit tests start quickly; only the first process that
+    actually needs an embedding pays for the load.
+    """
+
+    def __init__(self, model_name: str, model_path: str | None = None, local_files_only: bool = False):
+        # The model name identifies the embeddings (used for cache keys), even when
+        # the weights are loaded from a local directory.
+        self.model_id = model_name
+        self.model_path = model_path
+        self.local_files_only = local_files_only
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    # Deferred import: torch is only loaded when embeddings are needed
+                    from sentence_transformers import SentenceTransformer
+                    source = self.model_path or self.model_id
+                    print(f"Loading embedding model from {source}... (This may take a few minutes on first run)")
+                    try:
+                        self._model = SentenceTransformer(source, local_files_only=self.local_files_only)
+                    except Exception as e:
+                        raise RuntimeError(f"Could not load the SentenceTransformer model '{source}': {e}") from e
+                    print("Embedding model loaded successfully.")
+        return self._model
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        model = self._get_model()
+        # The model.encode method converts a list of sentences into a list of vectors (numpy arrays)
+        return np.asarray(model.encode(texts, show_progress_bar=len(texts) > 1), dtype=np.float32)
+
+
+_provider = SentenceTransformerProvider(
+    model_name=settings.EMBEDDING_MODEL_NAME,
+    model_path=settings.EMBEDDING_MODEL_PATH,
+    local_files_only=settings.EMBEDDING_LOCAL_FILES_ONLY,
+)
+# Shared by predict.py and train.py, so descriptions are only ever encoded once per model
+_embedding_cache = EmbeddingCache(
+    model_id=_provider.model_id, cache_dir=settings.EMBEDDING_CACHE_DIR, quantize_int8=settings.EMBEDDING_CACHE_INT8
+)
+
+
+def get_embedding_provider():
+    return _provider
+
+
+def set_embedding_provider(provider, cache: EmbeddingCache | None = None):
+    """
+    Swaps the embedding provider (e.g. for a lightweight fake in tests).
+
+    Any object with a `model_id` attribute and an `encode(texts) -> np.ndarray`
+    method will do. Embeddings are cached per model ID, so a new provider gets
+    its own cache unless one is passed in explicitly.
+    """
+    global _provider, _embedding_cache
+    _provider = provider
+    if cache is None:
+        cache = EmbeddingCache(
+            model_id=provider.model_id, cache_dir=settings.EMBEDDING_CACHE_DIR, quantize_int8=settings.EMBEDDING_CACHE_INT8
+        )
+    _embedding_cache = cache
+
+
+def encode_texts(texts: list) -> np.ndarray:
+    """
+    Returns an (n_texts, dim) float32 matrix of embeddings for the given descriptions.
+    Only descriptions the embedding cache has never seen are sent to the model.
+    """
+    provider, cache = _provider, _embedding_cache
+    texts = ["" if pd.isna(t) else str(t) for t in texts]
+    keys = [embedding_key(t, provider.model_id) for t in texts]
+    cached = cache.get_many(keys)
+
+    # Encode each unseen description once, even if it appears several times
+    missing = {key: t for key, t in zip(keys, texts) if key not in cached}
+    misses = sum(key not in cached for key in keys)
+    CACHE_LOOKUPS.labels("embedding", "hit").inc(len(keys) - misses)
+    CACHE_LOOKUPS.labels("embedding", "miss").inc(misses)
+    if missing:
+        print(f"Generating text embeddings for {len(missing)} of {len(texts)} descriptions...")
+        new_vectors = provider.encode(list(missing.values()))
+        cache.put_many(list(missing.keys()), new_vectors)
+        cached.update(zip(missing.keys(), new_vectors))
+
+    return np.stack([cached[key] for key in keys])
 
 
 def get_text_embeddings(text_series: pd.Series) -> pd.DataFrame:
     """
     Takes a pandas Series of text descriptions and returns a DataFrame of embeddings.
     """
-    print("Generating text embeddings...")
-    # The model.encode method converts a list of sentences into a list of vectors (numpy arrays)
-    embeddings = model.encode(text_series.tolist(), show_progress_bar=True)
-    
+    embeddings = encode_texts(text_series.tolist())
+
     # Create column names for the embedding features
     embedding_cols = [f'embed_{i}' for i in range(embeddings.shape[1])]
-    
+
     # Create a DataFrame from the embeddings
     embeddings_df = pd.DataFrame(embeddings, index=text_series.index, columns=embedding_cols)
-    print("Embeddings generated successfully.")
-    return embeddings_df
\ No newline at end of file
+    return embeddings_df
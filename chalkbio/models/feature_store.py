@@ -0,0 +1,56 @@
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class StoredFeatures:
+    trial_ids: np.ndarray   # (n,) str
+    row_hashes: np.ndarray  # (n,) str, md5 of the raw feature columns and outcome
+    X: np.ndarray           # (n, n_features)
+    y: np.ndarray           # (n,)
+    layout: str             # Encoder layout the rows were encoded with
+
+    def __len__(self):
+        return len(self.trial_ids)
+
+
+class TrainingFeatureStore:
+    """
+    Encoded training rows persisted between runs, keyed by trial_id and the
+    hash of the row's raw inputs. Incremental training reuses every row whose
+    hash is unchanged and only encodes new or changed trials. The whole store
+    is one .npz file, replaced atomically on save.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> StoredFeatures | None:
+        if not os.path.exists(self.path):
+            return None
+        with np.load(self.path, allow_pickle=False) as data:
+            return StoredFeatures(
+                trial_ids=data["trial_ids"],
+                row_hashes=data["row_hashes"],
+                X=data["X"],
+                y=data["y"],
+                layout=str(data["layout"]),
+            )
+
+    def save(self, features: StoredFeatures):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                trial_ids=np.asarray(features.trial_ids, dtype=str),
+                row_hashes=np.asarray(features.row_hashes, dtype=str),
+                X=features.X,
+                y=features.y,
+                layout=np.asarray(features.layout),
+            )
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,119 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-key requests into batched calls on one
+    dedicated inference thread.
+
+    submit() queues a key and returns a Future. The inference thread takes the
+    first queued key, waits up to `max_wait_seconds` for more (or until
+    `max_batch_size` are queued) and hands them all to `handler` in one call,
+    which returns a dict of results keyed the same way. A key that is already
+    queued or being scored is not queued again: every caller asking for it
+    shares the one Future (single-flight).
+
+    Running all inference on one thread also stops concurrent requests from
+    fighting over CPU cores with parallel encode and predict calls.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[str]], Dict[str, Any]],
+        max_batch_size: int,
+        max_wait_seconds: float,
+        name: str = "micro-batcher",
+    ):
+        self._handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.name = name
+
+        self._queue: List[str] = []
+        self._in_flight: Dict[str, Future] = {}
+        self._condition = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+
+    def submit(self, key: str) -> Future:
+        """Returns a Future for the key's result, joining an in-flight request for the same key."""
+        with self._condition:
+            future = self._in_flight.get(key)
+            if future is None:
+                future = Future()
+                self._in_flight[key] = future
+                self._queue.append(key)
+                self._condition.notify()
+        # Started on first use too, so callers outside the API lifespan still get an answer
+        self.start()
+        return future
+
+    def _next_batch(self) -> List[str] | None:
+        """Blocks until a batch is ready. Returns None once stopped and drained."""
+        with self._condition:
+            while not self._queue:
+                if self._stopping:
+                    return None
+                self._condition.wait()
+            # Give concurrent requests a few milliseconds to join this batch
+            deadline = time.monotonic() + self.max_wait_seconds
+            while len(self._queue) < self.max_batch_size and not self._stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            taken = self._queue[:self.max_batch_size]
+            del self._queue[:len(taken)]
+            # Once running, a shared Future can no longer be cancelled by one caller
+            # giving up on it. Keys whose Future was cancelled while queued are dropped.
+            batch = []
+            for key in taken:
+                if self._in_flight[key].set_running_or_notify_cancel():
+                    batch.append(key)
+                else:
+                    del self._in_flight[key]
+            return batch
+
+    def _process(self, batch: List[str]):
+        if not batch:
+            return
+        try:
+            results = self._handler(batch)
+            error = None
+        except Exception as e:
+            results, error = {}, e
+        with self._condition:
+            futures = [self._in_flight.pop(key) for key in batch]
+        for key, future in zip(batch, futures):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(results.get(key))
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._process(batch)
+
+    def start(self):
+        """Starts the inference thread (idempotent)."""
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stops the inference thread once every queued key has been answered."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
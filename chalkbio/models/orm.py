@@ -1,4 +1,4 @@
-from sqlalchemy import DECIMAL, Column, ForeignKey, Integer, String, JSON, TIMESTAMP, func
+from sqlalchemy import DECIMAL, Column, ForeignKey, Index, Integer, String, JSON, TIMESTAMP, func, text
 from sqlalchemy.dialects.postgresql import UUID
 # --- CHANGE THIS LINE ---
 from sqlalchemy.orm import declarative_base
@@ -9,6 +9,7 @@ Base = declarative_base()
 class UserEvent(Base):
     __tablename__ = "user_events"
 
+    # user_events is partitioned by month on timestamp, so the key includes it
     event_id = Column(UUID(as_uuid=True), primary_key=True, server_default=func.gen_random_uuid())
     user_id = Column(UUID(as_uuid=True), nullable=False)
     user_type = Column(String(20), nullable=False)
@@ -21,7 +22,7 @@ class UserEvent(Base):
     request_id = Column(UUID(as_uuid=True))
     event_version = Column(String(10), default='v1.0')
     schema_version = Column(String(10), default='s1.0')
-    timestamp = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    timestamp = Column(TIMESTAMP(timezone=True), primary_key=True, server_default=func.now())
 
 
 class Watchlist(Base):
@@ -34,6 +35,19 @@ class Watchlist(Base):
     added_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     removed_at = Column(TIMESTAMP(timezone=True))
 
+    __table_args__ = (
+        # Reverse lookup: who is actively watching entity X?
+        Index(
+            "idx_watchlists_active_entity", "entity_type", "entity_id", "user_id",
+            postgresql_where=text("removed_at IS NULL")
+        ),
+        # Keyset pagination of a user's active watchlist
+        Index(
+            "idx_watchlists_user_page", "user_id", added_at.desc(), id.desc(),
+            postgresql_where=text("removed_at IS NULL")
+        ),
+    )
+
 class Alert(Base):
     __tablename__ = "alerts"
     alert_id = Column(UUID(as_uuid=True), primary_key=True, server_default=func.gen_random_uuid())
@@ -45,6 +59,18 @@ class Alert(Base):
     message = Column(String, nullable=False)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
     clicked_at = Column(TIMESTAMP(timezone=True))
+    # Identifies the triggering event; unique per (user_id, alert_type, entity_id)
+    event_key = Column(String(64))
+
+    __table_args__ = (
+        Index("idx_alerts_event_dedupe", "user_id", "alert_type", "entity_id", "event_key", unique=True),
+        # Keyset pagination of a user's alerts, all and unread-only
+        Index("idx_alerts_user_page", "user_id", created_at.desc(), alert_id.desc()),
+        Index(
+            "idx_alerts_user_unread_page", "user_id", created_at.desc(), alert_id.desc(),
+            postgresql_where=text("clicked_at IS NULL")
+        ),
+    )
 
 class Investigator(Base):
     __tablename__ = "investigators"
@@ -53,6 +79,8 @@ class Investigator(Base):
     institution = Column(String(255))
     success_rate = Column(DECIMAL(5, 2), default=0.0)
     influence_score = Column(DECIMAL(5, 2), default=0.0)
+    source_key = Column(String(64), unique=True) # Natural key for scraped investigators
+    content_hash = Column(String(32)) # md5 of the scraped fields
 
 class Trial(Base):
     __tablename__ = "trials"
@@ -64,4 +92,5 @@ class Trial(Base):
     sponsor_size = Column(Integer)
     mechanism_of_action = Column(String(255))
     investigator_id = Column(UUID(as_uuid=True), ForeignKey("investigators.investigator_id"))
-    outcome = Column(String(50))
\ No newline at end of file
+    outcome = Column(String(50))
+    content_hash = Column(String(32)) # md5 of the scraped fields
\ No newline at end of file
@@ -1,9 +1,18 @@
 import pickle
 import json
-import pandas as pd
+from datetime import datetime, timezone
+import numpy as np
+from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from .feature_engineering import get_text_embeddings
+from sqlalchemy import bindparam, text
+from .feature_engineering import encode_texts
+from .feature_encoder import FeatureEncoder
+from .compiled_forest import CompiledForest
+from .inference_batcher import MicroBatcher
+from .registry import ModelRegistry, ModelVersion, ModelWatcher
+from ..core.config import settings
+from ..core.db import SessionLocal
+from ..core.metrics import CACHE_LOOKUPS, PREDICTION_STAGE_SECONDS, PREDICTIONS
 
 # Define paths for the new v2 model artifacts
 MODEL_NAME = "trial_success_predictor_hybrid"
@@ -13,10 +22,15 @@ MODEL_ARTIFACT_PATH = f"{MODEL_ARTIFACT_DIR}/{MODEL_NAME}_{MODEL_VERSION}.pkl"
 TRAINING_COLUMNS_PATH = f"{MODEL_ARTIFACT_DIR}/training_columns_v2.json"
 CATEGORIES_PATH = f"{MODEL_ARTIFACT_DIR}/categories.json"
 
+# Published models: versioned joblib artifacts indexed by ml_models
+model_registry = ModelRegistry(MODEL_NAME)
+
+# Replaced as a whole (never mutated) when a new model is loaded, so a request
+# that has already read it keeps a consistent model, encoder and version
 ml_assets = {}
 
-def load_prediction_assets():
-    """Loads model, columns, AND categories from disk into the ml_assets dictionary."""
+def _load_legacy_assets():
+    """Loads the pre-registry artifacts (pickled model plus json files), if present."""
     model, training_columns, categories = None, None, None
     try:
         with open(MODEL_ARTIFACT_PATH, "rb") as f: model = pickle.load(f)
@@ -33,81 +47,266 @@ def load_prediction_assets():
         print("Categories loaded successfully.")
     except FileNotFoundError: print(f"Warning: Categories file not found at {CATEGORIES_PATH}")
 
-    # Store the loaded assets in the global dictionary
-    ml_assets['model'] = model
-    ml_assets['training_columns'] = training_columns
-    ml_assets['categories'] = categories
+    return {"model": model, "compiled_forest": None, "training_columns": training_columns, "categories": categories}
+
+def load_prediction_assets(version: Optional[ModelVersion] = None):
+    """
+    Loads the active registry model (or `version`) with its columns and categories,
+    falling back to the legacy artifact files when nothing has been published yet,
+    then swaps them into ml_assets in a single assignment.
+    """
+    global ml_assets
+
+    if version is None:
+        try:
+            version = model_registry.active_version()
+        except Exception as e:
+            print(f"Warning: Could not look up the active model version: {e}")
+
+    if version is not None:
+        assets = model_registry.load(version)
+        model_version = version.version
+        print(f"Prediction model {model_version} loaded from the registry.")
+    else:
+        assets = _load_legacy_assets()
+        model_version = MODEL_VERSION
+    model, training_columns, categories = assets['model'], assets['training_columns'], assets['categories']
+
+    # Build the feature encoder once, instead of running pandas on every request
+    encoder = None
+    if training_columns and categories:
+        # Applies the version's embedding reduction, if it was trained with one
+        encoder = FeatureEncoder(training_columns, categories, assets.get('embedding_reducer'))
+        if model is not None and hasattr(model, 'feature_names_in_'):
+            # Models fitted on a DataFrame remember its column names. The encoder
+            # already guarantees that layout, so check it once here and drop the
+            # names to keep sklearn from warning on every numpy input.
+            if list(model.feature_names_in_) != encoder.training_columns:
+                print("Warning: Model feature names do not match the training columns file.")
+            del model.feature_names_in_
+
+    # Score with the flattened forest: same probabilities, far less per-call overhead.
+    # Versions published before the export step are compiled here on load.
+    compiled_forest = assets.get('compiled_forest')
+    if compiled_forest is None and model is not None and hasattr(model, 'estimators_'):
+        try:
+            compiled_forest = CompiledForest.from_sklearn(model)
+        except ValueError as e:
+            print(f"Warning: Could not compile the model, scoring with sklearn instead: {e}")
+
+    # Swap in the new assets with one assignment; requests in flight keep the old dict
+    ml_assets = {
+        'model': model,
+        'compiled_forest': compiled_forest,
+        'training_columns': training_columns,
+        'categories': categories,
+        'encoder': encoder,
+        'model_version': model_version,
+    }
+
+def current_model_version() -> Optional[str]:
+    """The version of the model currently serving predictions, if one is loaded."""
+    return ml_assets.get('model_version')
+
+# Picks up newly activated models without an API restart (started in the FastAPI lifespan)
+model_watcher = ModelWatcher(
+    model_registry,
+    on_change=load_prediction_assets,
+    current_version=current_model_version,
+    interval_seconds=settings.MODEL_WATCH_INTERVAL_SECONDS,
+)
+
+
+# Shared feature query for single and batch prediction
+FEATURE_QUERY = text("""
+SELECT
+    t.trial_id, t.trial_description, t.phase, t.indication, t.sponsor_size,
+    i.success_rate as investigator_success_rate,
+    mc.crowding_risk_score as mechanism_crowding_score
+FROM trials t
+LEFT JOIN investigators i ON t.investigator_id = i.investigator_id
+LEFT JOIN mechanism_crowding mc ON t.mechanism_of_action = mc.mechanism_of_action AND t.phase = mc.phase
+WHERE t.trial_id IN :trial_ids;
+""").bindparams(bindparam('trial_ids', expanding=True))
 
+# Precomputed scores written by the nightly scoring job (jobs/daily/score_trials.py)
+STORED_PREDICTIONS_QUERY = text("""
+SELECT trial_id, drug_id, predicted_probability, confidence_lower, confidence_upper, model_version, created_at
+FROM trial_predictions
+WHERE trial_id IN :trial_ids AND model_version = :model_version;
+""").bindparams(bindparam('trial_ids', expanding=True))
 
-def get_prediction_for_trial(db: Session, trial_id: str):
+UPSERT_PREDICTION_QUERY = text("""
+INSERT INTO trial_predictions
+    (trial_id, drug_id, predicted_probability, confidence_lower, confidence_upper, model_version, created_at)
+VALUES
+    (:trial_id, :drug_id, :predicted_probability, :confidence_lower, :confidence_upper, :model_version, :created_at)
+ON CONFLICT (trial_id, model_version) DO UPDATE SET
+    drug_id = EXCLUDED.drug_id,
+    predicted_probability = EXCLUDED.predicted_probability,
+    confidence_lower = EXCLUDED.confidence_lower,
+    confidence_upper = EXCLUDED.confidence_upper,
+    created_at = EXCLUDED.created_at;
+""")
+
+
+def _get_loaded_assets():
     """
-    Fetches REAL trial features, engineers them, and returns a prediction.
+    Returns (model, encoder, model_version) from one snapshot, or raises if any
+    model asset is missing. The model is the compiled forest when there is one;
+    both expose predict_proba.
     """
-    model = ml_assets.get('model')
-    training_columns = ml_assets.get('training_columns')
-    categories = ml_assets.get('categories')
+    assets = ml_assets
+    model = assets.get('model')
+    encoder = assets.get('encoder')
 
-    if not model or not training_columns or not categories:
+    if not model or not encoder:
         raise RuntimeError("Model assets (model, columns, or categories) are not loaded.")
+    if assets.get('compiled_forest') is not None:
+        model = assets['compiled_forest']
+    return model, encoder, assets.get('model_version', MODEL_VERSION)
 
-    # 1. FETCH REAL FEATURES from the database
-    query = text("""
-    SELECT
-        t.trial_id, t.trial_description, t.phase, t.indication, t.sponsor_size,
-        i.success_rate as investigator_success_rate,
-        mc.crowding_risk_score as mechanism_crowding_score
-    FROM trials t
-    LEFT JOIN investigators i ON t.investigator_id = i.investigator_id
-    LEFT JOIN mechanism_crowding mc ON t.mechanism_of_action = mc.mechanism_of_action AND t.phase = mc.phase
-    WHERE t.trial_id = :trial_id
-    LIMIT 1;
-    """)
-    
-    result = db.execute(query, {'trial_id': trial_id}).mappings().first()
-
-    if not result:
-        return None # Let the API handle the 404
 
-    # Convert SQL row to a DataFrame, filling missing values
-    predict_df = pd.DataFrame([result]).fillna(0)
-    for col, cats in categories.items():
-        if col in predict_df.columns:
-            predict_df[col] = pd.Categorical(predict_df[col], categories=cats)
-
-    # 2. ENGINEER FEATURES (Identical to training)
-    
-    # a) Structured Features
-    structured_features_df = pd.get_dummies(
-        predict_df[['phase', 'indication', 'sponsor_size', 'investigator_success_rate', 'mechanism_crowding_score']],
-        columns=['phase', 'indication'], # Explicitly name the columns to encode
-        drop_first=False
-    )
-    # ------------------------------------
-    
-    # b) Text Features
-    text_embeddings_df = get_text_embeddings(predict_df['trial_description'])
-
-    # c) Combine Features
-    # --- THIS IS THE FIX ---
-    # Reset the index on both DataFrames to ensure they align perfectly
-    structured_features_df.reset_index(drop=True, inplace=True)
-    text_embeddings_df.reset_index(drop=True, inplace=True)
-    # ------------------------------------
-    predict_df_processed = pd.concat([structured_features_df, text_embeddings_df], axis=1)
-
-    # 3. ALIGN COLUMNS (This is now our failsafe)
-    predict_df_aligned = predict_df_processed.reindex(columns=training_columns, fill_value=0)
-
-    # 4. MAKE PREDICTION
-    probability = model.predict_proba(predict_df_aligned)[0, 1]
-
-    # Return data
+def _fetch_trial_features(db: Session, trial_ids: List[str]) -> List[dict]:
+    """Fetches the raw feature rows for all requested trials in a single query."""
+    rows = db.execute(FEATURE_QUERY, {'trial_ids': trial_ids}).mappings().all()
+    return [dict(row) for row in rows]
+
+
+def _score_feature_rows(model, encoder: FeatureEncoder, feature_rows: List[dict]) -> np.ndarray:
+    """
+    Encodes every feature row and scores them in one pass.
+    Returns the success probability for each row, in the same order.
+    """
+    # Text Features (one batched encode call for all descriptions)
+    with PREDICTION_STAGE_SECONDS.labels("encode").time():
+        embeddings = encode_texts([row['trial_description'] for row in feature_rows])
+
+    # Structured + text features, written straight into the training column layout
+    with PREDICTION_STAGE_SECONDS.labels("features").time():
+        features = encoder.transform(feature_rows, embeddings)
+
+    # Score the whole matrix at once
+    with PREDICTION_STAGE_SECONDS.labels("predict_proba").time():
+        return model.predict_proba(features)[:, 1]
+
+
+def _build_prediction(trial_id: str, probability: float, model_version: str) -> dict:
+    """Formats a raw probability into the prediction response payload."""
+    probability = float(probability)
     return {
         "trial_id": trial_id,
         "drug_id": "DRUG-XYZ",
         "predicted_probability": round(probability, 4),
         "confidence_lower": round(max(0, probability - 0.12), 4),
         "confidence_upper": round(min(1, probability + 0.12), 4),
-        "model_version": MODEL_VERSION, # Report the new version
-        "created_at": "2025-11-17T15:00:00Z"
-    }
\ No newline at end of file
+        "model_version": model_version,
+        "created_at": datetime.now(timezone.utc)
+    }
+
+
+def _fetch_stored_predictions(db: Session, trial_ids: List[str], model_version: str) -> Dict[str, dict]:
+    """Looks up precomputed predictions made by the given model version."""
+    rows = db.execute(
+        STORED_PREDICTIONS_QUERY, {'trial_ids': trial_ids, 'model_version': model_version}
+    ).mappings().all()
+    return {
+        row['trial_id']: {
+            "trial_id": row['trial_id'],
+            "drug_id": row['drug_id'],
+            "predicted_probability": float(row['predicted_probability']),
+            "confidence_lower": float(row['confidence_lower']),
+            "confidence_upper": float(row['confidence_upper']),
+            "model_version": row['model_version'],
+            "created_at": row['created_at']
+        }
+        for row in rows
+    }
+
+
+def store_predictions(db: Session, predictions: List[dict]):
+    """Upserts predictions into trial_predictions. The caller owns the commit."""
+    if predictions:
+        db.execute(UPSERT_PREDICTION_QUERY, predictions)
+
+
+def get_prediction_for_trial(db: Session, trial_id: str, use_stored: bool = True):
+    """
+    Returns the precomputed prediction for a trial if there is one; otherwise
+    fetches REAL trial features, engineers them, and predicts live.
+    """
+    if use_stored:
+        stored = _fetch_stored_predictions(db, [trial_id], current_model_version() or MODEL_VERSION)
+        CACHE_LOOKUPS.labels("stored_prediction", "hit" if trial_id in stored else "miss").inc()
+        if trial_id in stored:
+            PREDICTIONS.labels(stored[trial_id]['model_version'], "stored").inc()
+            return stored[trial_id]
+
+    model, encoder, model_version = _get_loaded_assets()
+
+    feature_rows = _fetch_trial_features(db, [trial_id])
+    if not feature_rows:
+        return None # Let the API handle the 404
+
+    probability = _score_feature_rows(model, encoder, feature_rows)[0]
+    PREDICTIONS.labels(model_version, "live").inc()
+    return _build_prediction(trial_id, probability, model_version)
+
+
+def get_predictions_for_trials(db: Session, trial_ids: List[str], use_stored: bool = True) -> Dict[str, Optional[dict]]:
+    """
+    Batch version of get_prediction_for_trial.
+
+    Serves precomputed predictions first. For the rest, fetches features in one
+    query, embeds all descriptions in one encode call and scores the whole matrix
+    with a single predict_proba. Returns a dict keyed by trial ID; unknown trials
+    map to None.
+    """
+    # De-duplicate while preserving the caller's order
+    unique_ids = list(dict.fromkeys(trial_ids))
+    predictions: Dict[str, Optional[dict]] = {trial_id: None for trial_id in unique_ids}
+    if not unique_ids:
+        return predictions
+
+    if use_stored:
+        stored = _fetch_stored_predictions(db, unique_ids, current_model_version() or MODEL_VERSION)
+        predictions.update(stored)
+        CACHE_LOOKUPS.labels("stored_prediction", "hit").inc(len(stored))
+        CACHE_LOOKUPS.labels("stored_prediction", "miss").inc(len(unique_ids) - len(stored))
+        for prediction in stored.values():
+            PREDICTIONS.labels(prediction['model_version'], "stored").inc()
+        unique_ids = [trial_id for trial_id in unique_ids if predictions[trial_id] is None]
+        if not unique_ids:
+            return predictions
+
+    model, encoder, model_version = _get_loaded_assets()
+    feature_rows = _fetch_trial_features(db, unique_ids)
+    if not feature_rows:
+        return predictions
+
+    probabilities = _score_feature_rows(model, encoder, feature_rows)
+    for trial_id, probability in zip((row['trial_id'] for row in feature_rows), probabilities):
+        predictions[trial_id] = _build_prediction(trial_id, probability, model_version)
+    PREDICTIONS.labels(model_version, "live").inc(len(feature_rows))
+    return predictions
+
+
+def _predict_batch(trial_ids: List[str]) -> Dict[str, Optional[dict]]:
+    """Scores one micro-batch with its own session, on the batcher's inference thread."""
+    db = SessionLocal()
+    try:
+        if len(trial_ids) == 1:
+            return {trial_ids[0]: get_prediction_for_trial(db, trial_ids[0])}
+        return get_predictions_for_trials(db, trial_ids)
+    finally:
+        db.close()
+
+
+# Concurrent single-trial requests from the API are coalesced into one encode and
+# one predict call here (started in the FastAPI lifespan)
+prediction_batcher = MicroBatcher(
+    _predict_batch,
+    max_batch_size=settings.PREDICTION_BATCH_MAX_SIZE,
+    max_wait_seconds=settings.PREDICTION_BATCH_MAX_WAIT_MS / 1000,
+    name="prediction-batcher",
+)
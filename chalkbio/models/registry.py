@@ -0,0 +1,226 @@
+import json
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Callable, Dict, List
+
+import joblib
+from sqlalchemy import text
+
+from ..core.config import settings
+from ..core.db import SessionLocal
+from .compiled_forest import CompiledForest
+from .embedding_reducer import EmbeddingReducer
+
+MODEL_FILE = "model.joblib"
+COMPILED_FOREST_DIR = "forest"
+EMBEDDING_REDUCER_FILE = "embedding_reducer.npz"
+TRAINING_COLUMNS_FILE = "training_columns.json"
+CATEGORIES_FILE = "categories.json"
+
+INSERT_MODEL_QUERY = text("""
+INSERT INTO ml_models (name, version, trained_on, auc, calibration_score, notes, artifact_path)
+VALUES (:name, :version, :trained_on, :auc, :calibration_score, :notes, :artifact_path);
+""")
+
+# One statement, so there is never a moment with zero or two active versions
+ACTIVATE_MODEL_QUERY = text("""
+UPDATE ml_models SET is_active = (version = :version)
+WHERE name = :name AND (is_active OR version = :version);
+""")
+
+ACTIVE_MODEL_QUERY = text("""
+SELECT version, artifact_path FROM ml_models WHERE name = :name AND is_active;
+""")
+
+
+@dataclass(frozen=True)
+class ModelVersion:
+    version: str
+    artifact_path: str
+
+
+class ModelRegistry:
+    """
+    Versioned model artifacts on disk, indexed by the ml_models table.
+
+    Each version lives in its own directory holding the joblib model, its
+    flattened CompiledForest arrays (when exported), its embedding reducer (if
+    one was fitted) and the training columns and categories it was fitted with. A version is written to
+    a temporary directory and renamed into place, so readers never see a
+    partial artifact; only then is it recorded and activated in ml_models.
+    """
+
+    def __init__(self, name: str, root_dir: str = settings.MODEL_REGISTRY_DIR, session_factory: Callable = SessionLocal):
+        self.name = name
+        self.root_dir = root_dir
+        self._session_factory = session_factory
+
+    def new_version(self, base_version: str) -> str:
+        """e.g. v2.0-20261018T040000Z: the feature layout version plus the training time."""
+        return f"{base_version}-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}"
+
+    def _write_artifacts(self, version: str, model, training_columns: List[str], categories: Dict,
+                         compiled_forest: CompiledForest | None = None,
+                         embedding_reducer: EmbeddingReducer | None = None) -> str:
+        model_dir = os.path.join(self.root_dir, self.name)
+        final_path = os.path.join(model_dir, version)
+        tmp_path = os.path.join(model_dir, f".{version}.tmp-{os.getpid()}")
+        if os.path.exists(final_path):
+            raise FileExistsError(f"Model version {version} already exists at {final_path}.")
+
+        os.makedirs(tmp_path)
+        try:
+            # Uncompressed, so the numpy arrays inside can be memory-mapped on load
+            joblib.dump(model, os.path.join(tmp_path, MODEL_FILE))
+            if compiled_forest is not None:
+                compiled_forest.save(os.path.join(tmp_path, COMPILED_FOREST_DIR))
+            if embedding_reducer is not None:
+                embedding_reducer.save(os.path.join(tmp_path, EMBEDDING_REDUCER_FILE))
+            with open(os.path.join(tmp_path, TRAINING_COLUMNS_FILE), "w") as f:
+                json.dump(training_columns, f)
+            with open(os.path.join(tmp_path, CATEGORIES_FILE), "w") as f:
+                json.dump(categories, f)
+            for directory, _, filenames in os.walk(tmp_path):
+                for filename in filenames:
+                    with open(os.path.join(directory, filename), "rb") as f:
+                        os.fsync(f.fileno())
+            os.replace(tmp_path, final_path)
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        return final_path
+
+    def _record(self, version: ModelVersion, metrics: Dict, notes: str | None, activate: bool):
+        db = self._session_factory()
+        try:
+            db.execute(INSERT_MODEL_QUERY, {
+                "name": self.name,
+                "version": version.version,
+                "trained_on": date.today(),
+                "auc": metrics.get("auc"),
+                "calibration_score": metrics.get("calibration_score"),
+                "notes": notes,
+                "artifact_path": version.artifact_path,
+            })
+            if activate:
+                db.execute(ACTIVATE_MODEL_QUERY, {"name": self.name, "version": version.version})
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def publish(
+        self,
+        base_version: str,
+        model,
+        training_columns: List[str],
+        categories: Dict,
+        metrics: Dict | None = None,
+        notes: str | None = None,
+        activate: bool = True,
+        compiled_forest: CompiledForest | None = None,
+        embedding_reducer: EmbeddingReducer | None = None,
+    ) -> ModelVersion:
+        """Writes a new version atomically, records it in ml_models and (by default) activates it."""
+        version = self.new_version(base_version)
+        artifact_path = self._write_artifacts(
+            version, model, training_columns, categories, compiled_forest, embedding_reducer
+        )
+        model_version = ModelVersion(version=version, artifact_path=artifact_path)
+        self._record(model_version, metrics or {}, notes, activate)
+        return model_version
+
+    def activate(self, version: str):
+        """Makes an existing version the active one, e.g. to roll back."""
+        db = self._session_factory()
+        try:
+            db.execute(ACTIVATE_MODEL_QUERY, {"name": self.name, "version": version})
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def active_version(self) -> ModelVersion | None:
+        db = self._session_factory()
+        try:
+            row = db.execute(ACTIVE_MODEL_QUERY, {"name": self.name}).first()
+        finally:
+            db.close()
+        return ModelVersion(version=row[0], artifact_path=row[1]) if row else None
+
+    def load(self, version: ModelVersion, mmap: bool = True) -> Dict:
+        """
+        Loads a version's model, compiled forest and embedding reducer (each None
+        if absent), training columns and categories. With mmap, the large numpy arrays are
+        mapped read-only from the page cache instead of being read into each process.
+        """
+        model = joblib.load(os.path.join(version.artifact_path, MODEL_FILE), mmap_mode="r" if mmap else None)
+        forest_dir = os.path.join(version.artifact_path, COMPILED_FOREST_DIR)
+        compiled_forest = CompiledForest.load(forest_dir, mmap=mmap) if os.path.isdir(forest_dir) else None
+        reducer_path = os.path.join(version.artifact_path, EMBEDDING_REDUCER_FILE)
+        embedding_reducer = EmbeddingReducer.load(reducer_path) if os.path.exists(reducer_path) else None
+        with open(os.path.join(version.artifact_path, TRAINING_COLUMNS_FILE), "r") as f:
+            training_columns = json.load(f)
+        with open(os.path.join(version.artifact_path, CATEGORIES_FILE), "r") as f:
+            categories = json.load(f)
+        return {
+            "model": model,
+            "compiled_forest": compiled_forest,
+            "embedding_reducer": embedding_reducer,
+            "training_columns": training_columns,
+            "categories": categories,
+        }
+
+
+class ModelWatcher:
+    """
+    Background thread that polls the registry for a newly activated version
+    and hands it to `on_change`. Failures are logged and retried on the next
+    poll, so a bad artifact never takes the current model down.
+    """
+
+    def __init__(self, registry: ModelRegistry, on_change: Callable[[ModelVersion], None],
+                 current_version: Callable[[], str | None], interval_seconds: float):
+        self.registry = registry
+        self.on_change = on_change
+        self.current_version = current_version
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def check(self) -> bool:
+        """Swaps in the active version if it differs from the loaded one. Returns True on a swap."""
+        try:
+            active = self.registry.active_version()
+            if active is None or active.version == self.current_version():
+                return False
+            self.on_change(active)
+            return True
+        except Exception as e:
+            print(f"Model watcher could not refresh the model: {e}")
+            return False
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.check()
+
+    def start(self):
+        """Starts the watcher thread (idempotent)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -1,116 +1,300 @@
 # from email.mime import text
+import argparse
+import hashlib
 import pandas as pd
-import pickle
+import numpy as np
 import os
 import json
+import time
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import roc_auc_score
 from sklearn.model_selection import train_test_split
+from ..core.config import settings
 from ..core.db import SessionLocal
-import pandas as pd
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
 
 # Import our new feature engineering function
-from .feature_engineering import get_text_embeddings
+from .feature_engineering import encode_texts, get_embedding_provider
+from .feature_encoder import FeatureEncoder
+from .feature_store import StoredFeatures, TrainingFeatureStore
+from .compiled_forest import CompiledForest
+from .embedding_reducer import EmbeddingReducer
+from .registry import ModelRegistry
 
 MODEL_NAME = "trial_success_predictor_hybrid"
 MODEL_VERSION = "v2.0" # New model version
 MODEL_ARTIFACT_DIR = "./models_volume"
-MODEL_ARTIFACT_PATH = f"{MODEL_ARTIFACT_DIR}/{MODEL_NAME}_{MODEL_VERSION}.pkl"
-TRAINING_COLUMNS_PATH = f"{MODEL_ARTIFACT_DIR}/training_columns_v2.json"
-CATEGORIES_PATH = f"{MODEL_ARTIFACT_DIR}/categories.json"
+FEATURE_STORE_PATH = f"{MODEL_ARTIFACT_DIR}/training_features_v2.npz"
 
-def run_training_pipeline():
-    """
-    The main function to execute the HYBRID model training pipeline using REAL data.
-    """
-    print("Starting HYBRID model training pipeline with database data...")
-    db = SessionLocal()
-    
-    try:
-        # --- THIS IS THE FIX: Refresh the materialized view before querying ---
-        print("Refreshing mechanism_crowding view to ensure data is fresh...")
-        db.execute(text("REFRESH MATERIALIZED VIEW mechanism_crowding;"))
-        db.commit()
-        print("View refreshed.")
-        # -------------------------------------------------------------------
-
-        # 1. Load Data from the database
-        query = """
-        SELECT
-            t.trial_id, t.trial_description, t.phase, t.indication, t.sponsor_size, t.outcome,
-            i.success_rate as investigator_success_rate,
-            mc.crowding_risk_score as mechanism_crowding_score
-        FROM trials t
-        LEFT JOIN investigators i ON t.investigator_id = i.investigator_id
-        LEFT JOIN mechanism_crowding mc ON t.mechanism_of_action = mc.mechanism_of_action AND t.phase = mc.phase
-        WHERE t.phase = 'Phase II' AND t.outcome IS NOT NULL;
-        """
-        df = pd.read_sql(query, db.connection())
-    finally:
-        db.close()
+# Every trained model is published here as a new version (see registry.py)
+model_registry = ModelRegistry(MODEL_NAME)
+
+TRAINING_MODES = ("full", "incremental")
+N_ESTIMATORS = 100
+# Trees added per incremental run, and the forest size at which we refit from scratch instead
+INCREMENTAL_TREES = 20
+MAX_ESTIMATORS = 300
+
+# row_hash covers every raw input of a training row, so a changed hash means the
+# row must be re-encoded (or its label has changed)
+TRAINING_COLUMNS_SQL = """
+    t.trial_id, t.trial_description, t.phase, t.indication, t.sponsor_size, t.outcome,
+    i.success_rate as investigator_success_rate,
+    mc.crowding_risk_score as mechanism_crowding_score,
+    md5(ROW(t.trial_description, t.phase, t.indication, t.sponsor_size, t.outcome,
+            i.success_rate, mc.crowding_risk_score)::text) as row_hash
+"""
+TRAINING_FROM_SQL = """
+    FROM trials t
+    LEFT JOIN investigators i ON t.investigator_id = i.investigator_id
+    LEFT JOIN mechanism_crowding mc ON t.mechanism_of_action = mc.mechanism_of_action AND t.phase = mc.phase
+    WHERE t.phase = 'Phase II' AND t.outcome IS NOT NULL
+"""
+TRAINING_DATA_QUERY = f"SELECT {TRAINING_COLUMNS_SQL} {TRAINING_FROM_SQL}"
+TRAINING_HASHES_QUERY = f"""
+    SELECT t.trial_id, md5(ROW(t.trial_description, t.phase, t.indication, t.sponsor_size, t.outcome,
+                               i.success_rate, mc.crowding_risk_score)::text) as row_hash
+    {TRAINING_FROM_SQL}
+"""
+TRAINING_ROWS_BY_ID_QUERY = text(
+    f"SELECT {TRAINING_COLUMNS_SQL} {TRAINING_FROM_SQL} AND t.trial_id IN :trial_ids"
+).bindparams(bindparam("trial_ids", expanding=True))
 
-    if df.empty:
-        print("No training data found in the database. Aborting training.")
-        return
 
+def _prepare_frame(df: pd.DataFrame) -> pd.DataFrame:
     # Convert outcome to target variable
     df['target'] = df['outcome'].apply(lambda x: 1 if x == 'Success' else 0)
+    df['trial_description'] = df['trial_description'].fillna("") # Same as encode_texts at prediction time
     df.fillna(0, inplace=True) # Simple imputation for missing data
+    return df
+
+
+def _layout_signature(encoder: FeatureEncoder) -> str:
+    """Stored rows are only reusable with the same column layout, embedding model and reduction."""
+    digest = hashlib.sha256(json.dumps(encoder.training_columns).encode("utf-8"))
+    digest.update(get_embedding_provider().model_id.encode("utf-8"))
+    if encoder.embedding_reducer is not None:
+        digest.update(encoder.embedding_reducer.fingerprint().encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _fit_embedding_reducer(embeddings: np.ndarray) -> EmbeddingReducer | None:
+    """Fits the configured EMBEDDING_REDUCTION, if any, on the raw training embeddings."""
+    if not settings.EMBEDDING_REDUCTION:
+        return None
+    reducer = EmbeddingReducer.fit(embeddings, settings.EMBEDDING_REDUCTION, settings.EMBEDDING_REDUCTION_DIM)
+    print(f"Reducing {reducer.input_dim} embedding dimensions to {reducer.n_components} with {reducer.method}.")
+    return reducer
+
+
+def _oob_auc(model: RandomForestClassifier, y: np.ndarray) -> float | None:
+    """ROC AUC of the out-of-bag predictions: a held-out estimate without a held-out split."""
+    oob = getattr(model, 'oob_decision_function_', None)
+    if oob is None or len(model.classes_) != 2:
+        return None
+    # Rows that were in every tree's bootstrap get no OOB vote, and sklearn scores them
+    # as all zeros rather than NaN. Each vote is a distribution summing to 1, so a row's
+    # total is zero exactly when its vote count is
+    scored = oob.sum(axis=1) > 0
+    if len(np.unique(y[scored])) < 2:
+        return None
+    return float(roc_auc_score(y[scored], oob[scored, 1]))
+
+
+def _directory_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(directory, filename))
+        for directory, _, filenames in os.walk(path) for filename in filenames
+    )
+
+
+def _fit_forest(model: RandomForestClassifier, X: np.ndarray, y: np.ndarray) -> float:
+    started = time.perf_counter()
+    model.fit(X, y)
+    return time.perf_counter() - started
+
+
+def _publish_model(model: RandomForestClassifier, encoder: FeatureEncoder, X: np.ndarray, y: np.ndarray,
+                   mode: str, fit_seconds: float):
+    # We can't calculate a true test accuracy, so we'll check training accuracy instead.
+    # This should be high (likely 1.0) and confirms the model is learning.
+    train_accuracy = model.score(X, y)
+    auc = _oob_auc(model, y)
+    print(f"Hybrid Model training accuracy: {train_accuracy:.4f}, out-of-bag AUC: {'n/a' if auc is None else f'{auc:.4f}'}")
+
+    # Export the forest as flat arrays for the low-latency evaluator in predict.py
+    compiled_forest = CompiledForest.from_sklearn(model)
+    reducer = encoder.embedding_reducer
+    published = model_registry.publish(
+        MODEL_VERSION, model, encoder.training_columns, encoder.categories,
+        metrics={"auc": auc},
+        notes=(
+            f"{mode} fit: {len(X)} samples, {X.shape[1]} features "
+            f"({'no embedding reduction' if reducer is None else f'{reducer.method} to {reducer.n_components} dims'}), "
+            f"{model.n_estimators} trees in {fit_seconds:.1f}s, training accuracy {train_accuracy:.4f}"
+        ),
+        compiled_forest=compiled_forest,
+        embedding_reducer=reducer,
+    )
+    size_mb = _directory_size(published.artifact_path) / 1e6
+    print(f"Hybrid Model {published.version} published to {published.artifact_path} "
+          f"({size_mb:.1f} MB, {X.shape[1]} features, fitted in {fit_seconds:.1f}s)")
+
+
+def _run_full(db) -> None:
+    # 1. Load Data from the database
+    df = pd.read_sql(TRAINING_DATA_QUERY, db.connection())
+    if df.empty:
+        print("No training data found in the database. Aborting training.")
+        return
+
+    df = _prepare_frame(df)
     df['phase'] = pd.Categorical(df['phase'])
     df['indication'] = pd.Categorical(df['indication'])
 
-    # Store the categories for each column
+    # The categories for each column (published with the model)
     categories = {
         'phase': df['phase'].cat.categories.tolist(),
         'indication': df['indication'].cat.categories.tolist()
     }
-    with open(CATEGORIES_PATH, 'w') as f:
-        json.dump(categories, f)
-    print(f"Categories saved to {CATEGORIES_PATH}")
 
     # 2. Engineer Features
-    
-    # a) Structured Features (same as before)
-    structured_features_df = pd.get_dummies(
-        df[['phase', 'indication', 'sponsor_size', 'investigator_success_rate', 'mechanism_crowding_score']],
-        columns=['phase', 'indication'], # Explicitly name the columns to encode
-        drop_first=False
-    )
-    # ------------------------------------
 
-     # b) Text Features
-    text_embeddings_df = get_text_embeddings(df['trial_description'])
+    # a) Text Features
+    embeddings = encode_texts(df['trial_description'].tolist())
 
-    # c) Combine Features
-    X = pd.concat([structured_features_df, text_embeddings_df], axis=1)
-    y = df['target']
-
-    # 3. Save Training Columns (Critical for prediction)
-    training_columns = X.columns.tolist()
-    with open(TRAINING_COLUMNS_PATH, 'w') as f:
-        json.dump(training_columns, f)
-    print(f"Training columns (v2) saved to {TRAINING_COLUMNS_PATH}")
+    # b) Structured + text features, via the same encoder predict.py uses,
+    #    optionally with the embeddings reduced to a few dimensions
+    encoder = FeatureEncoder.from_categories(
+        categories, embedding_dim=embeddings.shape[1], embedding_reducer=_fit_embedding_reducer(embeddings)
+    )
+    X = encoder.transform(df.to_dict('records'), embeddings)
+    y = df['target'].to_numpy()
 
-    # --- THIS IS THE FIX ---
-    # 4. Train Model on the FULL dataset
+    # 3. Train Model on the FULL dataset
     # With a very small seed dataset, we will train on all of it.
     # A train/test split is only meaningful with more data.
     print(f"Training model on {len(X)} samples...")
-    model = RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42)
-    model.fit(X, y)
+    # oob_score doesn't change the trees; it gives us an AUC estimate for free
+    model = RandomForestClassifier(n_estimators=N_ESTIMATORS, max_depth=10, random_state=42, oob_score=True)
+    fit_seconds = _fit_forest(model, X, y)
 
-    # We can't calculate a true test accuracy, so we'll check training accuracy instead.
-    # This should be high (likely 1.0) and confirms the model is learning.
-    train_accuracy = model.score(X, y)
-    print(f"Hybrid Model training accuracy: {train_accuracy:.4f}")
-    # -------------------------
+    # 4. Publish the model with its training columns and categories (critical for
+    # prediction), and keep the encoded rows for the next incremental run
+    _publish_model(model, encoder, X, y, mode="full", fit_seconds=fit_seconds)
+    TrainingFeatureStore(FEATURE_STORE_PATH).save(StoredFeatures(
+        trial_ids=df['trial_id'].to_numpy(dtype=str),
+        row_hashes=df['row_hash'].to_numpy(dtype=str),
+        X=X,
+        y=y,
+        layout=_layout_signature(encoder),
+    ))
+
+
+def _run_incremental(db) -> bool:
+    """
+    Re-encodes only new and changed trials and grows the existing forest with
+    warm_start. Returns False when a full refit is needed instead.
+    """
+    stored = TrainingFeatureStore(FEATURE_STORE_PATH).load()
+    active = model_registry.active_version()
+    if stored is None or active is None:
+        print("No stored features or published model to build on.")
+        return False
 
-    # 5. Save Model Artifact
-    os.makedirs(MODEL_ARTIFACT_DIR, exist_ok=True)
-    with open(MODEL_ARTIFACT_PATH, 'wb') as f:
-        pickle.dump(model, f)
-    
-    print(f"Hybrid Model artifact saved to {MODEL_ARTIFACT_PATH}")
+    # Loaded into memory rather than memory-mapped: the forest is about to grow
+    assets = model_registry.load(active, mmap=False)
+    model = assets['model']
+    # The layout stays fixed between full refits, so the existing trees stay valid.
+    # Categories first seen since then encode as all-zero, exactly as at prediction time.
+    encoder = FeatureEncoder(assets['training_columns'], assets['categories'], assets['embedding_reducer'])
+    if stored.layout != _layout_signature(encoder):
+        print("Stored features were encoded with a different layout or embedding model.")
+        return False
+    if model.n_estimators + INCREMENTAL_TREES > MAX_ESTIMATORS:
+        print(f"Forest already has {model.n_estimators} trees.")
+        return False
+
+    # 1. Compare current row hashes against the store; only the differences are read in full
+    current = pd.read_sql(TRAINING_HASHES_QUERY, db.connection())
+    if current.empty:
+        print("No training data found in the database.")
+        return False
+    stored_hashes = dict(zip(stored.trial_ids, stored.row_hashes))
+    changed_ids = [
+        trial_id for trial_id, row_hash in zip(current['trial_id'], current['row_hash'])
+        if stored_hashes.get(trial_id) != row_hash
+    ]
+    keep = np.isin(stored.trial_ids, current['trial_id'].to_numpy(dtype=str)) & ~np.isin(stored.trial_ids, changed_ids)
+    if not changed_ids and keep.all():
+        print("No new or changed trials since the last run. Model is up to date.")
+        return True
+    print(f"{len(changed_ids)} new or changed trials, {int((~keep).sum())} stored rows dropped or replaced.")
+
+    # 2. Encode just the new and changed rows
+    trial_ids, row_hashes = stored.trial_ids[keep], stored.row_hashes[keep]
+    X, y = stored.X[keep], stored.y[keep]
+    if changed_ids:
+        df = _prepare_frame(pd.read_sql(TRAINING_ROWS_BY_ID_QUERY, db.connection(), params={"trial_ids": changed_ids}))
+        embeddings = encode_texts(df['trial_description'].tolist())
+        X = np.vstack([X, encoder.transform(df.to_dict('records'), embeddings)])
+        y = np.concatenate([y, df['target'].to_numpy()])
+        trial_ids = np.concatenate([trial_ids, df['trial_id'].to_numpy(dtype=str)])
+        row_hashes = np.concatenate([row_hashes, df['row_hash'].to_numpy(dtype=str)])
+
+    if set(np.unique(y)) != set(model.classes_):
+        print("The set of outcome classes has changed.")
+        return False
+
+    # 3. Grow the forest: new trees see every current row, existing trees are kept
+    print(f"Adding {INCREMENTAL_TREES} trees to the existing {model.n_estimators} on {len(X)} samples...")
+    model.warm_start = True
+    model.n_estimators += INCREMENTAL_TREES
+    # sklearn would rebuild the old trees' out-of-bag rows for the new row set, where they
+    # no longer match what those trees were fitted on, inflating the AUC. Record none instead
+    model.oob_score = False
+    for attribute in ('oob_score_', 'oob_decision_function_'):
+        if hasattr(model, attribute):
+            delattr(model, attribute)
+    fit_seconds = _fit_forest(model, X, y)
+    model.warm_start = False
+
+    _publish_model(model, encoder, X, y, mode="incremental", fit_seconds=fit_seconds)
+    TrainingFeatureStore(FEATURE_STORE_PATH).save(StoredFeatures(
+        trial_ids=trial_ids, row_hashes=row_hashes, X=X, y=y, layout=stored.layout
+    ))
+    return True
+
+
+def run_training_pipeline(mode: str = "full"):
+    """
+    The main function to execute the HYBRID model training pipeline using REAL data.
+    - mode="full": re-reads and re-encodes every training trial and fits a new forest.
+    - mode="incremental": reuses stored feature rows, encodes only new or changed
+      trials and grows the existing forest. Falls back to a full refit when there
+      is nothing to build on or the forest has grown too large.
+    """
+    if mode not in TRAINING_MODES:
+        raise ValueError(f"Unknown training mode '{mode}'. Expected one of: {', '.join(TRAINING_MODES)}.")
+    print(f"Starting HYBRID model training pipeline ({mode}) with database data...")
+    db = SessionLocal()
+
+    try:
+        # mechanism_crowding is maintained incrementally by triggers on trials,
+        # so it is already current and needs no refresh here.
+        if mode == "incremental":
+            if _run_incremental(db):
+                return
+            print("Falling back to a full refit.")
+        _run_full(db)
+    finally:
+        db.close()
 
 if __name__ == "__main__":
-    run_training_pipeline()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the trial success prediction model.")
+    parser.add_argument(
+        "--mode", choices=TRAINING_MODES, default="full",
+        help="'full' refits from scratch; 'incremental' only encodes new and changed trials and grows the forest."
+    )
+    args = parser.parse_args()
+    run_training_pipeline(mode=args.mode)
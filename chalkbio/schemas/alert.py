@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import List
 import uuid
 
 class AlertResponse(BaseModel):
@@ -10,4 +11,9 @@ class AlertResponse(BaseModel):
     clicked_at: datetime | None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class AlertPage(BaseModel):
+    items: List[AlertResponse]
+    # Pass back as `cursor` to fetch the next page; None on the last page
+    next_cursor: str | None = None
@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from datetime import date
 
 class CrowdingIndexResponse(BaseModel):
     mechanism_of_action: str
@@ -7,4 +8,14 @@ class CrowdingIndexResponse(BaseModel):
     crowding_risk_score: int
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class CrowdingHistoryPoint(BaseModel):
+    snapshot_date: date
+    mechanism_of_action: str
+    phase: str
+    competitor_count: int
+    crowding_risk_score: int
+
+    class Config:
+        from_attributes = True
@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import List
 
 class PredictionResponse(BaseModel):
     trial_id: str
@@ -11,4 +12,19 @@ class PredictionResponse(BaseModel):
     created_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# Upper bound on how many trials can be scored in one batch request
+MAX_BATCH_SIZE = 500
+
+class BatchPredictionRequest(BaseModel):
+    trial_ids: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+class BatchPredictionItem(BaseModel):
+    trial_id: str
+    found: bool
+    prediction: PredictionResponse | None = None
+    detail: str | None = None
+
+class BatchPredictionResponse(BaseModel):
+    results: List[BatchPredictionItem]
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import List
 import uuid
 
 # Schema for data we expect when a user adds an item
@@ -17,4 +18,21 @@ class WatchlistResponse(BaseModel):
     added_at: datetime
 
     class Config:
-        from_attributes = True # Formerly orm_mode = True
\ No newline at end of file
+        from_attributes = True # Formerly orm_mode = True
+
+# A page of watchlist items, with the cursor for the next page
+class WatchlistPage(BaseModel):
+    items: List[WatchlistResponse]
+    next_cursor: str | None = None
+
+# Schema for the number of users actively watching an entity
+class WatcherCountResponse(BaseModel):
+    entity_type: str
+    entity_id: str
+    watcher_count: int
+
+# One entry in the "Most Watched" trending list
+class MostWatchedEntry(BaseModel):
+    entity_type: str
+    entity_id: str
+    score: float
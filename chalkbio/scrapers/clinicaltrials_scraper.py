@@ -1,54 +1,192 @@
-import requests
-import time
+import itertools
+import json
 import logging
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Tuple
+
+import requests
+
+from ..core.config import settings
+from .http_client import (
+    BACKOFF_BASE_SECONDS, MAX_RETRIES, ScrapeError, make_session, request_with_retries
+)
+from .rate_limit import TokenBucket
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 API_URL = "https://clinicaltrials.gov/api/query/study_fields"
-# In production, use a more robust rate limiter.
-# This simple sleep is for demonstration.
-RATE_LIMIT_DELAY_SECONDS = 0.05  # 1 request per 50ms = 20 req/sec
+PAGE_SIZE = 1000
+
+# One limiter for every worker (and every scrape) in this process
+clinicaltrials_limiter = TokenBucket(rate=settings.CLINICALTRIALS_REQUESTS_PER_SECOND)
 
-def fetch_recent_trials(pages: int = 1):
-    """
-    Scrapes the latest trial data from ClinicalTrials.gov.
 
-    In a real application, this would handle pagination, data cleaning,
-    and upserting records into the 'investigators' and 'trials' tables.
+class ScrapeCheckpoint:
+    """
+    Records the last page whose trials have been stored, so an interrupted
+    scrape resumes after it instead of starting over. The file is replaced
+    atomically. Saving and clearing are up to the consumer, which alone knows
+    when a page's trials are safely committed.
     """
-    logger.info("Starting scrape of ClinicalTrials.gov...")
-    all_trials = []
 
-    for page in range(1, pages + 1):
-        params = {
-            "expr": "AREA[LastUpdatePostDate]RANGE[01/01/2020, MAX]",
-            "fields": "NCTId,LeadSponsorName,OverallStatus,CentralContactName,PrimaryCompletionDate",
-            "min_rnk": (page - 1) * 1000 + 1,
-            "max_rnk": page * 1000,
-            "fmt": "json"
-        }
+    def __init__(self, path: str):
+        self.path = path
+
+    def last_completed_page(self) -> int:
         try:
-            response = requests.get(API_URL, params=params)
-            response.raise_for_status()
-            data = response.json().get("StudyFieldsResponse", {}).get("StudyFields", [])
-            if not data:
+            with open(self.path, "r") as f:
+                return int(json.load(f)["last_completed_page"])
+        except FileNotFoundError:
+            return 0
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable scrape checkpoint {self.path}: {e}")
+            return 0
+
+    def save(self, page: int):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"last_completed_page": page}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _page_params(page: int) -> dict:
+    return {
+        "expr": "AREA[LastUpdatePostDate]RANGE[01/01/2020, MAX]",
+        "fields": (
+            "NCTId,BriefTitle,BriefSummary,Phase,OverallStatus,Condition,LeadSponsorName,"
+            "CentralContactName,OverallOfficialName,OverallOfficialAffiliation,PrimaryCompletionDate"
+        ),
+        "min_rnk": (page - 1) * PAGE_SIZE + 1,
+        "max_rnk": page * PAGE_SIZE,
+        "fmt": "json"
+    }
+
+
+def fetch_page(
+    session: requests.Session,
+    page: int,
+    limiter: TokenBucket,
+    api_url: str = API_URL,
+    max_retries: int = MAX_RETRIES,
+    backoff_base: float = BACKOFF_BASE_SECONDS,
+) -> List[dict]:
+    """
+    Fetches one page of study fields, retrying transient failures. Raises
+    ScrapeError when the page cannot be fetched.
+    """
+    response = request_with_retries(
+        session, "GET", api_url, limiter, f"page {page} from ClinicalTrials.gov",
+        max_retries=max_retries, backoff_base=backoff_base, params=_page_params(page)
+    )
+    try:
+        return response.json().get("StudyFieldsResponse", {}).get("StudyFields", [])
+    except ValueError as e:
+        raise ScrapeError(f"Failed to parse page {page} from ClinicalTrials.gov: {e}") from e
+
+
+def iter_trial_pages(
+    max_pages: int | None = None,
+    start_page: int | None = None,
+    concurrency: int | None = None,
+    checkpoint_path: str | None = None,
+    session: requests.Session | None = None,
+    limiter: TokenBucket | None = None,
+    api_url: str = API_URL,
+    max_retries: int = MAX_RETRIES,
+    backoff_base: float = BACKOFF_BASE_SECONDS,
+) -> Iterator[Tuple[int, List[dict]]]:
+    """
+    Streams (page_number, trials) from ClinicalTrials.gov in page order.
+
+    Up to `concurrency` pages are in flight at once over one pooled session,
+    all drawing from the same rate limiter. Nothing is accumulated: each page
+    is yielded as soon as it and every page before it have arrived. With a
+    `checkpoint_path`, the scrape resumes after the page last saved there; the
+    consumer advances the checkpoint (see ScrapeCheckpoint).
+    """
+    concurrency = concurrency or settings.CLINICALTRIALS_CONCURRENCY
+    limiter = limiter or clinicaltrials_limiter
+    if start_page is None:
+        start_page = ScrapeCheckpoint(checkpoint_path).last_completed_page() + 1 if checkpoint_path else 1
+        if start_page > 1:
+            logger.info(f"Resuming ClinicalTrials.gov scrape from page {start_page}.")
+    if max_pages is None:
+        pages = itertools.count(start_page)
+    else:
+        pages = iter(range(start_page, start_page + max_pages))
+
+    own_session = session is None
+    session = session or make_session(concurrency)
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ctgov-scraper")
+    in_flight = deque()
+
+    def submit(page):
+        in_flight.append((page, executor.submit(
+            fetch_page, session, page, limiter, api_url, max_retries, backoff_base
+        )))
+
+    try:
+        for page in itertools.islice(pages, concurrency):
+            submit(page)
+
+        while in_flight:
+            page, future = in_flight.popleft()
+            trials = future.result()
+            if not trials:
                 logger.info("No more data found. Ending scrape.")
-                break
+                return
+            next_page = next(pages, None)
+            if next_page is not None:
+                submit(next_page)
 
-            all_trials.extend(data)
-            logger.info(f"Successfully fetched page {page}, found {len(data)} trials.")
+            logger.info(f"Successfully fetched page {page}, found {len(trials)} trials.")
+            yield page, trials
+    finally:
+        for _, future in in_flight:
+            future.cancel()
+        executor.shutdown(wait=True)
+        if own_session:
+            session.close()
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Failed to fetch data from ClinicalTrials.gov on page {page}: {e}")
-            break  # Stop on error
-        finally:
-            time.sleep(RATE_LIMIT_DELAY_SECONDS)
+
+def iter_recent_trials(**kwargs) -> Iterator[dict]:
+    """Streams individual trial records; accepts the same arguments as iter_trial_pages."""
+    for _, trials in iter_trial_pages(**kwargs):
+        yield from trials
+
+
+def fetch_recent_trials(pages: int = 1):
+    """
+    Scrapes the latest trial data from ClinicalTrials.gov into a list.
+
+    Kept for callers that want everything at once; prefer iter_trial_pages or
+    iter_recent_trials for large scrapes. A page that still fails after its
+    retries ends the scrape, and whatever was fetched before it is returned.
+    """
+    logger.info("Starting scrape of ClinicalTrials.gov...")
+    all_trials = []
+    try:
+        for _, trials in iter_trial_pages(max_pages=pages):
+            all_trials.extend(trials)
+    except ScrapeError as e:
+        logger.error(str(e))
 
     logger.info(f"Scrape complete. Total trials fetched: {len(all_trials)}")
     return all_trials
 
 if __name__ == "__main__":
     recent_trials = fetch_recent_trials(pages=2) # Fetch first 2000 results
-    # print(recent_trials[:5])
\ No newline at end of file
+    # print(recent_trials[:5])
@@ -0,0 +1,82 @@
+import logging
+import random
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT_SECONDS = 30
+
+# Retries: transient failures back off exponentially with full jitter
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30.0
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class ScrapeError(Exception):
+    """Raised when a request still fails after all retries, or fails permanently."""
+
+
+def make_session(pool_size: int) -> requests.Session:
+    """A Session whose connection pool is sized for `pool_size` concurrent workers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _backoff_delay(attempt: int, backoff_base: float, retry_after: str | None = None) -> float:
+    """Full-jitter exponential backoff, or the server's Retry-After when it sends one."""
+    if retry_after:
+        try:
+            return min(BACKOFF_MAX_SECONDS, float(retry_after))
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, backoff_base * 2 ** attempt))
+
+
+def request_with_retries(
+    session: requests.Session,
+    method: str,
+    url: str,
+    limiter: TokenBucket,
+    description: str,
+    max_retries: int = MAX_RETRIES,
+    backoff_base: float = BACKOFF_BASE_SECONDS,
+    **kwargs,
+) -> requests.Response:
+    """
+    Sends one rate-limited request. Connection errors, timeouts, 429s and 5xx
+    responses are retried; any other error, or running out of retries, raises
+    ScrapeError. Extra keyword arguments go to session.request.
+    """
+    kwargs.setdefault("timeout", REQUEST_TIMEOUT_SECONDS)
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        retry_after = None
+        try:
+            response = session.request(method, url, **kwargs)
+            if response.status_code in RETRYABLE_STATUS_CODES:
+                retry_after = response.headers.get("Retry-After")
+                error = f"HTTP {response.status_code}"
+                response.close()
+            else:
+                response.raise_for_status()
+                return response
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            error = str(e)
+        except requests.exceptions.RequestException as e:
+            raise ScrapeError(f"Failed to fetch {description}: {e}") from e
+
+        if attempt < max_retries:
+            delay = _backoff_delay(attempt, backoff_base, retry_after)
+            logger.warning(f"{description} failed ({error}); retrying in {delay:.2f}s (attempt {attempt + 1}/{max_retries}).")
+            time.sleep(delay)
+
+    raise ScrapeError(f"Failed to fetch {description} after {max_retries} retries: {error}")
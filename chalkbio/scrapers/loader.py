@@ -0,0 +1,255 @@
+import hashlib
+import logging
+from typing import Callable, Dict, Iterable, Iterator, List
+
+from ..core.db import engine
+
+logger = logging.getLogger(__name__)
+
+# ClinicalTrials.gov spells phases and statuses differently from the rest of the platform
+PHASE_NAMES = {"Phase 1": "Phase I", "Phase 2": "Phase II", "Phase 3": "Phase III", "Phase 4": "Phase IV"}
+ACTIVE_STATUSES = frozenset({"Recruiting", "Active, not recruiting", "Enrolling by invitation", "Not yet recruiting"})
+
+STAGING_COLUMNS = [
+    "seq", "trial_id", "trial_description", "phase", "status", "indication",
+    "investigator_key", "investigator_name", "institution",
+]
+
+CREATE_STAGING_TABLE = """
+    CREATE TEMP TABLE staging_trials (
+        seq BIGINT NOT NULL,
+        trial_id VARCHAR(50) NOT NULL,
+        trial_description TEXT,
+        phase VARCHAR(50),
+        status VARCHAR(50),
+        indication VARCHAR(255),
+        investigator_key VARCHAR(64),
+        investigator_name VARCHAR(255),
+        institution VARCHAR(255)
+    ) ON COMMIT DROP
+"""
+
+COPY_STAGING = f"COPY staging_trials ({', '.join(STAGING_COLUMNS)}) FROM STDIN"
+
+# The last copy of a key in the stream wins (pages can shift while a scrape runs).
+# The WHERE on DO UPDATE skips rows whose content is unchanged, so they are neither
+# rewritten nor seen by the crowding triggers; xmax = 0 marks a freshly inserted row.
+MERGE_INVESTIGATORS = """
+    WITH src AS (
+        SELECT DISTINCT ON (investigator_key)
+            investigator_key, investigator_name, institution
+        FROM staging_trials
+        WHERE investigator_key IS NOT NULL
+        ORDER BY investigator_key, seq DESC
+    ),
+    merged AS (
+        INSERT INTO investigators AS inv (source_key, name, institution, content_hash)
+        SELECT investigator_key, investigator_name, institution, md5(ROW(investigator_name, institution)::text)
+        FROM src
+        ON CONFLICT (source_key) DO UPDATE SET
+            name = EXCLUDED.name,
+            institution = EXCLUDED.institution,
+            content_hash = EXCLUDED.content_hash,
+            last_updated = NOW()
+        WHERE inv.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+        RETURNING (xmax = 0) AS inserted
+    )
+    SELECT
+        (SELECT COUNT(*) FROM src),
+        COUNT(*) FILTER (WHERE inserted),
+        COUNT(*) FILTER (WHERE NOT inserted)
+    FROM merged
+"""
+
+MERGE_TRIALS = """
+    WITH src AS (
+        SELECT DISTINCT ON (s.trial_id)
+            s.trial_id, s.trial_description, s.phase, s.status, s.indication, i.investigator_id
+        FROM staging_trials s
+        LEFT JOIN investigators i ON i.source_key = s.investigator_key
+        ORDER BY s.trial_id, s.seq DESC
+    ),
+    merged AS (
+        INSERT INTO trials AS t (trial_id, trial_description, phase, status, indication, investigator_id, content_hash)
+        SELECT
+            trial_id, trial_description, phase, status, indication, investigator_id,
+            md5(ROW(trial_description, phase, status, indication, investigator_id)::text)
+        FROM src
+        ON CONFLICT (trial_id) DO UPDATE SET
+            trial_description = EXCLUDED.trial_description,
+            phase = EXCLUDED.phase,
+            status = EXCLUDED.status,
+            indication = EXCLUDED.indication,
+            -- Keep a curated investigator link when the registry does not name one
+            investigator_id = COALESCE(EXCLUDED.investigator_id, t.investigator_id),
+            content_hash = EXCLUDED.content_hash
+        WHERE t.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+        RETURNING (xmax = 0) AS inserted
+    )
+    SELECT
+        (SELECT COUNT(*) FROM src),
+        COUNT(*) FILTER (WHERE inserted),
+        COUNT(*) FILTER (WHERE NOT inserted)
+    FROM merged
+"""
+
+
+def investigator_source_key(name: str, institution: str | None) -> str:
+    """Natural key for an investigator scraped from a registry: name plus institution."""
+    normalized = f"{' '.join(name.lower().split())}\0{' '.join((institution or '').lower().split())}"
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _first(study: dict, field: str) -> str | None:
+    """study_fields returns every field as a list; take the first non-empty value."""
+    values = study.get(field) or []
+    for value in values:
+        if value and str(value).strip():
+            return str(value).strip()
+    return None
+
+
+def normalize_study(study: dict) -> dict | None:
+    """
+    Maps one ClinicalTrials.gov study_fields record onto staging columns,
+    or returns None for records without an NCT ID.
+    """
+    trial_id = _first(study, "NCTId")
+    if not trial_id:
+        return None
+
+    phases = [PHASE_NAMES.get(phase, phase) for phase in study.get("Phase") or [] if phase]
+    status = _first(study, "OverallStatus")
+    investigator_name = _first(study, "OverallOfficialName") or _first(study, "CentralContactName")
+    institution = _first(study, "OverallOfficialAffiliation")
+
+    return {
+        "trial_id": trial_id,
+        "trial_description": _first(study, "BriefSummary") or _first(study, "BriefTitle"),
+        "phase": "/".join(phases) or None,
+        "status": "Active" if status in ACTIVE_STATUSES else status,
+        "indication": _first(study, "Condition"),
+        "investigator_key": investigator_source_key(investigator_name, institution) if investigator_name else None,
+        "investigator_name": investigator_name,
+        "institution": institution,
+    }
+
+
+def _copy_value(value) -> str:
+    """Escapes one value for COPY's text format."""
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+class CopyStream:
+    """
+    File-like adapter that renders staging rows as COPY text lines on demand,
+    so psycopg2's copy_expert can stream a scrape without holding it in memory.
+    """
+
+    def __init__(self, studies: Iterable[dict]):
+        self._studies = iter(studies)
+        self._buffer = ""
+        self._line_iter = self._lines()
+        self.rows = 0
+
+    def _lines(self) -> Iterator[str]:
+        for study in self._studies:
+            row = normalize_study(study)
+            if row is None:
+                continue
+            row["seq"] = self.rows
+            self.rows += 1
+            yield "\t".join(_copy_value(row[col]) for col in STAGING_COLUMNS) + "\n"
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._line_iter, None)
+            if line is None:
+                break
+            self._buffer += line
+        if size < 0:
+            chunk, self._buffer = self._buffer, ""
+        else:
+            chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def _counts(row) -> Dict[str, int]:
+    total, inserted, updated = (int(value or 0) for value in row)
+    return {"inserted": inserted, "updated": updated, "unchanged": total - inserted - updated}
+
+
+def load_trials(studies: Iterable[dict], bind=None) -> Dict[str, Dict[str, int]]:
+    """
+    Upserts scraped studies into investigators and trials in one transaction.
+
+    Studies are streamed into a temporary staging table with COPY, then merged
+    with INSERT ... ON CONFLICT. Rows whose content hash is unchanged are left
+    alone. Returns inserted/updated/unchanged counts per table.
+    """
+    connection = (bind or engine).raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(CREATE_STAGING_TABLE)
+            stream = CopyStream(studies)
+            cursor.copy_expert(COPY_STAGING, stream)
+            cursor.execute("ANALYZE staging_trials")
+
+            cursor.execute(MERGE_INVESTIGATORS)
+            investigators = _counts(cursor.fetchone())
+            cursor.execute(MERGE_TRIALS)
+            trials = _counts(cursor.fetchone())
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    logger.info(f"Loaded {stream.rows} scraped trials. Trials: {trials}. Investigators: {investigators}.")
+    return {"trials": trials, "investigators": investigators}
+
+
+def load_in_batches(
+    studies: Iterable[dict],
+    batch_size: int = 10000,
+    bind=None,
+    on_commit: Callable[[int], None] | None = None,
+) -> Dict[str, Dict[str, int]]:
+    """
+    Runs load_trials over successive batches of a (possibly endless) stream, one
+    transaction per batch, and returns the summed counts. `on_commit` is called
+    after each batch commits with the number of studies committed so far.
+    """
+    totals = {
+        table: {"inserted": 0, "updated": 0, "unchanged": 0} for table in ("trials", "investigators")
+    }
+    batch: List[dict] = []
+    committed = 0
+
+    def flush():
+        nonlocal committed
+        result = load_trials(batch, bind=bind)
+        for table, counts in result.items():
+            for key, value in counts.items():
+                totals[table][key] += value
+        committed += len(batch)
+        batch.clear()
+        if on_commit:
+            on_commit(committed)
+
+    for study in studies:
+        batch.append(study)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return totals
@@ -1,21 +1,93 @@
-import requests
-import time
+import itertools
 import logging
+import re
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Sequence, Set, Tuple
+
+import requests
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
 from ..core.config import settings
+from .http_client import BACKOFF_BASE_SECONDS, MAX_RETRIES, ScrapeError, make_session, request_with_retries
+from .rate_limit import TokenBucket
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-BASE_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
+EUTILS_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+BASE_URL = f"{EUTILS_URL}/esearch.fcgi"
 API_KEY = settings.PUBMED_API_KEY
-# 3 req/sec without API key, 10 req/sec with.
-RATE_LIMIT_DELAY_SECONDS = 0.1 if API_KEY else 0.34
+# 3 req/sec without API key, 10 req/sec with. Every PubMed request in the process shares this.
+REQUESTS_PER_SECOND = 10 if API_KEY else 3
+pubmed_limiter = TokenBucket(rate=REQUESTS_PER_SECOND, capacity=REQUESTS_PER_SECOND)
+
+# Investigators OR-ed into one esearch, and articles per efetch page
+AUTHORS_PER_SEARCH = 50
+EFETCH_PAGE_SIZE = 1000
+HARVEST_CONCURRENCY = 3
+
+# E-utilities return no records past retstart 9,999, even from the history server.
+# Searches matching more are split by investigator, then by publication year.
+EUTILS_MAX_RECORDS = 10000
+EARLIEST_PUBLICATION_YEAR = 1800
+
+NAME_TITLES = {"dr", "prof", "professor", "mr", "mrs", "ms"}
+
+# One row per (pair, article) makes re-harvesting idempotent: only article links
+# not seen before are added to collaboration_count.
+UPSERT_COLLABORATIONS_QUERY = text("""
+WITH links AS (
+    SELECT DISTINCT LEAST(a_id, b_id) AS a_id, GREATEST(a_id, b_id) AS b_id, pmid
+    FROM unnest(CAST(:pmids AS BIGINT[]), CAST(:a_ids AS UUID[]), CAST(:b_ids AS UUID[])) AS l(pmid, a_id, b_id)
+    WHERE a_id <> b_id
+),
+new_links AS (
+    INSERT INTO investigator_collaboration_articles (investigator_a_id, investigator_b_id, pmid)
+    SELECT a_id, b_id, pmid FROM links
+    ON CONFLICT DO NOTHING
+    RETURNING investigator_a_id, investigator_b_id
+),
+increments AS (
+    INSERT INTO investigator_collaborations AS c (investigator_a_id, investigator_b_id, collaboration_count)
+    SELECT investigator_a_id, investigator_b_id, COUNT(*) FROM new_links
+    GROUP BY investigator_a_id, investigator_b_id
+    ON CONFLICT (investigator_a_id, investigator_b_id) DO UPDATE SET
+        collaboration_count = c.collaboration_count + EXCLUDED.collaboration_count
+    RETURNING 1
+)
+SELECT (SELECT COUNT(*) FROM new_links), (SELECT COUNT(*) FROM increments);
+""")
+
+ACTIVE_INVESTIGATORS_QUERY = text("SELECT investigator_id, name FROM investigators WHERE name IS NOT NULL;")
+
+
+def name_key(name: str) -> Tuple[str, str] | None:
+    """
+    (last name, first initial) for a registry-style name such as
+    "Dr. Jane Smith, MD". PubMed authors are matched on the same key.
+    """
+    name = name.split(",")[0]
+    tokens = [t for t in re.split(r"[\s.]+", name.lower()) if t and t not in NAME_TITLES]
+    if len(tokens) < 2:
+        return None
+    return tokens[-1], tokens[0][0]
+
+
+def _author_key(author: ET.Element) -> Tuple[str, str] | None:
+    last_name = author.findtext("LastName")
+    initials = author.findtext("Initials") or author.findtext("ForeName")
+    if not last_name or not initials:
+        return None
+    return last_name.lower(), initials[0].lower()
+
 
 def find_coauthors(investigator_name: str):
     """
-    Finds publication IDs for a given author on PubMed.
-    A full implementation would use these IDs to fetch publication details
-    and build the collaboration network.
+    Finds publication IDs for a given author on PubMed. For building the
+    collaboration network across many investigators, use harvest_collaborations.
     """
     logger.info(f"Searching PubMed for author: {investigator_name}")
     params = {
@@ -26,18 +98,233 @@ def find_coauthors(investigator_name: str):
         "api_key": API_KEY
     }
     try:
-        response = requests.get(BASE_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
-        id_list = data.get("esearchresult", {}).get("idlist", [])
+        with requests.Session() as session:
+            response = request_with_retries(
+                session, "GET", BASE_URL, pubmed_limiter, f"PubMed search for '{investigator_name}'", params=params
+            )
+        id_list = response.json().get("esearchresult", {}).get("idlist", [])
         logger.info(f"Found {len(id_list)} publications for {investigator_name}.")
         return id_list
-    except requests.exceptions.RequestException as e:
+    except (ScrapeError, ValueError) as e:
         logger.error(f"Failed to fetch data from PubMed for '{investigator_name}': {e}")
         return []
-    finally:
-        time.sleep(RATE_LIMIT_DELAY_SECONDS)
+
+
+def parse_author_lists(stream) -> Iterator[Tuple[int, List[Tuple[str, str]]]]:
+    """
+    Streams (pmid, author keys) out of efetch PubmedArticleSet XML with
+    iterparse, clearing each article once read so memory stays flat.
+    """
+    for _, elem in ET.iterparse(stream, events=("end",)):
+        if elem.tag != "PubmedArticle":
+            continue
+        pmid = elem.findtext("MedlineCitation/PMID")
+        if pmid:
+            keys = [_author_key(author) for author in elem.iterfind("MedlineCitation/Article/AuthorList/Author")]
+            yield int(pmid), [key for key in keys if key]
+        elem.clear()
+
+
+class CollaborationHarvester:
+    """
+    Finds co-authorships between known investigators on PubMed.
+
+    Investigators are OR-ed together into batched esearch queries kept on the
+    NCBI history server (WebEnv/query_key), and the matching articles are pulled
+    with efetch in large pages and parsed as a stream. Batches run concurrently
+    over one pooled session, all drawing from the shared PubMed rate limiter.
+    """
+
+    def __init__(
+        self,
+        session: requests.Session | None = None,
+        limiter: TokenBucket | None = None,
+        base_url: str = EUTILS_URL,
+        authors_per_search: int = AUTHORS_PER_SEARCH,
+        page_size: int = EFETCH_PAGE_SIZE,
+        concurrency: int = HARVEST_CONCURRENCY,
+        max_retries: int = MAX_RETRIES,
+        backoff_base: float = BACKOFF_BASE_SECONDS,
+    ):
+        self.session = session or make_session(concurrency)
+        self.limiter = limiter or pubmed_limiter
+        self.base_url = base_url
+        self.authors_per_search = authors_per_search
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+
+    def _post(self, endpoint: str, data: dict, description: str, **kwargs) -> requests.Response:
+        if API_KEY:
+            data = {**data, "api_key": API_KEY}
+        # POST, because a batch of OR-ed author terms is too long for a query string
+        return request_with_retries(
+            self.session, "POST", f"{self.base_url}/{endpoint}", self.limiter, description,
+            max_retries=self.max_retries, backoff_base=self.backoff_base, data=data, **kwargs
+        )
+
+    def _search(
+        self, author_keys: Sequence[Tuple[str, str]], years: Tuple[int, int] | None = None
+    ) -> Tuple[int, str, str]:
+        term = " OR ".join(f"{last} {initial}[Author]" for last, initial in author_keys)
+        if years:
+            term = f'({term}) AND ("{years[0]}"[PDAT] : "{years[1]}"[PDAT])'
+        response = self._post(
+            "esearch.fcgi",
+            {"db": "pubmed", "term": term, "usehistory": "y", "retmax": 0, "retmode": "json"},
+            "PubMed esearch",
+        )
+        try:
+            result = response.json()["esearchresult"]
+            return int(result["count"]), result["webenv"], result["querykey"]
+        except (ValueError, KeyError) as e:
+            raise ScrapeError(f"Unexpected PubMed esearch response: {e}") from e
+
+    def _fetch_page(self, webenv: str, query_key: str, retstart: int) -> Iterator[Tuple[int, List[Tuple[str, str]]]]:
+        response = self._post(
+            "efetch.fcgi",
+            {
+                "db": "pubmed", "WebEnv": webenv, "query_key": query_key,
+                "retstart": retstart, "retmax": self.page_size, "retmode": "xml",
+            },
+            f"PubMed efetch page at {retstart}",
+            stream=True,
+        )
+        with response:
+            response.raw.decode_content = True
+            try:
+                yield from parse_author_lists(response.raw)
+            except ET.ParseError as e:
+                raise ScrapeError(f"Could not parse PubMed efetch page at {retstart}: {e}") from e
+
+    def _harvest_batch(
+        self,
+        author_keys: Sequence[Tuple[str, str]],
+        investigators_by_key: Dict,
+        years: Tuple[int, int] | None = None,
+    ) -> List[Tuple[int, str, str]]:
+        count, webenv, query_key = self._search(author_keys, years)
+        if count > EUTILS_MAX_RECORDS:
+            if len(author_keys) > 1:
+                middle = len(author_keys) // 2
+                halves = [(author_keys[:middle], years), (author_keys[middle:], years)]
+            else:
+                first, last = years or (EARLIEST_PUBLICATION_YEAR, date.today().year)
+                middle = (first + last) // 2
+                halves = [(author_keys, (first, middle)), (author_keys, (middle + 1, last))] if first < last else []
+            if halves:
+                logger.info(f"PubMed search matched {count} articles; splitting it in two.")
+                return [
+                    link for keys, span in halves for link in self._harvest_batch(keys, investigators_by_key, span)
+                ]
+            logger.warning(
+                f"PubMed search for {author_keys[0]} in {first} matched {count} articles; "
+                f"only the first {EUTILS_MAX_RECORDS} can be fetched."
+            )
+            count = EUTILS_MAX_RECORDS
+
+        links = []
+        for retstart in range(0, count, self.page_size):
+            for pmid, keys in self._fetch_page(webenv, query_key, retstart):
+                ids = sorted({investigators_by_key[key] for key in keys if key in investigators_by_key})
+                links.extend((pmid, a, b) for a, b in itertools.combinations(ids, 2))
+        logger.info(f"PubMed batch of {len(author_keys)} investigators: {count} articles, {len(links)} collaboration links.")
+        return links
+
+    def harvest_batches(
+        self, investigators: Iterable[Tuple[str, str]]
+    ) -> Iterator[Tuple[List[Tuple[int, str, str]], ScrapeError | None]]:
+        """
+        Yields (links, error) for each batch of investigators as it completes:
+        the batch's (pmid, investigator_a_id, investigator_b_id) links not already
+        yielded, or the ScrapeError that failed it, so one bad batch does not
+        cost the others. Names that map to the same author key are skipped as
+        ambiguous.
+        """
+        investigators_by_key: Dict[Tuple[str, str], str] = {}
+        ambiguous: Set[Tuple[str, str]] = set()
+        for investigator_id, name in investigators:
+            key = name_key(name)
+            if key is None:
+                continue
+            if key in investigators_by_key and investigators_by_key[key] != str(investigator_id):
+                ambiguous.add(key)
+            investigators_by_key[key] = str(investigator_id)
+        for key in ambiguous:
+            del investigators_by_key[key]
+
+        author_keys = sorted(investigators_by_key)
+        batches = [
+            author_keys[i:i + self.authors_per_search] for i in range(0, len(author_keys), self.authors_per_search)
+        ]
+        # An article matched by several batches must only be counted once per pair
+        seen: Set[Tuple[int, str, str]] = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="pubmed-harvester") as executor:
+            futures = [executor.submit(self._harvest_batch, batch, investigators_by_key) for batch in batches]
+            for future in as_completed(futures):
+                try:
+                    batch_links = future.result()
+                except ScrapeError as e:
+                    yield [], e
+                    continue
+                links = []
+                for link in batch_links:
+                    if link not in seen:
+                        seen.add(link)
+                        links.append(link)
+                yield links, None
+
+    def harvest(self, investigators: Iterable[Tuple[str, str]]) -> Iterator[Tuple[int, str, str]]:
+        """
+        Yields (pmid, investigator_a_id, investigator_b_id) for every article
+        co-authored by two of the given (investigator_id, name) pairs, failing on
+        the first batch that cannot be harvested.
+        """
+        for links, error in self.harvest_batches(investigators):
+            if error:
+                raise error
+            yield from links
+
+
+def store_collaborations(db: Session, links: Iterable[Tuple[int, str, str]], chunk_size: int = 5000) -> Dict[str, int]:
+    """
+    Bulk-upserts harvested links as collaboration_count increments, one
+    statement per chunk. Returns how many new article links and pairs were applied.
+    """
+    totals = {"new_links": 0, "pairs_updated": 0}
+    links = iter(links)
+    while True:
+        chunk = list(itertools.islice(links, chunk_size))
+        if not chunk:
+            return totals
+        pmids, a_ids, b_ids = (list(column) for column in zip(*chunk))
+        new_links, pairs = db.execute(
+            UPSERT_COLLABORATIONS_QUERY, {"pmids": pmids, "a_ids": a_ids, "b_ids": b_ids}
+        ).one()
+        totals["new_links"] += new_links
+        totals["pairs_updated"] += pairs
+
+
+def harvest_collaborations(db: Session, harvester: CollaborationHarvester | None = None) -> Dict[str, int]:
+    """
+    Harvests co-authorships for every investigator and stores them, committing
+    each batch of investigators as it completes. A batch that cannot be
+    harvested is logged and counted in "failed_batches"; the others are kept.
+    """
+    investigators = [(str(row[0]), row[1]) for row in db.execute(ACTIVE_INVESTIGATORS_QUERY)]
+    harvester = harvester or CollaborationHarvester()
+    totals = {"new_links": 0, "pairs_updated": 0, "failed_batches": 0}
+    for links, error in harvester.harvest_batches(investigators):
+        if error:
+            logger.error(f"Skipping a PubMed batch: {error}")
+            totals["failed_batches"] += 1
+            continue
+        for key, value in store_collaborations(db, links).items():
+            totals[key] += value
+        db.commit()
+    return totals
 
 if __name__ == "__main__":
     publications = find_coauthors("Fauci AS")
-    # print(publications)
\ No newline at end of file
+    # print(publications)
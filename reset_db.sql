@@ -1,7 +1,15 @@
 -- ========= PART 1: DROP EVERYTHING FOR A CLEAN SLATE =========
 DROP MATERIALIZED VIEW IF EXISTS most_watched;
-DROP MATERIALIZED VIEW IF EXISTS mechanism_crowding;
-DROP TABLE IF EXISTS user_events, data_quality_logs, job_run_logs, watchlists, alerts, investigator_collaborations, investigators, trial_predictions, ml_models, trials CASCADE;
+DROP MATERIALIZED VIEW IF EXISTS mechanism_crowding_full;
+-- mechanism_crowding used to be a materialized view; it is now a table maintained by triggers
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_matviews WHERE matviewname = 'mechanism_crowding') THEN
+        DROP MATERIALIZED VIEW mechanism_crowding;
+    END IF;
+END $$;
+DROP TABLE IF EXISTS user_events, user_event_daily_rollups, user_event_rollup_log, data_quality_logs, job_run_logs, watchlists, alerts, investigator_collaboration_articles, investigator_collaborations, investigators, trial_predictions, ml_models, trials, mechanism_crowding, mechanism_crowding_history CASCADE;
+DROP FUNCTION IF EXISTS trials_crowding_trigger, apply_crowding_deltas, crowding_risk_score CASCADE;
 
 
 -- ========= PART 2: CREATE ALL TABLES AND VIEWS =========
@@ -16,11 +24,15 @@ CREATE TABLE trials (
     sponsor_size INT,
     mechanism_of_action VARCHAR(255),
     investigator_id UUID,
-    outcome VARCHAR(50) -- 'Success' or 'Failure'
+    outcome VARCHAR(50), -- 'Success' or 'Failure'
+    content_hash CHAR(32) -- md5 of the scraped fields; unchanged rows are skipped on re-sync
 );
 
+-- Range-partitioned by month on "timestamp" (partitions named user_events_pYYYYMM, UTC months).
+-- The maintain_user_events job creates upcoming months ahead of time, rolls finished months up
+-- into user_event_daily_rollups and drops raw months past the retention window.
 CREATE TABLE user_events (
-    event_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    event_id UUID NOT NULL DEFAULT gen_random_uuid(),
     user_id UUID NOT NULL,
     user_type VARCHAR(20) NOT NULL,
     event_type VARCHAR(50) NOT NULL,
@@ -30,40 +42,179 @@ CREATE TABLE user_events (
     request_id UUID,
     event_version VARCHAR(10) DEFAULT 'v1.0',
     schema_version VARCHAR(10) DEFAULT 's1.0',
-    "timestamp" TIMESTAMPTZ DEFAULT NOW()
-);
+    "timestamp" TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    -- A partitioned table's primary key must include the partition key
+    PRIMARY KEY (event_id, "timestamp")
+) PARTITION BY RANGE ("timestamp");
+-- Catches anything outside the created months, so ingestion never fails on a missing partition
+CREATE TABLE user_events_default PARTITION OF user_events DEFAULT;
+-- This month and the next two; the maintenance job keeps creating months from here on
+DO $$
+DECLARE
+    month_start TIMESTAMPTZ;
+    month_end TIMESTAMPTZ;
+BEGIN
+    -- Both bounds are whole UTC months, whatever the session TimeZone
+    FOR month_offset IN 0..2 LOOP
+        month_start := (date_trunc('month', NOW() AT TIME ZONE 'UTC') + make_interval(months => month_offset)) AT TIME ZONE 'UTC';
+        month_end := (date_trunc('month', NOW() AT TIME ZONE 'UTC') + make_interval(months => month_offset + 1)) AT TIME ZONE 'UTC';
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF user_events FOR VALUES FROM (%L) TO (%L)',
+            'user_events_p' || to_char(month_start AT TIME ZONE 'UTC', 'YYYYMM'), month_start, month_end
+        );
+    END LOOP;
+END $$;
 CREATE INDEX idx_user_events_user ON user_events(user_id, "timestamp" DESC);
+-- Day-range scans for the daily data-quality checks; tiny, since events arrive in timestamp order
+CREATE INDEX idx_user_events_timestamp ON user_events USING BRIN ("timestamp");
+
+-- Daily per-entity, per-event-type counts, kept after raw partitions are dropped.
+-- Events without an entity roll up under entity_type = entity_id = ''.
+CREATE TABLE user_event_daily_rollups (
+    day DATE NOT NULL,
+    event_type VARCHAR(50) NOT NULL,
+    entity_type VARCHAR(50) NOT NULL DEFAULT '',
+    entity_id VARCHAR(100) NOT NULL DEFAULT '',
+    events BIGINT NOT NULL,
+    unique_users BIGINT NOT NULL,
+    PRIMARY KEY (day, event_type, entity_type, entity_id)
+);
+CREATE INDEX idx_user_event_rollups_entity ON user_event_daily_rollups(entity_type, entity_id, day DESC);
+-- Raw partitions already rolled up; only these are ever dropped
+CREATE TABLE user_event_rollup_log ( partition_name TEXT PRIMARY KEY, rollup_rows BIGINT, rolled_up_at TIMESTAMPTZ DEFAULT NOW() );
 
 CREATE TABLE data_quality_logs ( log_id SERIAL PRIMARY KEY, job_name TEXT NOT NULL, run_date DATE DEFAULT CURRENT_DATE, anomalies JSONB, status VARCHAR(20) CHECK (status IN ('PASS','WARN','FAIL')), created_at TIMESTAMPTZ DEFAULT NOW() );
-CREATE TABLE job_run_logs ( job_run_id SERIAL PRIMARY KEY, job_name TEXT NOT NULL, start_time TIMESTAMPTZ NOT NULL, end_time TIMESTAMPTZ, duration_ms INT, success_flag BOOLEAN, error_message TEXT, records_processed INT, alert_on_fail BOOLEAN DEFAULT TRUE, created_at TIMESTAMPTZ DEFAULT NOW() );
+-- One result per job per validated day; a re-run replaces it
+CREATE UNIQUE INDEX idx_data_quality_logs_run ON data_quality_logs(job_name, run_date);
+CREATE TABLE job_run_logs ( job_run_id SERIAL PRIMARY KEY, job_name TEXT NOT NULL, start_time TIMESTAMPTZ NOT NULL, end_time TIMESTAMPTZ, duration_ms INT, success_flag BOOLEAN, error_message TEXT, records_processed INT, alert_on_fail BOOLEAN DEFAULT TRUE, baseline_ms INT, regressed BOOLEAN DEFAULT FALSE, created_at TIMESTAMPTZ DEFAULT NOW() );
+-- Recent successful runs of a job, for its duration baseline
+CREATE INDEX idx_job_run_logs_baseline ON job_run_logs(job_name, start_time DESC) WHERE success_flag;
 
 CREATE TABLE watchlists ( id UUID PRIMARY KEY DEFAULT gen_random_uuid(), user_id UUID NOT NULL, entity_type VARCHAR(50) NOT NULL, entity_id VARCHAR(100) NOT NULL, added_at TIMESTAMPTZ DEFAULT NOW(), removed_at TIMESTAMPTZ );
-CREATE TABLE alerts ( alert_id UUID PRIMARY KEY DEFAULT gen_random_uuid(), user_id UUID NOT NULL, entity_type VARCHAR(50) NOT NULL, entity_id VARCHAR(100) NOT NULL, alert_type VARCHAR(50) NOT NULL, title TEXT NOT NULL, message TEXT NOT NULL, urgency VARCHAR(20) DEFAULT 'normal', created_at TIMESTAMPTZ DEFAULT NOW(), sent_at TIMESTAMPTZ, opened_at TIMESTAMPTZ, clicked_at TIMESTAMPTZ, dismissed_at TIMESTAMPTZ );
+-- Reverse lookup for alert fan-out and watcher counts: who is actively watching entity X?
+CREATE INDEX idx_watchlists_active_entity ON watchlists(entity_type, entity_id, user_id) WHERE removed_at IS NULL;
+-- Keyset pagination on (added_at, id) of a user's active watchlist
+CREATE INDEX idx_watchlists_user_page ON watchlists(user_id, added_at DESC, id DESC) WHERE removed_at IS NULL;
+CREATE TABLE alerts ( alert_id UUID PRIMARY KEY DEFAULT gen_random_uuid(), user_id UUID NOT NULL, entity_type VARCHAR(50) NOT NULL, entity_id VARCHAR(100) NOT NULL, alert_type VARCHAR(50) NOT NULL, title TEXT NOT NULL, message TEXT NOT NULL, urgency VARCHAR(20) DEFAULT 'normal', created_at TIMESTAMPTZ DEFAULT NOW(), sent_at TIMESTAMPTZ, opened_at TIMESTAMPTZ, clicked_at TIMESTAMPTZ, dismissed_at TIMESTAMPTZ, event_key VARCHAR(64) );
+-- One alert per user per triggering event (e.g. an FDA action), so retried fan-outs are idempotent
+CREATE UNIQUE INDEX idx_alerts_event_dedupe ON alerts(user_id, alert_type, entity_id, event_key);
+-- Keyset pagination on (created_at, alert_id) for all and unread-only alerts
+CREATE INDEX idx_alerts_user_page ON alerts(user_id, created_at DESC, alert_id DESC);
+CREATE INDEX idx_alerts_user_unread_page ON alerts(user_id, created_at DESC, alert_id DESC) WHERE clicked_at IS NULL;
 
-CREATE TABLE investigators ( investigator_id UUID PRIMARY KEY DEFAULT gen_random_uuid(), name VARCHAR(255) NOT NULL, institution VARCHAR(255), total_trials INT DEFAULT 0, successful_trials INT DEFAULT 0, success_rate DECIMAL(5,2) DEFAULT 0.0, influence_score DECIMAL(5,2) DEFAULT 0.0, last_updated TIMESTAMPTZ DEFAULT NOW() );
-CREATE TABLE investigator_collaborations ( collab_id UUID PRIMARY KEY DEFAULT gen_random_uuid(), investigator_a_id UUID REFERENCES investigators(investigator_id), investigator_b_id UUID REFERENCES investigators(investigator_id), collaboration_count INT DEFAULT 1, CHECK (investigator_a_id < investigator_b_id) );
+CREATE TABLE investigators ( investigator_id UUID PRIMARY KEY DEFAULT gen_random_uuid(), name VARCHAR(255) NOT NULL, institution VARCHAR(255), total_trials INT DEFAULT 0, successful_trials INT DEFAULT 0, success_rate DECIMAL(5,2) DEFAULT 0.0, influence_score DECIMAL(5,2) DEFAULT 0.0, last_updated TIMESTAMPTZ DEFAULT NOW(), source_key VARCHAR(64) UNIQUE, content_hash CHAR(32) );
+CREATE TABLE investigator_collaborations ( collab_id UUID PRIMARY KEY DEFAULT gen_random_uuid(), investigator_a_id UUID REFERENCES investigators(investigator_id), investigator_b_id UUID REFERENCES investigators(investigator_id), collaboration_count INT DEFAULT 1, CHECK (investigator_a_id < investigator_b_id), UNIQUE (investigator_a_id, investigator_b_id) );
+-- The PubMed articles behind each collaboration_count, so a re-harvest never counts an article twice
+CREATE TABLE investigator_collaboration_articles ( investigator_a_id UUID NOT NULL, investigator_b_id UUID NOT NULL, pmid BIGINT NOT NULL, PRIMARY KEY (investigator_a_id, investigator_b_id, pmid), FOREIGN KEY (investigator_a_id, investigator_b_id) REFERENCES investigator_collaborations(investigator_a_id, investigator_b_id) DEFERRABLE INITIALLY DEFERRED );
 
-CREATE TABLE trial_predictions ( prediction_id UUID PRIMARY KEY DEFAULT gen_random_uuid(), trial_id VARCHAR(50) NOT NULL, drug_id VARCHAR(100), predicted_probability DECIMAL(5,4), confidence_lower DECIMAL(5,4), confidence_upper DECIMAL(5,4), model_version VARCHAR(10), created_at TIMESTAMPTZ DEFAULT NOW(), UNIQUE(trial_id, model_version) );
-CREATE TABLE ml_models ( model_id SERIAL PRIMARY KEY, name TEXT NOT NULL, version TEXT NOT NULL, trained_on DATE NOT NULL, auc FLOAT, calibration_score FLOAT, notes TEXT, artifact_path TEXT, UNIQUE(name, version) );
+CREATE TABLE trial_predictions ( prediction_id UUID PRIMARY KEY DEFAULT gen_random_uuid(), trial_id VARCHAR(50) NOT NULL, drug_id VARCHAR(100), predicted_probability DECIMAL(5,4), confidence_lower DECIMAL(5,4), confidence_upper DECIMAL(5,4), model_version VARCHAR(50), created_at TIMESTAMPTZ DEFAULT NOW(), UNIQUE(trial_id, model_version) );
+-- Model registry: one row per published artifact version; at most one active version per model name
+CREATE TABLE ml_models ( model_id SERIAL PRIMARY KEY, name TEXT NOT NULL, version TEXT NOT NULL, trained_on DATE NOT NULL, auc FLOAT, calibration_score FLOAT, notes TEXT, artifact_path TEXT, is_active BOOLEAN NOT NULL DEFAULT FALSE, created_at TIMESTAMPTZ DEFAULT NOW(), UNIQUE(name, version), EXCLUDE (name WITH =) WHERE (is_active) DEFERRABLE INITIALLY DEFERRED );
+
+-- Feature #3: Mechanism Crowding
+-- Competitor counts per (mechanism_of_action, phase) over active Phase II/III trials.
+-- Kept current incrementally by statement-level triggers on trials, so readers are
+-- never blocked by a refresh and only the affected groups are touched.
+CREATE FUNCTION crowding_risk_score(competitor_count BIGINT) RETURNS INT IMMUTABLE LANGUAGE SQL AS $$
+    SELECT CASE
+        WHEN competitor_count >= 10 THEN 100
+        WHEN competitor_count >= 7 THEN 80
+        WHEN competitor_count >= 5 THEN 60
+        WHEN competitor_count >= 3 THEN 40
+        ELSE 20
+    END
+$$;
+
+CREATE TABLE mechanism_crowding (
+    mechanism_of_action VARCHAR(255) NOT NULL,
+    phase VARCHAR(50) NOT NULL,
+    competitor_count INT NOT NULL,
+    crowding_risk_score INT NOT NULL,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (mechanism_of_action, phase)
+);
 
--- Materialized View for Feature #3: Mechanism Crowding
-CREATE MATERIALIZED VIEW mechanism_crowding AS
+-- Daily snapshots of the index, for charting crowding over time
+CREATE TABLE mechanism_crowding_history (
+    snapshot_date DATE NOT NULL,
+    mechanism_of_action VARCHAR(255) NOT NULL,
+    phase VARCHAR(50) NOT NULL,
+    competitor_count INT NOT NULL,
+    crowding_risk_score INT NOT NULL,
+    PRIMARY KEY (snapshot_date, mechanism_of_action, phase)
+);
+CREATE INDEX idx_mechanism_crowding_history_series ON mechanism_crowding_history(mechanism_of_action, phase, snapshot_date);
+
+-- Applies [{mechanism_of_action, phase, delta}, ...] to the counts and drops empty groups
+CREATE FUNCTION apply_crowding_deltas(deltas JSONB) RETURNS VOID LANGUAGE SQL AS $$
+    INSERT INTO mechanism_crowding AS mc (mechanism_of_action, phase, competitor_count, crowding_risk_score)
+    SELECT d.mechanism_of_action, d.phase, d.delta, crowding_risk_score(d.delta)
+    FROM jsonb_to_recordset(deltas) AS d(mechanism_of_action TEXT, phase TEXT, delta INT)
+    WHERE d.delta <> 0
+    ON CONFLICT (mechanism_of_action, phase) DO UPDATE SET
+        competitor_count = mc.competitor_count + EXCLUDED.competitor_count,
+        crowding_risk_score = crowding_risk_score(mc.competitor_count + EXCLUDED.competitor_count),
+        updated_at = NOW();
+    DELETE FROM mechanism_crowding WHERE competitor_count <= 0;
+$$;
+
+CREATE FUNCTION trials_crowding_trigger() RETURNS TRIGGER LANGUAGE plpgsql AS $$
+DECLARE
+    deltas JSONB;
+BEGIN
+    -- A trial counts towards crowding while it is an active Phase II/III trial with a known mechanism
+    IF TG_OP = 'INSERT' THEN
+        SELECT jsonb_agg(d) INTO deltas FROM (
+            SELECT mechanism_of_action, phase, COUNT(*) AS delta FROM new_rows
+            WHERE status = 'Active' AND phase IN ('Phase II', 'Phase III') AND mechanism_of_action IS NOT NULL
+            GROUP BY mechanism_of_action, phase
+        ) d;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT jsonb_agg(d) INTO deltas FROM (
+            SELECT mechanism_of_action, phase, -COUNT(*) AS delta FROM old_rows
+            WHERE status = 'Active' AND phase IN ('Phase II', 'Phase III') AND mechanism_of_action IS NOT NULL
+            GROUP BY mechanism_of_action, phase
+        ) d;
+    ELSE
+        SELECT jsonb_agg(d) INTO deltas FROM (
+            SELECT mechanism_of_action, phase, SUM(delta) AS delta FROM (
+                SELECT mechanism_of_action, phase, -1 AS delta FROM old_rows
+                WHERE status = 'Active' AND phase IN ('Phase II', 'Phase III') AND mechanism_of_action IS NOT NULL
+                UNION ALL
+                SELECT mechanism_of_action, phase, 1 AS delta FROM new_rows
+                WHERE status = 'Active' AND phase IN ('Phase II', 'Phase III') AND mechanism_of_action IS NOT NULL
+            ) changes
+            GROUP BY mechanism_of_action, phase
+            HAVING SUM(delta) <> 0
+        ) d;
+    END IF;
+
+    IF deltas IS NOT NULL THEN
+        PERFORM apply_crowding_deltas(deltas);
+    END IF;
+    RETURN NULL;
+END $$;
+
+CREATE TRIGGER trials_crowding_insert AFTER INSERT ON trials
+    REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION trials_crowding_trigger();
+CREATE TRIGGER trials_crowding_update AFTER UPDATE ON trials
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION trials_crowding_trigger();
+CREATE TRIGGER trials_crowding_delete AFTER DELETE ON trials
+    REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION trials_crowding_trigger();
+
+-- Full recomputation, used only as a fallback to rebuild mechanism_crowding.
+-- The unique index lets it be refreshed CONCURRENTLY, without blocking readers.
+CREATE MATERIALIZED VIEW mechanism_crowding_full AS
 SELECT
     mechanism_of_action,
     phase,
     COUNT(*) as competitor_count,
-    CASE
-        WHEN COUNT(*) >= 10 THEN 100
-        WHEN COUNT(*) >= 7 THEN 80
-        WHEN COUNT(*) >= 5 THEN 60
-        WHEN COUNT(*) >= 3 THEN 40
-        ELSE 20
-    END as crowding_risk_score
+    crowding_risk_score(COUNT(*)) as crowding_risk_score
 FROM trials
-WHERE phase IN ('Phase II', 'Phase III') AND status = 'Active'
+WHERE phase IN ('Phase II', 'Phase III') AND status = 'Active' AND mechanism_of_action IS NOT NULL
 GROUP BY mechanism_of_action, phase;
 
-CREATE UNIQUE INDEX idx_mechanism_crowding_pk ON mechanism_crowding(mechanism_of_action, phase);
+CREATE UNIQUE INDEX idx_mechanism_crowding_full_pk ON mechanism_crowding_full(mechanism_of_action, phase);
 
 
 -- ========= PART 3: INSERT RICHER SEED DATA FOR TESTING =========
@@ -45,4 +45,113 @@ def test_predict_trial_not_found(mock_get_prediction, client):
     response = client.get(f"/api/predictions/trial/{trial_id}")
 
     assert response.status_code == 404
-    assert response.json()["detail"] == f"No prediction available for trial ID: {trial_id}"
\ No newline at end of file
+    assert response.json()["detail"] == f"No prediction available for trial ID: {trial_id}"
+
+@patch("chalkbio.models.predict.get_predictions_for_trials")
+def test_predict_trial_success_batch(mock_get_predictions, client):
+    """Test the batch prediction endpoint returns per-item results, including not-found entries."""
+    mock_get_predictions.return_value = {
+        "NCT123456": {
+            "trial_id": "NCT123456",
+            "drug_id": "DRUG-XYZ",
+            "predicted_probability": 0.68,
+            "confidence_lower": 0.56,
+            "confidence_upper": 0.80,
+            "model_version": "v1.0",
+            "created_at": "2025-11-17T15:00:00Z"
+        },
+        "NCT_NOT_FOUND": None,
+    }
+
+    response = client.post("/api/predictions/batch", json={"trial_ids": ["NCT123456", "NCT_NOT_FOUND"]})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["trial_id"] for r in results] == ["NCT123456", "NCT_NOT_FOUND"]
+    assert results[0]["found"] is True
+    assert results[0]["prediction"]["predicted_probability"] == 0.68
+    assert results[1]["found"] is False
+    assert results[1]["detail"] == "No prediction available for trial ID: NCT_NOT_FOUND"
+    mock_get_predictions.assert_called_once()
+
+@patch("chalkbio.api.endpoints.events.event_buffer")
+def test_log_user_events_batch_ndjson(mock_buffer, client):
+    """NDJSON batches are validated and handed to the event buffer in one submit."""
+    user_id = "3fa85f64-5717-4562-b3fc-2c963f66afa6"
+    body = "\n".join([
+        f'{{"user_id": "{user_id}", "user_type": "analyst", "event_type": "entity_view", "entity_id": "DRUG-1"}}',
+        f'{{"user_id": "{user_id}", "user_type": "analyst", "event_type": "search", "metadata": {{"q": "jak"}}}}',
+    ])
+
+    response = client.post("/api/events/batch", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+    assert response.status_code == 202
+    assert response.json()["accepted"] == 2
+    rows = mock_buffer.submit.call_args.args[0]
+    assert [row["event_type"] for row in rows] == ["entity_view", "search"]
+    assert rows[1]["metadata"] == {"q": "jak"}
+
+@patch("chalkbio.api.endpoints.events.event_buffer")
+def test_log_user_events_batch_back_pressure(mock_buffer, client):
+    """A full buffer is reported as 503 with a Retry-After header."""
+    from chalkbio.core.event_buffer import EventBufferFull
+    mock_buffer.submit.side_effect = EventBufferFull("full")
+    event = {"user_id": "3fa85f64-5717-4562-b3fc-2c963f66afa6", "user_type": "analyst", "event_type": "search"}
+
+    response = client.post("/api/events/batch", json=[event])
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+@patch("chalkbio.api.endpoints.events.MAX_BATCH_BODY_BYTES", 64)
+@patch("chalkbio.api.endpoints.events.event_buffer")
+def test_log_user_events_batch_rejects_oversized_body_up_front(mock_buffer, client):
+    """A Content-Length over the limit is refused with 413 before the body is parsed."""
+    response = client.post("/api/events/batch", content=b"[" + b" " * 100 + b"]",
+                           headers={"Content-Type": "application/json"})
+
+    assert response.status_code == 413
+    mock_buffer.submit.assert_not_called()
+
+@patch("chalkbio.api.endpoints.events.MAX_EVENTS_PER_BATCH", 2)
+@patch("chalkbio.api.endpoints.events.UserEventCreate.model_validate_json")
+@patch("chalkbio.api.endpoints.events.event_buffer")
+def test_log_user_events_batch_ndjson_stops_at_the_event_limit(mock_buffer, mock_validate, client):
+    """NDJSON parsing stops at the first line past MAX_EVENTS_PER_BATCH."""
+    event = '{"user_id": "3fa85f64-5717-4562-b3fc-2c963f66afa6", "user_type": "analyst", "event_type": "search"}'
+
+    response = client.post("/api/events/batch", content="\n".join([event] * 5),
+                           headers={"Content-Type": "application/x-ndjson"})
+
+    assert response.status_code == 413
+    assert mock_validate.call_count == 2
+    mock_buffer.submit.assert_not_called()
+
+def test_pagination_cursor_round_trip():
+    """A cursor decodes back to the keyset position it was built from."""
+    import uuid
+    from datetime import datetime, timezone
+    from chalkbio.api.pagination import encode_cursor, decode_cursor
+    created_at = datetime(2025, 11, 17, 15, 0, tzinfo=timezone.utc)
+    alert_id = uuid.uuid4()
+
+    assert decode_cursor(encode_cursor(created_at, alert_id)) == (created_at, alert_id)
+
+def test_get_user_alerts_rejects_invalid_cursor(client):
+    """A malformed cursor is a client error, not a server error."""
+    response = client.get(
+        "/api/alerts",
+        params={"user_id": "3fa85f64-5717-4562-b3fc-2c963f66afa6", "cursor": "not-a-cursor"}
+    )
+    assert response.status_code == 400
+
+@patch("chalkbio.api.endpoints.watchlists.trending_counter")
+def test_most_watched_redis_down(mock_counter, client):
+    """A Redis outage is reported as 503, not a server error."""
+    from redis.exceptions import ConnectionError
+    mock_counter.top.side_effect = ConnectionError("down")
+
+    response = client.get("/api/watchlists/most-watched", params={"window": "7d"})
+
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
@@ -1,6 +1,42 @@
+import hashlib
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
 from chalkbio.main import app
+from chalkbio.models import feature_engineering
+from chalkbio.models.embedding_cache import EmbeddingCache
+
+
+class FakeEmbeddingProvider:
+    """Deterministic, torch-free stand-in for the SentenceTransformer provider."""
+    model_id = "fake-embedding-model"
+
+    def __init__(self, dim: int = 8):
+        self.dim = dim
+        self.encoded = []
+
+    def encode(self, texts):
+        self.encoded.extend(texts)
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:4], "little")
+            vectors.append(np.random.default_rng(seed).standard_normal(self.dim))
+        return np.asarray(vectors, dtype=np.float32).reshape(len(texts), self.dim)
+
+
+@pytest.fixture
+def fake_embedding_provider(tmp_path):
+    """
+    Swap in the fake embedding provider, with a throwaway embedding cache.
+    """
+    original_provider = feature_engineering.get_embedding_provider()
+    provider = FakeEmbeddingProvider()
+    feature_engineering.set_embedding_provider(
+        provider, cache=EmbeddingCache(model_id=provider.model_id, cache_dir=str(tmp_path))
+    )
+    yield provider
+    feature_engineering.set_embedding_provider(original_provider)
+
 
 @pytest.fixture(scope="module")
 def client():
@@ -8,4 +44,4 @@ def client():
     Yield a TestClient for the API.
     """
     with TestClient(app) as c:
-        yield c
\ No newline at end of file
+        yield c
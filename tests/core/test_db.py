@@ -0,0 +1,42 @@
+import subprocess
+import sys
+from unittest.mock import patch
+
+from chalkbio.core import db
+from chalkbio.core.config import settings
+
+def test_sync_and_async_engines_share_pool_settings():
+    for pool in (db.engine.pool, db.async_engine.sync_engine.pool):
+        assert pool.size() == settings.DB_POOL_SIZE
+        assert pool._max_overflow == settings.DB_MAX_OVERFLOW
+        assert pool._recycle == settings.DB_POOL_RECYCLE_SECONDS
+        assert pool._pre_ping is settings.DB_POOL_PRE_PING
+
+def test_statement_timeout_defaults_to_none_outside_the_api():
+    """CLI training and scraper runs import core.db without the API or Celery setup."""
+    # A fresh interpreter, since the API test client has already run the lifespan here
+    result = subprocess.run(
+        [sys.executable, "-c", "from chalkbio.core import db; print(db._statement_timeout_ms)"],
+        capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.strip() == "0"
+
+def test_api_applies_its_statement_timeout(monkeypatch):
+    monkeypatch.setattr(db, "_statement_timeout_ms", 0)
+    monkeypatch.setattr(settings, "DB_STATEMENT_TIMEOUT_MS", 30000)
+    cparams = {}
+    with patch.object(db.engine, "dispose"):
+        db.configure_api_engine()
+    db._set_statement_timeout(None, None, [], cparams)
+    assert cparams["options"] == "-c statement_timeout=30000"
+
+def test_statement_timeout_is_relaxed_in_workers(monkeypatch):
+    monkeypatch.setattr(db, "_statement_timeout_ms", 30000)
+    monkeypatch.setattr(settings, "CELERY_DB_STATEMENT_TIMEOUT_MS", 0)
+    with patch.object(db.engine, "dispose") as dispose:
+        db.configure_worker_engine()
+    dispose.assert_called_once_with(close=False)
+
+    cparams = {}
+    db._set_statement_timeout(None, None, [], cparams)
+    assert cparams["options"] == "-c statement_timeout=0"
@@ -0,0 +1,50 @@
+import pytest
+from chalkbio.core.event_buffer import EventBuffer, EventBufferFull
+
+def _make_buffer(writer, max_batch_size=2, max_pending=5):
+    return EventBuffer(writer=writer, max_batch_size=max_batch_size, flush_interval_seconds=60, max_pending=max_pending)
+
+def test_flush_writes_in_batches():
+    """Pending events are written in batches of at most max_batch_size."""
+    batches = []
+    buffer = _make_buffer(batches.append)
+    buffer.submit([{"n": 1}, {"n": 2}, {"n": 3}])
+
+    assert buffer.flush() == 3
+    assert batches == [[{"n": 1}, {"n": 2}], [{"n": 3}]]
+    assert buffer.pending_count() == 0
+
+def test_submit_applies_back_pressure_when_full():
+    """Submitting past max_pending raises instead of growing the buffer."""
+    buffer = _make_buffer(lambda rows: None, max_pending=3)
+    buffer.submit([{"n": 1}, {"n": 2}])
+
+    with pytest.raises(EventBufferFull):
+        buffer.submit([{"n": 3}, {"n": 4}])
+    assert buffer.pending_count() == 2
+
+def test_failed_write_keeps_events_for_retry():
+    """A failed write puts the batch back, in order, for the next flush."""
+    calls = []
+    def flaky_writer(rows):
+        calls.append(list(rows))
+        if len(calls) == 1:
+            raise RuntimeError("database unavailable")
+
+    buffer = _make_buffer(flaky_writer)
+    buffer.submit([{"n": 1}, {"n": 2}])
+
+    assert buffer.flush() == 0
+    assert buffer.pending_count() == 2
+    assert buffer.flush() == 2
+    assert calls[1] == [{"n": 1}, {"n": 2}]
+
+def test_stop_flushes_pending_events():
+    """Stopping the background thread writes out whatever is still buffered."""
+    batches = []
+    buffer = _make_buffer(batches.append, max_batch_size=100)
+    buffer.start()
+    buffer.submit([{"n": 1}])
+    buffer.stop()
+
+    assert batches == [[{"n": 1}]]
@@ -0,0 +1,38 @@
+from unittest.mock import patch
+
+from chalkbio.core.metrics import statement_fingerprint
+
+def test_fingerprint_ignores_literals_and_expanded_in_lists():
+    two = statement_fingerprint("SELECT * FROM trials WHERE trial_id IN (%(trial_ids_1)s, %(trial_ids_2)s) AND sponsor_size > 10")
+    three = statement_fingerprint(
+        "SELECT *\n  FROM trials\n WHERE trial_id IN (%(trial_ids_1)s, %(trial_ids_2)s, %(trial_ids_3)s) AND sponsor_size > 500"
+    )
+    asyncpg_style = statement_fingerprint("SELECT * FROM trials WHERE trial_id IN ($1, $2) AND sponsor_size > 10")
+
+    assert two == three == asyncpg_style
+    assert two[0] == "SELECT"
+    assert statement_fingerprint("SELECT * FROM investigators WHERE name = 'x'") != two
+    assert statement_fingerprint("WITH t AS (SELECT 1) SELECT * FROM t")[0] == "CTE"
+
+@patch("chalkbio.models.predict.get_prediction_for_trial")
+def test_metrics_endpoint_reports_route_templates(mock_get_prediction, client):
+    mock_get_prediction.return_value = None
+    client.get("/api/predictions/trial/NCT_A")
+    client.get("/api/predictions/trial/NCT_B")
+
+    body = client.get("/metrics").text
+
+    # Both trials are counted under the one path template, with their status
+    assert '/predictions/trial/{trial_id}",status="404"}' in body
+    assert "NCT_A" not in body
+    assert "chalkbio_http_requests_in_progress" in body
+
+def test_fingerprint_ignores_row_count_of_multi_row_values():
+    """Batched inserts are rendered as one VALUES tuple per row; every batch size shares a label."""
+    row = "(%(event_id__{0})s, %(user_id__{0})s, %(metadata__{0})s)"
+    def insert(rows):
+        return "INSERT INTO user_events (event_id, user_id, metadata) VALUES " + ", ".join(row.format(i) for i in range(rows))
+
+    assert statement_fingerprint(insert(1)) == statement_fingerprint(insert(2)) == statement_fingerprint(insert(1000))
+    casted = "INSERT INTO user_events (event_id, user_id) VALUES ($1::UUID, $2::UUID), ($3::UUID, $4::UUID)"
+    assert statement_fingerprint(casted) == statement_fingerprint("INSERT INTO user_events (event_id, user_id) VALUES ($1::UUID, $2::UUID)")
@@ -0,0 +1,106 @@
+from unittest.mock import MagicMock
+from chalkbio.core.trending import TrendingCounter
+
+class FakeSortedSetRedis:
+    """Just enough of the redis-py sorted-set API for the trending counter."""
+    def __init__(self):
+        self.zsets, self.sets, self.values = {}, {}, {}
+
+    def zincrby(self, key, amount, member):
+        zset = self.zsets.setdefault(key, {})
+        zset[member] = zset.get(member, 0.0) + amount
+
+    def zunionstore(self, dest, keys):
+        weights = keys if isinstance(keys, dict) else {key: 1 for key in keys}
+        result = {}
+        for key, weight in weights.items():
+            for member, score in self.zsets.get(key, {}).items():
+                result[member] = result.get(member, 0.0) + weight * score
+        self.zsets[dest] = result
+
+    def zremrangebyscore(self, key, low, high):
+        zset = self.zsets.get(key, {})
+        for member in [m for m, s in zset.items() if low <= s <= high]:
+            del zset[member]
+
+    def zrevrange(self, key, start, end, withscores=False):
+        ranked = sorted(self.zsets.get(key, {}).items(), key=lambda item: -item[1])
+        return ranked[start:end + 1]
+
+    def exists(self, key):
+        return int(key in self.zsets)
+
+    def delete(self, key):
+        self.zsets.pop(key, None)
+
+    def expire(self, key, seconds):
+        pass
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+
+    def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value):
+        self.values[key] = str(value)
+
+    def pipeline(self, transaction=True):
+        pipe = MagicMock()
+        pipe.zincrby.side_effect = self.zincrby
+        pipe.expire.side_effect = self.expire
+        pipe.sadd.side_effect = self.sadd
+        return pipe
+
+def test_windows_slide_as_buckets_expire():
+    """An hour-old watch counts in every window; after 25 hours it has left only the 24h window."""
+    fake_redis = FakeSortedSetRedis()
+    counter = TrendingCounter(redis_factory=lambda: fake_redis)
+    start = 1000
+
+    counter.record([("drug", "DRUG-1", 1.0), ("drug", "DRUG-1", 1.0), ("drug", "DRUG-2", 1.0)], hour=start)
+    counter.record([("drug", "DRUG-2", 1.0), ("trial", "NCT1", 1.0)], hour=start + 1)
+    counter.expire(now_hour=start + 1)
+    assert [e["entity_id"] for e in counter.top("24h")] == ["DRUG-1", "DRUG-2", "NCT1"]
+
+    counter.expire(now_hour=start + 24)
+    assert counter.top("24h") == [
+        {"entity_type": "drug", "entity_id": "DRUG-2", "score": 1.0},
+        {"entity_type": "trial", "entity_id": "NCT1", "score": 1.0},
+    ]
+    assert counter.top("24h", entity_type="drug") == [{"entity_type": "drug", "entity_id": "DRUG-2", "score": 1.0}]
+    assert counter.top("7d")[0] == {"entity_type": "drug", "entity_id": "DRUG-1", "score": 2.0}
+
+def test_unwatch_cancels_watch_and_views_are_weighted():
+    """An unwatch cancels an earlier watch; only view events count, at the configured weight."""
+    fake_redis = FakeSortedSetRedis()
+    counter = TrendingCounter(redis_factory=lambda: fake_redis)
+
+    counter.record_watch("drug", "DRUG-1", added=True)
+    counter.record_watch("drug", "DRUG-1", added=False)
+    counter.record_user_events([
+        {"event_type": "view", "entity_type": "drug", "entity_id": "DRUG-2"},
+        {"event_type": "search", "entity_type": "drug", "entity_id": "DRUG-3"},
+    ])
+
+    assert counter.top("30d") == [{"entity_type": "drug", "entity_id": "DRUG-2", "score": 0.1}]
+
+def test_expiry_rebuilds_once_buckets_may_have_hit_their_ttl():
+    """A job down longer than the TTL slack can't subtract buckets Redis already dropped: it rebuilds."""
+    fake_redis = FakeSortedSetRedis()
+    counter = TrendingCounter(redis_factory=lambda: fake_redis)
+    start = 1000
+    hours_30d = 30 * 24
+
+    counter.record([("drug", "DRUG-1", 1.0)], hour=start + 10)
+    counter.record([("drug", "DRUG-2", 1.0)], hour=start + 100)
+    counter.expire(now_hour=start + hours_30d)
+
+    # Down for 60 hours past DRUG-1's slide-out (well under a window); its bucket has hit the TTL
+    fake_redis.delete(f"trending:bucket:drug:{start + 10}")
+    counter.expire(now_hour=start + 10 + hours_30d + 60)
+
+    assert counter.top("30d") == [{"entity_type": "drug", "entity_id": "DRUG-2", "score": 1.0}]
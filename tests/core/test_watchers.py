@@ -0,0 +1,109 @@
+from unittest.mock import MagicMock
+from redis.exceptions import ConnectionError as RedisConnectionError, WatchError
+from chalkbio.core.watchers import WatcherIndex
+
+class FakePipeline:
+    """A MULTI/EXEC pipeline with WATCH: queued commands are dropped if a watched key changed."""
+    def __init__(self, redis):
+        self.redis, self.queued, self.watched = redis, [], {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def watch(self, key):
+        self.watched[key] = self.redis.values.get(key)
+
+    def multi(self):
+        pass
+
+    def __getattr__(self, command):
+        return lambda *args, **kwargs: self.queued.append((command, args, kwargs))
+
+    def execute(self):
+        if any(self.redis.values.get(key) != value for key, value in self.watched.items()):
+            raise WatchError("watched key changed")
+        for command, args, kwargs in self.queued:
+            getattr(self.redis, command)(*args, **kwargs)
+
+class FakeRedis:
+    """Just enough of the redis-py API for the watcher index."""
+    def __init__(self):
+        self.sets, self.values = {}, {}
+
+    def exists(self, key):
+        return int(key in self.values or key in self.sets)
+
+    def sadd(self, key, *members):
+        self.sets.setdefault(key, set()).update(members)
+
+    def srem(self, key, *members):
+        self.sets.get(key, set()).difference_update(members)
+
+    def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    def scard(self, key):
+        return len(self.sets.get(key, set()))
+
+    def delete(self, key):
+        self.sets.pop(key, None)
+        self.values.pop(key, None)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    def incr(self, key):
+        self.values[key] = self.values.get(key, 0) + 1
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+def _session_returning(user_ids):
+    db = MagicMock()
+    db.execute.return_value = [(user_id,) for user_id in user_ids]
+    return MagicMock(return_value=db)
+
+def test_watchers_loaded_once_then_maintained_incrementally():
+    """The first lookup loads from Postgres; later adds and removes only touch the Redis set."""
+    fake_redis = FakeRedis()
+    session_factory = _session_returning(["u1", "u2"])
+    index = WatcherIndex(redis_factory=lambda: fake_redis, session_factory=session_factory)
+
+    assert index.count("drug", "DRUG-1") == 2
+    index.add("drug", "DRUG-1", "u3")
+    index.remove("drug", "DRUG-1", "u1")
+
+    assert index.watchers("drug", "DRUG-1") == {"u2", "u3"}
+    assert session_factory.call_count == 1
+
+def test_watchers_fall_back_to_postgres_when_redis_is_down():
+    """A Redis outage degrades to the partial-index query instead of failing."""
+    broken_redis = MagicMock()
+    broken_redis.exists.side_effect = RedisConnectionError("down")
+    index = WatcherIndex(redis_factory=lambda: broken_redis, session_factory=_session_returning(["u1"]))
+
+    assert index.count("drug", "DRUG-1") == 1
+
+def test_rebuild_retries_when_a_watcher_changes_after_the_postgres_read():
+    """An add or remove committed after the rebuild read Postgres must not be overwritten by it."""
+    fake_redis = FakeRedis()
+    index = WatcherIndex(redis_factory=lambda: fake_redis)
+    reads = iter([["u1", "u2"], ["u1", "u3"]])
+
+    def session_factory():
+        db = MagicMock()
+        def execute(*args):
+            user_ids = next(reads)
+            if user_ids == ["u1", "u2"]:
+                # Both commit right after this read, and reach Redis before the rebuild does
+                index.add("drug", "DRUG-1", "u3")
+                index.remove("drug", "DRUG-1", "u2")
+            return [(user_id,) for user_id in user_ids]
+        db.execute.side_effect = execute
+        return db
+    index._session_factory = session_factory
+
+    assert index.watchers("drug", "DRUG-1") == {"u1", "u3"}
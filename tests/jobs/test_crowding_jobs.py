@@ -0,0 +1,34 @@
+from unittest.mock import patch, MagicMock
+from chalkbio.jobs.daily import update_crowding_index
+
+@patch("chalkbio.jobs.daily.update_crowding_index.score_active_trials")
+@patch("chalkbio.jobs.daily.update_crowding_index.SessionLocal")
+def test_daily_refresh_only_snapshots_history(mock_session_local, mock_score):
+    """The daily run never rescans trials; it only records today's snapshot."""
+    db = MagicMock()
+    mock_session_local.return_value = db
+
+    update_crowding_index.refresh_crowding_index_view()
+
+    executed = [call.args[0] for call in db.execute.call_args_list]
+    assert executed == [update_crowding_index.SNAPSHOT_HISTORY]
+    db.commit.assert_called_once()
+    mock_score.delay.assert_called_once()
+
+@patch("chalkbio.jobs.daily.update_crowding_index.score_active_trials")
+@patch("chalkbio.jobs.daily.update_crowding_index.SessionLocal")
+def test_full_rebuild_refreshes_concurrently_then_reconciles(mock_session_local, mock_score):
+    """A full rebuild refreshes the fallback view concurrently before reconciling and snapshotting."""
+    db = MagicMock()
+    mock_session_local.return_value = db
+
+    update_crowding_index.refresh_crowding_index_view(full_rebuild=True)
+
+    executed = [call.args[0] for call in db.execute.call_args_list]
+    assert executed == [
+        update_crowding_index.REFRESH_FULL_VIEW,
+        update_crowding_index.RECONCILE_UPSERT,
+        update_crowding_index.RECONCILE_DELETE,
+        update_crowding_index.SNAPSHOT_HISTORY,
+    ]
+    assert "CONCURRENTLY" in str(update_crowding_index.REFRESH_FULL_VIEW)
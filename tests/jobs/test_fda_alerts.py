@@ -0,0 +1,41 @@
+import uuid
+from unittest.mock import patch, MagicMock
+from chalkbio.jobs.triggers import fda_alerts
+
+def test_user_id_ranges_cover_the_uuid_space():
+    """Ranges must be contiguous, start at the zero UUID and leave the last one open-ended."""
+    ranges = fda_alerts.user_id_ranges(4)
+
+    assert len(ranges) == 4
+    assert ranges[0][0] == uuid.UUID(int=0)
+    assert ranges[-1][1] is None
+    for (_, upper), (next_lower, _) in zip(ranges, ranges[1:]):
+        assert upper == next_lower
+
+@patch("chalkbio.jobs.triggers.fda_alerts.SessionLocal")
+def test_trigger_fda_alert_fans_out_per_chunk(mock_session_local):
+    """Each user_id range runs its own INSERT ... SELECT and commit; created counts are summed."""
+    db = MagicMock()
+    db.execute.return_value.rowcount = 2
+    mock_session_local.return_value = db
+
+    result = fda_alerts.trigger_fda_alert("DRUG-ABC", "Approved.")
+
+    assert result == f"Created {2 * fda_alerts.ALERT_FANOUT_CHUNKS} alerts."
+    assert db.execute.call_count == fda_alerts.ALERT_FANOUT_CHUNKS
+    assert db.commit.call_count == fda_alerts.ALERT_FANOUT_CHUNKS
+    params = db.execute.call_args.args[1]
+    assert params['event_key'] == fda_alerts.fda_event_key("DRUG-ABC", "Approved.")
+
+@patch("chalkbio.core.watchers.watcher_index")
+@patch("chalkbio.jobs.triggers.fda_alerts.SessionLocal")
+def test_trigger_fda_alert_ignores_cached_watcher_count(mock_session_local, mock_watcher_index):
+    """A zero count in the (possibly stale) watcher index never suppresses the fan-out."""
+    mock_watcher_index.count.return_value = 0
+    db = MagicMock()
+    db.execute.return_value.rowcount = 0
+    mock_session_local.return_value = db
+
+    assert fda_alerts.trigger_fda_alert("DRUG-NOBODY", "Approved.") == "No alerts created."
+    assert db.execute.call_count == fda_alerts.ALERT_FANOUT_CHUNKS
+    mock_watcher_index.count.assert_not_called()
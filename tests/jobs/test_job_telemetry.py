@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from celery import states
+from chalkbio.jobs import telemetry
+
+TASK = SimpleNamespace(name="chalkbio.jobs.daily.update_crowding_index.refresh_crowding_index_view")
+
+def _mock_engine(baseline_ms=None, baseline_runs=0):
+    """An engine whose connection returns job_run_id 7 and the given duration baseline."""
+    conn = MagicMock()
+    conn.execute.return_value.scalar_one.return_value = 7
+    conn.execute.return_value.one.return_value = SimpleNamespace(median_ms=baseline_ms, runs=baseline_runs)
+    engine = MagicMock()
+    engine.begin.return_value.__enter__.return_value = conn
+    return engine, conn
+
+def _run_task(state, retval, records=None):
+    telemetry._start_run(task_id="task-1", task=TASK)
+    if records is not None:
+        telemetry.report_records_processed(records)
+    telemetry._finish_run(task_id="task-1", task=TASK, retval=retval, state=state)
+
+def test_is_regression_needs_a_baseline_and_a_real_slowdown():
+    with patch("chalkbio.jobs.telemetry.settings") as mock_settings:
+        mock_settings.JOB_BASELINE_MIN_RUNS = 5
+        mock_settings.JOB_REGRESSION_FACTOR = 3.0
+        mock_settings.JOB_REGRESSION_MIN_MS = 30000
+
+        assert telemetry.is_regression(400000, 100000, 10)
+        # Too few runs to trust the median
+        assert not telemetry.is_regression(400000, 100000, 2)
+        # Under the factor
+        assert not telemetry.is_regression(250000, 100000, 10)
+        # Many times slower, but only by a few seconds
+        assert not telemetry.is_regression(4000, 1000, 10)
+        assert not telemetry.is_regression(400000, None, 0)
+
+@patch("chalkbio.jobs.telemetry.post_to_slack")
+def test_successful_run_is_logged_with_its_record_count(mock_post_to_slack):
+    engine, conn = _mock_engine(baseline_ms=1000.0, baseline_runs=10)
+    with patch("chalkbio.jobs.telemetry.engine", engine):
+        _run_task(states.SUCCESS, "Crowding Index refreshed.", records=42)
+
+    params = conn.execute.call_args_list[-1].args[1]
+    assert conn.execute.call_args_list[-1].args[0] is telemetry.FINISH_RUN
+    assert params['job_name'] == "refresh_crowding_index_view"
+    assert params['job_run_id'] == 7
+    assert params['success_flag'] is True
+    assert params['error_message'] is None
+    assert params['records_processed'] == 42
+    assert params['baseline_ms'] == 1000
+    assert params['regressed'] is False
+    mock_post_to_slack.assert_not_called()
+
+@patch("chalkbio.jobs.telemetry.post_to_slack")
+def test_failed_run_is_logged_and_posted_to_slack(mock_post_to_slack):
+    engine, conn = _mock_engine()
+    with patch("chalkbio.jobs.telemetry.engine", engine):
+        _run_task(states.FAILURE, SimpleNamespace(exception=RuntimeError("connection reset")))
+
+    params = conn.execute.call_args_list[-1].args[1]
+    assert params['success_flag'] is False
+    assert params['error_message'] == "RuntimeError: connection reset"
+    assert params['records_processed'] is None
+    mock_post_to_slack.assert_called_once_with(
+        job_name="refresh_crowding_index_view", error_message="RuntimeError: connection reset"
+    )
+
+@patch("chalkbio.jobs.telemetry.is_regression", return_value=True)
+@patch("chalkbio.jobs.telemetry.post_to_slack")
+def test_regressed_run_is_flagged_and_posted_to_slack(mock_post_to_slack, mock_is_regression):
+    engine, conn = _mock_engine(baseline_ms=1000.0, baseline_runs=10)
+    with patch("chalkbio.jobs.telemetry.engine", engine):
+        _run_task(states.SUCCESS, "Crowding Index refreshed.")
+
+    assert conn.execute.call_args_list[-1].args[1]['regressed'] is True
+    mock_post_to_slack.assert_called_once()
+    assert mock_post_to_slack.call_args.kwargs['status'] == "slow"
+
+@patch("chalkbio.jobs.telemetry.post_to_slack")
+def test_run_is_still_recorded_when_the_start_row_failed(mock_post_to_slack):
+    """If the start INSERT fails, the finished run is inserted in one go instead of updated."""
+    engine, conn = _mock_engine()
+    conn.execute.side_effect = [Exception("database is starting up"), MagicMock()]
+    with patch("chalkbio.jobs.telemetry.engine", engine):
+        _run_task(states.FAILURE, RuntimeError("boom"))
+
+    assert conn.execute.call_args_list[-1].args[0] is telemetry.RECORD_RUN
+    assert conn.execute.call_args_list[-1].args[1]['job_run_id'] is None
+    mock_post_to_slack.assert_called_once()
@@ -0,0 +1,125 @@
+from datetime import date, datetime, timezone
+import pytest
+from unittest.mock import patch, MagicMock
+from chalkbio.jobs.daily import maintain_user_events
+
+def test_add_months_crosses_year_boundaries():
+    assert maintain_user_events.add_months(date(2026, 11, 20), 2) == date(2027, 1, 1)
+    assert maintain_user_events.add_months(date(2026, 1, 5), -13) == date(2024, 12, 1)
+
+def test_partition_names_round_trip():
+    name = maintain_user_events.partition_name(date(2026, 3, 1))
+    assert name == "user_events_p202603"
+    assert maintain_user_events.partition_month(name) == date(2026, 3, 1)
+    assert maintain_user_events.partition_month("user_events_default") is None
+
+def test_plan_creates_upcoming_rolls_up_finished_and_drops_expired():
+    existing = [date(2025, 8, 1), date(2025, 9, 1), date(2026, 9, 1), date(2026, 10, 1)]
+    rolled_up = [date(2025, 8, 1)]
+
+    to_create, to_roll_up, to_drop = maintain_user_events.plan_partition_maintenance(
+        existing, rolled_up, today=date(2026, 10, 18), months_ahead=2, retention_months=13
+    )
+
+    assert to_create == [date(2026, 11, 1), date(2026, 12, 1)]
+    # The current month is still being written to
+    assert to_roll_up == [date(2025, 9, 1), date(2026, 9, 1)]
+    assert to_drop == [date(2025, 8, 1)]
+
+def test_plan_rolls_up_the_previous_month_again_while_late_events_arrive():
+    existing = [date(2026, 8, 1), date(2026, 9, 1), date(2026, 10, 1)]
+    rolled_up = [date(2026, 8, 1), date(2026, 9, 1)]
+
+    def to_roll_up(today):
+        return maintain_user_events.plan_partition_maintenance(
+            existing, rolled_up, today=today, months_ahead=0, retention_months=13, late_arrival_days=3
+        )[1]
+
+    assert to_roll_up(date(2026, 10, 3)) == [date(2026, 9, 1)]
+    assert to_roll_up(date(2026, 10, 4)) == []
+
+def _db(partitions, default_months=(), default_has_month=False, failing_create=None):
+    """A session whose execute answers each maintenance statement; records every SQL string run."""
+    db = MagicMock()
+    db.statements = []
+
+    def execute(statement, params=None):
+        sql = str(statement)
+        db.statements.append(sql)
+        result = MagicMock(rowcount=31)
+        if statement is maintain_user_events.LIST_PARTITIONS_QUERY:
+            result.scalars.return_value = iter(partitions)
+        elif statement is maintain_user_events.ROLLED_UP_PARTITIONS_QUERY:
+            result.scalars.return_value = iter([])
+        elif statement is maintain_user_events.DEFAULT_HAS_MONTH_QUERY:
+            result.scalar.return_value = default_has_month
+        elif statement is maintain_user_events.DEFAULT_MONTHS_QUERY:
+            result.all.return_value = list(default_months)
+        elif failing_create and sql.startswith(f"CREATE TABLE IF NOT EXISTS {failing_create}"):
+            raise Exception("updated partition constraint for default partition would be violated")
+        return result
+
+    db.execute.side_effect = execute
+    return db
+
+@patch("chalkbio.jobs.daily.maintain_user_events.post_to_slack")
+@patch("chalkbio.jobs.daily.maintain_user_events.SessionLocal")
+def test_maintenance_rolls_up_before_dropping(mock_session_local, mock_post_to_slack):
+    """A month past retention is rolled up again, with writes to it blocked, in the transaction that drops it."""
+    db = _db(["user_events_default", "user_events_p202001"])
+    db.commit.side_effect = lambda: db.statements.append("COMMIT")
+    mock_session_local.return_value = db
+
+    result = maintain_user_events.maintain_user_events_partitions()
+
+    statements = db.statements
+    drop = next(i for i, sql in enumerate(statements) if sql.startswith("DROP TABLE"))
+    lock = statements.index("LOCK TABLE user_events_p202001 IN SHARE MODE;")
+    rollup = statements.index(str(maintain_user_events.ROLLUP_MONTH))
+    log = statements.index(str(maintain_user_events.LOG_ROLLUP))
+    assert lock < rollup < log < drop
+    assert "COMMIT" not in statements[lock:drop]
+    assert "user_events_p202001" in statements[drop]
+    assert sum("PARTITION OF user_events" in sql for sql in statements) == 3
+    assert result.endswith("rolled up 0 and dropped 1 user_events partitions.")
+    mock_post_to_slack.assert_not_called()
+
+@patch("chalkbio.jobs.daily.maintain_user_events.post_to_slack")
+@patch("chalkbio.jobs.daily.maintain_user_events.SessionLocal")
+def test_month_with_rows_in_default_is_moved_out_first(mock_session_local, mock_post_to_slack):
+    db = _db(["user_events_default"], default_has_month=True)
+    mock_session_local.return_value = db
+
+    maintain_user_events.maintain_user_events_partitions()
+
+    statements = db.statements
+    detach = statements.index(str(maintain_user_events.DETACH_DEFAULT))
+    create = next(i for i, sql in enumerate(statements) if sql.startswith("CREATE TABLE"))
+    move = statements.index(str(maintain_user_events.MOVE_FROM_DEFAULT))
+    attach = statements.index(str(maintain_user_events.ATTACH_DEFAULT))
+    assert detach < create < move < attach
+
+@patch("chalkbio.jobs.daily.maintain_user_events.post_to_slack")
+@patch("chalkbio.jobs.daily.maintain_user_events.SessionLocal")
+def test_failed_create_does_not_block_rollup_and_retention(mock_session_local, mock_post_to_slack):
+    """One month that cannot be created still lets the rest run, then fails the task."""
+    month = maintain_user_events.add_months(datetime.now(timezone.utc).date(), 1)
+    db = _db(
+        ["user_events_default", "user_events_p202001"],
+        default_months=[(date(2019, 6, 1), 4)],
+        failing_create=maintain_user_events.partition_name(month),
+    )
+    mock_session_local.return_value = db
+
+    with pytest.raises(RuntimeError, match=maintain_user_events.partition_name(month)):
+        maintain_user_events.maintain_user_events_partitions()
+
+    statements = db.statements
+    db.rollback.assert_called()
+    # Both the partition being dropped and the stray default month are rolled up
+    assert statements.count(str(maintain_user_events.ROLLUP_MONTH)) == 2
+    assert str(maintain_user_events.PURGE_DEFAULT) in statements
+    assert any(sql.startswith("DROP TABLE IF EXISTS user_events_p202001") for sql in statements)
+    # Stray events in the default partition are reported
+    assert mock_post_to_slack.call_args.kwargs["status"] == "warning"
+    assert "2019-06 (4)" in mock_post_to_slack.call_args.kwargs["error_message"]
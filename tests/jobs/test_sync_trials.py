@@ -0,0 +1,45 @@
+from unittest.mock import patch
+import pytest
+from chalkbio.jobs.daily import sync_trials
+from chalkbio.scrapers.clinicaltrials_scraper import ScrapeCheckpoint
+
+COUNTS = {"inserted": 1, "updated": 0, "unchanged": 0}
+
+def _pages(count, per_page=3):
+    for page in range(1, count + 1):
+        yield page, [{"NCTId": [f"NCT{page:04d}{index:04d}"]} for index in range(per_page)]
+
+@pytest.fixture
+def checkpoint_path(tmp_path):
+    path = str(tmp_path / "ctgov.json")
+    with patch.object(sync_trials.settings, "CLINICALTRIALS_CHECKPOINT_PATH", path):
+        yield path
+
+@patch("chalkbio.scrapers.loader.load_trials")
+@patch("chalkbio.jobs.daily.sync_trials.iter_trial_pages")
+def test_checkpoint_only_covers_committed_pages(mock_iter_pages, mock_load_trials, checkpoint_path):
+    """Batches of 4 over pages of 3: when the second batch fails, only page 1 was fully committed."""
+    mock_iter_pages.return_value = _pages(4)
+    mock_load_trials.side_effect = [{"trials": COUNTS, "investigators": COUNTS}, RuntimeError("deadlock")]
+
+    with pytest.raises(RuntimeError):
+        sync_trials.sync_clinical_trials.run(batch_size=4)
+
+    assert mock_iter_pages.call_args.kwargs["checkpoint_path"] == checkpoint_path
+    assert ScrapeCheckpoint(checkpoint_path).last_completed_page() == 1
+
+@patch("chalkbio.jobs.daily.sync_trials.report_records_processed")
+@patch("chalkbio.scrapers.loader.load_trials")
+@patch("chalkbio.jobs.daily.sync_trials.iter_trial_pages")
+def test_checkpoint_is_kept_by_a_bounded_run_and_cleared_at_the_end(
+    mock_iter_pages, mock_load_trials, mock_report, checkpoint_path
+):
+    mock_load_trials.return_value = {"trials": COUNTS, "investigators": COUNTS}
+
+    mock_iter_pages.return_value = _pages(2)
+    sync_trials.sync_clinical_trials.run(max_pages=2, batch_size=4)
+    assert ScrapeCheckpoint(checkpoint_path).last_completed_page() == 2
+
+    mock_iter_pages.return_value = _pages(1)
+    sync_trials.sync_clinical_trials.run(batch_size=4)
+    assert ScrapeCheckpoint(checkpoint_path).last_completed_page() == 0
@@ -1,4 +1,5 @@
 import pytest
+from datetime import date, timedelta
 from unittest.mock import patch, MagicMock
 from chalkbio.jobs.daily import run_validations
 
@@ -33,4 +34,83 @@ def test_post_to_slack_skipped_if_no_url(mock_post):
         
         run_validations.post_to_slack(job_name="test", error_message="test_error")
 
-        mock_post.assert_not_called()
\ No newline at end of file
+        mock_post.assert_not_called()
+
+@patch('requests.post')
+def test_post_to_slack_slow_run(mock_post):
+    """Runs flagged as slower than their baseline use the warning format."""
+    with patch('chalkbio.jobs.daily.run_validations.settings') as mock_settings:
+        mock_settings.SLACK_WEBHOOK_URL = "https://fake.slack.url/hook"
+
+        run_validations.post_to_slack(job_name="test_job", error_message="Took 90.0s", status="slow")
+
+        text = mock_post.call_args.kwargs['json']['text']
+        assert text == ":warning: Job Slower Than Baseline: *test_job*\n*Details*: Took 90.0s"
+
+
+DAY = date(2026, 3, 15)
+
+def _steady_volumes(event_type, per_day, today):
+    """28 baseline days of `per_day` events plus `today` on the validated day."""
+    rows = [(event_type, DAY - timedelta(days=offset), per_day) for offset in range(1, 29)]
+    return rows + [(event_type, DAY, today)]
+
+def _evaluate(total=1000, blank=0, duplicate_rows=0, volumes=None, versions=None):
+    return run_validations.evaluate_user_events(
+        DAY,
+        {"total": total, "blank_event_types": blank},
+        {"duplicated_request_ids": duplicate_rows, "duplicate_rows": duplicate_rows},
+        volumes if volumes is not None else _steady_volumes("search", 1000, total),
+        versions if versions is not None else [("s1.0", total)],
+    )
+
+def test_evaluate_clean_day_passes():
+    assert _evaluate() == ("PASS", [])
+
+def test_evaluate_empty_day_fails():
+    status, anomalies = _evaluate(total=0, volumes=[])
+    assert status == "FAIL"
+    assert anomalies[0]["check"] == "volume"
+
+def test_evaluate_blank_event_types_and_duplicates():
+    status, anomalies = _evaluate(blank=1, duplicate_rows=50)
+    assert status == "FAIL"
+    by_check = {anomaly["check"]: anomaly for anomaly in anomalies}
+    assert by_check["blank_event_type"]["severity"] == "WARN"
+    assert by_check["duplicate_request_id"]["severity"] == "FAIL"
+    assert by_check["duplicate_request_id"]["rate"] == 0.05
+
+def test_evaluate_volume_drop_against_baseline():
+    status, anomalies = _evaluate(volumes=_steady_volumes("search", 1000, 100))
+    assert status == "FAIL"
+    assert anomalies[0]["check"] == "volume"
+    assert anomalies[0]["event_type"] == "search"
+    assert anomalies[0]["sigma"] < 0
+
+def test_evaluate_new_event_type_and_schema_mix_warn():
+    volumes = _steady_volumes("search", 1000, 1000) + [("serach", DAY, 3)]
+    status, anomalies = _evaluate(volumes=volumes, versions=[("s1.0", 900), ("s2.0", 100)])
+    assert status == "WARN"
+    assert {anomaly["check"] for anomaly in anomalies} == {"unknown_event_type", "schema_version_mix"}
+
+@patch("chalkbio.jobs.daily.run_validations.post_to_slack")
+@patch("chalkbio.jobs.daily.run_validations.SessionLocal")
+def test_run_user_events_validation_logs_result(mock_session_local, mock_post_to_slack):
+    """The task writes one data_quality_logs row for the day and alerts only on FAIL."""
+    db = MagicMock()
+    db.execute.return_value.mappings.return_value.one.side_effect = [
+        {"total": 0, "blank_event_types": 0},
+        {"duplicated_request_ids": 0, "duplicate_rows": 0},
+    ]
+    db.execute.return_value.all.return_value = []
+    mock_session_local.return_value = db
+
+    result = run_validations.run_user_events_validation("2026-03-15")
+
+    assert result == "Validation complete with status: FAIL"
+    statement, params = db.execute.call_args.args
+    assert statement is run_validations.UPSERT_QUALITY_LOG
+    assert params["run_date"] == DAY
+    assert params["status"] == "FAIL"
+    db.commit.assert_called_once()
+    mock_post_to_slack.assert_called_once()
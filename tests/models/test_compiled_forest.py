@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from chalkbio.models.compiled_forest import CompiledForest
+
+def _fit(n_classes=2, with_missing=False, **params):
+    rng = np.random.default_rng(7)
+    X = rng.normal(size=(300, 12))
+    y = np.digitize(X[:, 0] + X[:, 3] * X[:, 5], np.linspace(-1, 1, n_classes - 1))
+    if with_missing:
+        X[rng.random(X.shape) < 0.1] = np.nan
+    model = RandomForestClassifier(n_estimators=25, random_state=0, **params).fit(X, y)
+    test_X = rng.normal(size=(200, 12))
+    if with_missing:
+        test_X[rng.random(test_X.shape) < 0.1] = np.nan
+    return model, test_X
+
+@pytest.mark.parametrize("n_classes, with_missing, params", [
+    (2, False, {"max_depth": 10}),
+    (2, False, {}),  # Unbounded depth: trees end at different levels
+    (3, False, {"max_depth": 6}),
+    (2, True, {"max_depth": 10}),
+])
+def test_matches_sklearn_predict_proba(n_classes, with_missing, params):
+    model, X = _fit(n_classes, with_missing, **params)
+    compiled = CompiledForest.from_sklearn(model)
+
+    np.testing.assert_allclose(compiled.predict_proba(X), model.predict_proba(X), atol=1e-12)
+    np.testing.assert_array_equal(compiled.predict(X), model.predict(X))
+    # Single rows, as the predictions endpoint scores them
+    np.testing.assert_allclose(compiled.predict_proba(X[0]), model.predict_proba(X[:1]), atol=1e-12)
+
+def test_round_trips_through_memory_mapped_files(tmp_path):
+    model, X = _fit()
+    CompiledForest.from_sklearn(model).save(str(tmp_path / "forest"))
+
+    loaded = CompiledForest.load(str(tmp_path / "forest"))
+
+    assert isinstance(loaded.threshold, np.memmap)
+    np.testing.assert_allclose(loaded.predict_proba(X), model.predict_proba(X), atol=1e-12)
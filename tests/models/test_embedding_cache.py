@@ -0,0 +1,40 @@
+import numpy as np
+from chalkbio.models.embedding_cache import EmbeddingCache, embedding_key
+
+def test_embedding_cache_round_trip_across_instances(tmp_path):
+    """Vectors written by one cache instance are visible to a fresh instance on the same directory."""
+    model_id = "test/model"
+    keys = [embedding_key(text, model_id) for text in ["alpha", "beta", "gamma"]]
+
+    writer = EmbeddingCache(model_id=model_id, cache_dir=str(tmp_path))
+    writer.put_many(keys[:2], np.ones((2, 4)))
+    # Re-putting an existing key must not append a duplicate row
+    writer.put_many(keys, np.arange(12).reshape(3, 4))
+
+    reader = EmbeddingCache(model_id=model_id, cache_dir=str(tmp_path))
+    cached = reader.get_many(keys)
+
+    assert len(reader) == 3
+    np.testing.assert_array_equal(cached[keys[0]], np.ones(4, dtype=np.float32))
+    np.testing.assert_array_equal(cached[keys[2]], np.array([8, 9, 10, 11], dtype=np.float32))
+
+def test_embedding_key_depends_on_model_id():
+    """The same text embedded by two different models must not share a cache entry."""
+    assert embedding_key("same text", "model-a") != embedding_key("same text", "model-b")
+
+def test_int8_cache_dequantizes_within_rounding_error(tmp_path):
+    """int8 rows come back as float32 within half a quantization step, in their own directory."""
+    model_id = "test/model"
+    keys = [embedding_key(text, model_id) for text in ["alpha", "beta", "zeros"]]
+    vectors = np.array([[0.5, -1.0, 0.25, 0.0], [100.0, 3.0, -7.5, 42.0], [0.0, 0.0, 0.0, 0.0]], dtype=np.float32)
+
+    EmbeddingCache(model_id=model_id, cache_dir=str(tmp_path), quantize_int8=True).put_many(keys, vectors)
+    reader = EmbeddingCache(model_id=model_id, cache_dir=str(tmp_path), quantize_int8=True)
+    cached = reader.get_many(keys)
+
+    for key, vector in zip(keys, vectors):
+        assert cached[key].dtype == np.float32
+        step = np.abs(vector).max() / 127
+        assert np.abs(cached[key] - vector).max() <= step / 2 + 1e-6
+    # The float32 cache for the same model is a separate store
+    assert EmbeddingCache(model_id=model_id, cache_dir=str(tmp_path)).get_many(keys) == {}
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from chalkbio.models.embedding_reducer import EmbeddingReducer
+from chalkbio.models.feature_encoder import FeatureEncoder
+
+def _embeddings(n=60, dim=32, rank=4):
+    """Embeddings that really live in a low-dimensional subspace, plus a little noise."""
+    rng = np.random.default_rng(3)
+    return (rng.normal(size=(n, rank)) @ rng.normal(size=(rank, dim)) + 0.01 * rng.normal(size=(n, dim))).astype(np.float32)
+
+@pytest.mark.parametrize("method", ["pca", "random_projection"])
+def test_reducer_round_trips_and_reduces_width(tmp_path, method):
+    embeddings = _embeddings()
+    reducer = EmbeddingReducer.fit(embeddings, method, n_components=8)
+    reduced = reducer.transform(embeddings)
+    assert reduced.shape == (60, 8)
+
+    reducer.save(str(tmp_path / "reducer.npz"))
+    loaded = EmbeddingReducer.load(str(tmp_path / "reducer.npz"))
+    np.testing.assert_allclose(loaded.transform(embeddings), reduced)
+    assert loaded.fingerprint() == reducer.fingerprint()
+
+def test_pca_keeps_the_signal_and_caps_components():
+    embeddings = _embeddings()
+    reducer = EmbeddingReducer.fit(embeddings, "pca", n_components=4)
+    reconstructed = reducer.transform(embeddings) @ reducer.components.T + reducer.mean
+    assert np.abs(reconstructed - embeddings).max() < 0.1
+
+    # No more components than training samples
+    assert EmbeddingReducer.fit(embeddings[:5], "pca", n_components=64).n_components == 5
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        EmbeddingReducer.fit(_embeddings(), "umap", n_components=4)
+
+def test_encoder_applies_reducer_to_raw_embeddings():
+    embeddings = _embeddings(n=2)
+    reducer = EmbeddingReducer.fit(_embeddings(), "pca", n_components=3)
+    encoder = FeatureEncoder.from_categories({'phase': ['Phase II']}, embedding_dim=32, embedding_reducer=reducer)
+
+    assert encoder.training_columns[-3:] == ['embed_0', 'embed_1', 'embed_2'] and 'embed_3' not in encoder.training_columns
+    X = encoder.transform([{'phase': 'Phase II', 'sponsor_size': 10}] * 2, embeddings)
+    np.testing.assert_allclose(X[:, -3:], reducer.transform(embeddings), rtol=1e-6)
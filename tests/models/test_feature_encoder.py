@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+from chalkbio.models.feature_encoder import FeatureEncoder
+
+CATEGORIES = {
+    'phase': ['Phase II', 'Phase III'],
+    'indication': ['Dermatology', 'Oncology']
+}
+
+RECORDS = [
+    {'trial_id': 'NCT1', 'phase': 'Phase II', 'indication': 'Oncology', 'sponsor_size': 750,
+     'investigator_success_rate': 0.82, 'mechanism_crowding_score': 40},
+    # Unseen category and missing numeric values
+    {'trial_id': 'NCT2', 'phase': 'Phase III', 'indication': 'Cardiology', 'sponsor_size': None,
+     'investigator_success_rate': None, 'mechanism_crowding_score': 20},
+]
+
+def _pandas_reference(records, embeddings, training_columns):
+    """The original get_dummies/concat/reindex pipeline the encoder replaces."""
+    df = pd.DataFrame(records).fillna(0)
+    for col, cats in CATEGORIES.items():
+        df[col] = pd.Categorical(df[col], categories=cats)
+    structured = pd.get_dummies(
+        df[['phase', 'indication', 'sponsor_size', 'investigator_success_rate', 'mechanism_crowding_score']],
+        columns=['phase', 'indication'],
+        drop_first=False
+    )
+    embeddings_df = pd.DataFrame(embeddings, columns=[f'embed_{i}' for i in range(embeddings.shape[1])])
+    combined = pd.concat([structured, embeddings_df], axis=1)
+    return combined.reindex(columns=training_columns, fill_value=0).to_numpy(dtype=np.float64)
+
+def test_encoder_matches_pandas_pipeline():
+    """The encoder must produce exactly what the pandas pipeline produced, column for column."""
+    embeddings = np.random.default_rng(0).standard_normal((2, 4)).astype(np.float32)
+    encoder = FeatureEncoder.from_categories(CATEGORIES, embedding_dim=4)
+
+    encoded = encoder.transform(RECORDS, embeddings)
+
+    np.testing.assert_array_equal(encoded, _pandas_reference(RECORDS, embeddings, encoder.training_columns))
+
+def test_encoder_reuses_preallocated_buffer():
+    """Passing `out` writes into the caller's buffer instead of allocating a new matrix."""
+    encoder = FeatureEncoder.from_categories(CATEGORIES, embedding_dim=4)
+    buffer = np.full((5, encoder.n_features), 7.0)
+
+    encoded = encoder.transform(RECORDS, np.zeros((2, 4)), out=buffer)
+
+    assert np.shares_memory(encoded, buffer)
+    assert encoded.shape == (2, encoder.n_features)
+    assert encoded[1, encoder.training_columns.index('phase_Phase III')] == 1.0
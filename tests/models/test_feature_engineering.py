@@ -0,0 +1,19 @@
+import pandas as pd
+from chalkbio.models import feature_engineering
+
+def test_get_text_embeddings_only_encodes_unseen_text(fake_embedding_provider):
+    """Descriptions already in the embedding cache must not be sent to the model again."""
+    first = feature_engineering.get_text_embeddings(pd.Series(["trial a", "trial b", "trial a"]))
+    assert fake_embedding_provider.encoded == ["trial a", "trial b"]
+
+    second = feature_engineering.get_text_embeddings(pd.Series(["trial b", "trial c"]))
+    assert fake_embedding_provider.encoded == ["trial a", "trial b", "trial c"]
+
+    assert first.shape == (3, fake_embedding_provider.dim)
+    assert list(first.columns[:2]) == ["embed_0", "embed_1"]
+    pd.testing.assert_series_equal(first.iloc[1], second.iloc[0], check_names=False)
+
+def test_sentence_transformer_provider_is_lazy():
+    """Constructing the provider must not load the model."""
+    provider = feature_engineering.SentenceTransformerProvider(model_name="not/a-real-model")
+    assert provider._model is None
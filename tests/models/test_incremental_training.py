@@ -0,0 +1,99 @@
+import hashlib
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from chalkbio.models import train
+from chalkbio.models.feature_store import TrainingFeatureStore
+from tests.models.test_registry import InMemoryRegistry
+
+def _trial(trial_id, description, outcome, indication="Oncology"):
+    row = {
+        "trial_id": trial_id, "trial_description": description, "phase": "Phase II",
+        "indication": indication, "sponsor_size": 500, "outcome": outcome,
+        "investigator_success_rate": 0.8, "mechanism_crowding_score": 40,
+    }
+    row["row_hash"] = hashlib.md5(repr(sorted(row.items())).encode()).hexdigest()
+    return row
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    registry = InMemoryRegistry(train.MODEL_NAME, root_dir=str(tmp_path / "registry"))
+    monkeypatch.setattr(train, "model_registry", registry)
+    monkeypatch.setattr(train, "FEATURE_STORE_PATH", str(tmp_path / "features.npz"))
+    return registry
+
+def _run(mode, trials):
+    """Runs the pipeline against an in-memory trials table."""
+    frame = pd.DataFrame(trials)
+
+    def read_sql(query, connection, params=None):
+        if query is train.TRAINING_HASHES_QUERY:
+            return frame[["trial_id", "row_hash"]].copy()
+        if params:
+            return frame[frame["trial_id"].isin(params["trial_ids"])].copy()
+        return frame.copy()
+
+    with patch.object(train, "SessionLocal", MagicMock()), patch.object(train.pd, "read_sql", side_effect=read_sql):
+        train.run_training_pipeline(mode=mode)
+
+def _forest_size(registry):
+    return registry.load(registry.active_version())["model"].n_estimators
+
+def test_incremental_run_only_encodes_new_and_changed_trials(registry, fake_embedding_provider):
+    trials = [_trial(f"NCT{i}", f"description {i}", "Success" if i % 2 else "Failure") for i in range(6)]
+    _run("full", trials)
+    assert _forest_size(registry) == train.N_ESTIMATORS
+
+    # One outcome changes, one trial is added and one disappears
+    trials[1] = _trial("NCT1", "description 1", "Failure")
+    trials[5] = _trial("NCT9", "a brand new trial", "Success", indication="Cardiology")
+    fake_embedding_provider.encoded.clear()
+    _run("incremental", trials)
+
+    assert fake_embedding_provider.encoded == ["a brand new trial"]  # description 1 comes from the embedding cache
+    assert _forest_size(registry) == train.N_ESTIMATORS + train.INCREMENTAL_TREES
+    # Warm-started trees have no valid out-of-bag rows, so no AUC is recorded
+    assert registry.metrics[registry.active_version()]["auc"] is None
+    stored = TrainingFeatureStore(train.FEATURE_STORE_PATH).load()
+    assert sorted(stored.trial_ids) == ["NCT0", "NCT1", "NCT2", "NCT3", "NCT4", "NCT9"]
+    assert stored.y[list(stored.trial_ids).index("NCT1")] == 0
+
+    # Nothing changed: no refit and no new version
+    _run("incremental", trials)
+    assert len(registry.versions) == 2
+
+def test_incremental_without_stored_features_falls_back_to_full(registry, fake_embedding_provider):
+    _run("incremental", [_trial(f"NCT{i}", f"d{i}", "Success" if i % 2 else "Failure") for i in range(4)])
+    assert _forest_size(registry) == train.N_ESTIMATORS
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        train.run_training_pipeline(mode="partial")
+
+def test_embedding_reduction_is_published_and_reused(registry, fake_embedding_provider, monkeypatch):
+    monkeypatch.setattr(train.settings, "EMBEDDING_REDUCTION", "pca")
+    monkeypatch.setattr(train.settings, "EMBEDDING_REDUCTION_DIM", 3)
+    trials = [_trial(f"NCT{i}", f"description {i}", "Success" if i % 2 else "Failure") for i in range(6)]
+    _run("full", trials)
+
+    assets = registry.load(registry.active_version())
+    assert assets["embedding_reducer"].n_components == 3
+    assert [c for c in assets["training_columns"] if c.startswith("embed_")] == ["embed_0", "embed_1", "embed_2"]
+
+    # Incremental runs reuse the published reduction rather than refitting it
+    trials.append(_trial("NCT9", "a brand new trial", "Success"))
+    _run("incremental", trials)
+    assert _forest_size(registry) == train.N_ESTIMATORS + train.INCREMENTAL_TREES
+    assert registry.load(registry.active_version())["embedding_reducer"].fingerprint() == assets["embedding_reducer"].fingerprint()
+
+def test_oob_auc_ignores_rows_without_oob_votes():
+    """sklearn scores rows with no out-of-bag votes as all zeros; they must not count."""
+    model = MagicMock(classes_=np.array([0, 1]))
+    model.oob_decision_function_ = np.array([[0.2, 0.8], [0.0, 0.0], [0.9, 0.1], [0.0, 0.0]])
+    y = np.array([1, 1, 0, 0])
+
+    # A perfect ranking on the scored rows; counting the zero rows would pull it down
+    assert train._oob_auc(model, y) == 1.0
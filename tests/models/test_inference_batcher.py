@@ -0,0 +1,104 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from chalkbio.models.inference_batcher import MicroBatcher
+
+class RecordingHandler:
+    def __init__(self, release: threading.Event | None = None):
+        self.batches = []
+        self.release = release
+
+    def __call__(self, keys):
+        if self.release is not None:
+            self.release.wait(5)
+        self.batches.append(list(keys))
+        return {key: f"score:{key}" for key in keys if key != "unknown"}
+
+@pytest.fixture
+def make_batcher():
+    batchers = []
+    def make(handler, max_batch_size=32, max_wait_seconds=0.05):
+        batcher = MicroBatcher(handler, max_batch_size=max_batch_size, max_wait_seconds=max_wait_seconds)
+        batchers.append(batcher)
+        return batcher
+    yield make
+    for batcher in batchers:
+        batcher.stop()
+
+def test_concurrent_requests_are_scored_in_one_batch(make_batcher):
+    handler = RecordingHandler()
+    batcher = make_batcher(handler, max_wait_seconds=0.2)
+    keys = [f"NCT{i}" for i in range(8)] + ["unknown"]
+
+    with ThreadPoolExecutor(max_workers=len(keys)) as pool:
+        results = list(pool.map(lambda key: batcher.submit(key).result(timeout=5), keys))
+
+    assert results == [f"score:NCT{i}" for i in range(8)] + [None]
+    assert len(handler.batches) == 1 and sorted(handler.batches[0]) == sorted(keys)
+
+def test_identical_in_flight_keys_share_one_request(make_batcher):
+    release = threading.Event()
+    handler = RecordingHandler(release)
+    batcher = make_batcher(handler, max_wait_seconds=0)
+
+    first = batcher.submit("NCT1")
+    second = batcher.submit("NCT1")
+    release.set()
+
+    assert first is second
+    assert first.result(timeout=5) == "score:NCT1"
+    assert handler.batches == [["NCT1"]]
+    # Once answered, the key is scored afresh
+    assert batcher.submit("NCT1").result(timeout=5) == "score:NCT1"
+    assert len(handler.batches) == 2
+
+def test_batches_are_capped_at_max_batch_size(make_batcher):
+    release = threading.Event()
+    handler = RecordingHandler(release)
+    batcher = make_batcher(handler, max_batch_size=3, max_wait_seconds=0.05)
+
+    futures = [batcher.submit(f"NCT{i}") for i in range(7)]
+    release.set()
+
+    assert [f.result(timeout=5) for f in futures] == [f"score:NCT{i}" for i in range(7)]
+    assert all(len(batch) <= 3 for batch in handler.batches)
+
+def test_handler_errors_reach_every_waiting_caller(make_batcher):
+    def failing_handler(keys):
+        raise RuntimeError("model not loaded")
+    batcher = make_batcher(failing_handler, max_wait_seconds=0.05)
+
+    futures = [batcher.submit("NCT1"), batcher.submit("NCT2")]
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model not loaded"):
+            future.result(timeout=5)
+
+def test_one_cancelled_waiter_does_not_cancel_the_others(make_batcher):
+    """Two requests share one Future: a timed-out waiter must not cancel it for the other."""
+    import asyncio
+    release = threading.Event()
+    batcher = make_batcher(RecordingHandler(release), max_wait_seconds=0.01)
+
+    async def main():
+        impatient = asyncio.wait_for(asyncio.wrap_future(batcher.submit("X")), 0.05)
+        patient = asyncio.wrap_future(batcher.submit("X"))
+        with pytest.raises(asyncio.TimeoutError):
+            await impatient
+        release.set()
+        return await patient
+
+    assert asyncio.run(main()) == "score:X"
+
+def test_future_cancelled_while_queued_is_skipped(make_batcher):
+    handler = RecordingHandler()
+    batcher = make_batcher(handler, max_wait_seconds=0.2)
+
+    cancelled = batcher.submit("A")
+    kept = batcher.submit("B")
+    assert cancelled.cancel()
+
+    assert kept.result(timeout=5) == "score:B"
+    assert handler.batches == [["B"]]
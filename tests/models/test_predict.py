@@ -0,0 +1,37 @@
+from unittest.mock import MagicMock, patch
+from chalkbio.models import predict
+
+STORED = {
+    "trial_id": "NCT00000001",
+    "drug_id": "DRUG-XYZ",
+    "predicted_probability": 0.71,
+    "confidence_lower": 0.59,
+    "confidence_upper": 0.83,
+    "model_version": predict.MODEL_VERSION,
+    "created_at": "2025-11-17T03:00:00Z"
+}
+
+@patch("chalkbio.models.predict._fetch_trial_features")
+@patch("chalkbio.models.predict._fetch_stored_predictions")
+def test_prediction_served_from_table_skips_live_inference(mock_stored, mock_features):
+    """A precomputed prediction is returned without touching the model or the feature query."""
+    mock_stored.return_value = {"NCT00000001": STORED}
+
+    result = predict.get_prediction_for_trial(db=MagicMock(), trial_id="NCT00000001")
+
+    assert result == STORED
+    mock_features.assert_not_called()
+
+@patch("chalkbio.models.predict._get_loaded_assets")
+@patch("chalkbio.models.predict._fetch_trial_features")
+@patch("chalkbio.models.predict._fetch_stored_predictions")
+def test_batch_only_runs_live_inference_for_misses(mock_stored, mock_features, mock_assets):
+    """Stored hits are served from the table; only the misses are fetched for live scoring."""
+    mock_stored.return_value = {"NCT00000001": STORED}
+    mock_features.return_value = []
+    mock_assets.return_value = (MagicMock(), MagicMock(), predict.MODEL_VERSION)
+
+    results = predict.get_predictions_for_trials(db=MagicMock(), trial_ids=["NCT00000001", "NCT_UNKNOWN"])
+
+    assert results == {"NCT00000001": STORED, "NCT_UNKNOWN": None}
+    assert mock_features.call_args.args[1] == ["NCT_UNKNOWN"]
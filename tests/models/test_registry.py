@@ -0,0 +1,70 @@
+import os
+from unittest.mock import MagicMock
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+from chalkbio.models import predict
+from chalkbio.models.registry import ModelRegistry, ModelWatcher
+
+class InMemoryRegistry(ModelRegistry):
+    """Real artifact handling, with the ml_models bookkeeping kept in memory."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.versions, self.active, self.metrics = [], None, {}
+
+    def new_version(self, base_version):
+        return f"{base_version}-{len(self.versions) + 1}"
+
+    def _record(self, version, metrics, notes, activate):
+        self.versions.append(version)
+        self.metrics[version] = metrics
+        if activate:
+            self.active = version
+
+    def active_version(self):
+        return self.active
+
+def _model(n_features):
+    X = np.random.default_rng(0).random((40, n_features))
+    return RandomForestClassifier(n_estimators=5, random_state=0).fit(X, (X[:, 0] > 0.5).astype(int))
+
+def test_publish_writes_complete_version_directories(tmp_path):
+    registry = InMemoryRegistry("model", root_dir=str(tmp_path))
+    first = registry.publish("v2.0", _model(3), ["a", "b", "c"], {"phase": []})
+    second = registry.publish("v2.0", _model(3), ["a", "b", "c"], {"phase": []})
+
+    assert sorted(os.listdir(tmp_path / "model")) == ["v2.0-1", "v2.0-2"]  # No leftover temp directories
+    assert registry.active_version() == second
+    loaded = registry.load(first)
+    assert loaded["training_columns"] == ["a", "b", "c"]
+    # Tree arrays come back memory-mapped and still predict
+    assert loaded["model"].predict_proba(np.zeros((1, 3))).shape == (1, 2)
+
+def test_watcher_swaps_in_newly_activated_model(tmp_path, monkeypatch):
+    """Activating a version makes the API switch to it; requests holding the old snapshot are unaffected."""
+    registry = InMemoryRegistry(predict.MODEL_NAME, root_dir=str(tmp_path))
+    monkeypatch.setattr(predict, "model_registry", registry)
+    monkeypatch.setattr(predict, "ml_assets", {})
+    columns = ["sponsor_size", "investigator_success_rate", "mechanism_crowding_score"]
+
+    first = registry.publish("v2.0", _model(3), columns, {"phase": [], "indication": []})
+    predict.load_prediction_assets()
+    old_snapshot = predict._get_loaded_assets()
+    assert old_snapshot[2] == first.version
+
+    watcher = ModelWatcher(registry, predict.load_prediction_assets, predict.current_model_version, interval_seconds=60)
+    assert watcher.check() is False  # Nothing new yet
+
+    second = registry.publish("v2.0", _model(3), columns, {"phase": [], "indication": []})
+    assert watcher.check() is True
+    assert predict.current_model_version() == second.version
+    assert old_snapshot[2] == first.version
+
+def test_watcher_keeps_current_model_when_load_fails():
+    registry = MagicMock()
+    registry.active_version.return_value = MagicMock(version="v2.0-broken")
+    on_change = MagicMock(side_effect=OSError("truncated artifact"))
+    watcher = ModelWatcher(registry, on_change, lambda: "v2.0-good", interval_seconds=60)
+
+    assert watcher.check() is False
@@ -1,23 +1,29 @@
 import os
 import pytest
 from chalkbio.models import train
+from chalkbio.models.registry import MODEL_FILE, ModelRegistry
 
 def test_training_pipeline_creates_artifact(tmp_path):
     """
-    Tests if the training pipeline runs and creates a model artifact file.
+    Tests if the training pipeline runs and publishes a model artifact.
     Uses pytest's built-in `tmp_path` fixture to create a temporary directory.
     """
-    # Override the default artifact directory to use the temporary one
-    original_path = train.MODEL_ARTIFACT_DIR
-    train.MODEL_ARTIFACT_DIR = tmp_path
-    train.MODEL_ARTIFACT_PATH = f"{tmp_path}/{train.MODEL_NAME}_{train.MODEL_VERSION}.pkl"
+    # Publish into the temporary directory instead of the real registry
+    original_registry = train.model_registry
+    train.model_registry = ModelRegistry(train.MODEL_NAME, root_dir=str(tmp_path))
+    original_store_path = train.FEATURE_STORE_PATH
+    train.FEATURE_STORE_PATH = f"{tmp_path}/training_features_v2.npz"
 
-    # Run the training pipeline
-    train.run_training_pipeline()
+    try:
+        # Run the training pipeline
+        train.run_training_pipeline()
 
-    # Check if the model file was created
-    assert os.path.exists(train.MODEL_ARTIFACT_PATH)
-    assert os.path.getsize(train.MODEL_ARTIFACT_PATH) > 0
-
-    # Clean up by restoring the original path for other tests
-    train.MODEL_ARTIFACT_DIR = original_path
\ No newline at end of file
+        # Check if the model file was published and activated
+        active = train.model_registry.active_version()
+        model_path = os.path.join(active.artifact_path, MODEL_FILE)
+        assert os.path.exists(model_path)
+        assert os.path.getsize(model_path) > 0
+    finally:
+        # Clean up by restoring the originals for other tests
+        train.model_registry = original_registry
+        train.FEATURE_STORE_PATH = original_store_path
@@ -0,0 +1,101 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from chalkbio.scrapers.clinicaltrials_scraper import (
+    ScrapeCheckpoint, iter_trial_pages, fetch_page, make_session, ScrapeError
+)
+from chalkbio.scrapers.rate_limit import TokenBucket
+
+TOTAL_TRIALS = 2500  # Three pages of 1000: full, full, half
+
+class StubClinicalTrials:
+    """Local stand-in for the study_fields API, with optional injected failures per page."""
+    def __init__(self):
+        self.failures = {}  # page -> list of status codes to return before succeeding
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def handle(self, handler):
+        params = parse_qs(urlparse(handler.path).query)
+        min_rnk, max_rnk = int(params["min_rnk"][0]), int(params["max_rnk"][0])
+        page = (min_rnk - 1) // 1000 + 1
+        with self.lock:
+            self.requests.append(page)
+            pending = self.failures.get(page)
+            status = pending.pop(0) if pending else 200
+
+        if status != 200:
+            handler.send_response(status)
+            handler.send_header("Retry-After", "0")
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+        fields = [{"NCTId": [f"NCT{rank:08d}"]} for rank in range(min_rnk, min(max_rnk, TOTAL_TRIALS) + 1)]
+        body = json.dumps({"StudyFieldsResponse": {"StudyFields": fields}}).encode()
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+@pytest.fixture
+def stub_api():
+    stub = StubClinicalTrials()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            stub.handle(self)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    stub.url = f"http://127.0.0.1:{server.server_address[1]}/api/query/study_fields"
+    yield stub
+    server.shutdown()
+    server.server_close()
+
+def _fast_limiter():
+    return TokenBucket(rate=1000, capacity=1000)
+
+def test_streams_pages_in_order_and_retries_transient_errors(stub_api):
+    """Pages arrive in order despite concurrent fetching, and a 503 is retried rather than ending the scrape."""
+    stub_api.failures[2] = [503, 502]
+
+    pages = list(iter_trial_pages(
+        api_url=stub_api.url, concurrency=3, limiter=_fast_limiter(), backoff_base=0.01
+    ))
+
+    assert [page for page, _ in pages] == [1, 2, 3]
+    assert sum(len(trials) for _, trials in pages) == TOTAL_TRIALS
+    assert stub_api.requests.count(2) == 3
+
+def test_resumes_after_the_checkpointed_page(stub_api, tmp_path):
+    """A scrape resumes after the page saved by its consumer, and never moves the checkpoint itself."""
+    checkpoint = ScrapeCheckpoint(str(tmp_path / "ctgov.json"))
+    checkpoint.save(2)
+
+    resumed = [page for page, _ in iter_trial_pages(
+        api_url=stub_api.url, concurrency=2, limiter=_fast_limiter(), checkpoint_path=checkpoint.path
+    )]
+    assert resumed == [3]
+    assert checkpoint.last_completed_page() == 2
+
+def test_client_errors_are_not_retried(stub_api):
+    stub_api.failures[1] = [404]
+    with make_session(1) as session, pytest.raises(ScrapeError):
+        fetch_page(session, 1, _fast_limiter(), api_url=stub_api.url, backoff_base=0.01)
+    assert stub_api.requests == [1]
+
+def test_token_bucket_limits_burst():
+    limiter = TokenBucket(rate=1, capacity=2)
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
@@ -0,0 +1,68 @@
+from unittest.mock import MagicMock, patch
+from chalkbio.scrapers.loader import CopyStream, normalize_study, load_trials, load_in_batches, investigator_source_key
+
+STUDY = {
+    "NCTId": ["NCT01234567"],
+    "BriefSummary": ["Line one\nwith a\ttab and a \\ backslash"],
+    "Phase": ["Phase 2", "Phase 3"],
+    "OverallStatus": ["Recruiting"],
+    "Condition": ["Oncology"],
+    "OverallOfficialName": ["Jane Smith"],
+    "OverallOfficialAffiliation": [],
+}
+
+def test_normalize_study_maps_registry_values():
+    row = normalize_study(STUDY)
+    assert row["phase"] == "Phase II/Phase III"
+    assert row["status"] == "Active"
+    assert row["institution"] is None
+    assert row["investigator_key"] == investigator_source_key("  jane  SMITH", None)
+    assert normalize_study({"NCTId": []}) is None
+
+def test_copy_stream_escapes_and_streams_in_chunks():
+    """Rows are rendered lazily in COPY text format; NULLs become \\N and specials are escaped."""
+    stream = CopyStream([STUDY, {"NCTId": [""]}, STUDY])
+    chunks = []
+    while True:
+        chunk = stream.read(64)
+        if not chunk:
+            break
+        chunks.append(chunk)
+
+    lines = "".join(chunks).splitlines()
+    assert stream.rows == 2 and len(lines) == 2
+    fields = lines[0].split("\t")
+    assert fields[:2] == ["0", "NCT01234567"]
+    assert fields[2] == "Line one\\nwith a\\ttab and a \\\\ backslash"
+    assert fields[-1] == "\\N"
+    assert lines[1].startswith("1\t")
+
+def test_load_trials_copies_then_merges_and_reports_counts():
+    """One transaction: COPY into staging, merge investigators, then trials."""
+    cursor = MagicMock()
+    cursor.fetchone.side_effect = [(1, 1, 0), (3, 1, 1)]
+    connection = MagicMock()
+    connection.cursor.return_value.__enter__.return_value = cursor
+    bind = MagicMock()
+    bind.raw_connection.return_value = connection
+
+    result = load_trials([STUDY], bind=bind)
+
+    assert result == {
+        "trials": {"inserted": 1, "updated": 1, "unchanged": 1},
+        "investigators": {"inserted": 1, "updated": 0, "unchanged": 0},
+    }
+    assert cursor.copy_expert.call_args[0][0].startswith("COPY staging_trials")
+    connection.commit.assert_called_once()
+    connection.rollback.assert_not_called()
+
+@patch("chalkbio.scrapers.loader.load_trials")
+def test_load_in_batches_reports_each_commit(mock_load_trials):
+    counts = {"inserted": 1, "updated": 0, "unchanged": 0}
+    mock_load_trials.return_value = {"trials": counts, "investigators": counts}
+    committed = []
+
+    totals = load_in_batches([STUDY] * 5, batch_size=2, on_commit=committed.append)
+
+    assert committed == [2, 4, 5]
+    assert totals["trials"]["inserted"] == 3
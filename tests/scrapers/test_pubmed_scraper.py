@@ -0,0 +1,132 @@
+import threading
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import MagicMock
+from urllib.parse import parse_qs
+
+import pytest
+
+from chalkbio.scrapers.http_client import ScrapeError
+from chalkbio.scrapers.pubmed_scraper import (
+    EUTILS_MAX_RECORDS, CollaborationHarvester, harvest_collaborations, name_key, store_collaborations
+)
+from chalkbio.scrapers.rate_limit import TokenBucket
+
+FIXTURES = Path(__file__).parent / "fixtures"
+JANE, JOHN, ANA = (
+    "a1a1a1a1-1111-1111-1111-111111111111",
+    "b2b2b2b2-2222-2222-2222-222222222222",
+    "c3c3c3c3-3333-3333-3333-333333333333",
+)
+
+@pytest.fixture
+def eutils_server():
+    """Replays recorded esearch/efetch responses, paging efetch by retstart/retmax."""
+    esearch = (FIXTURES / "pubmed_esearch.json").read_bytes()
+    articles = ET.parse(FIXTURES / "pubmed_efetch.xml").getroot().findall("PubmedArticle")
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            form = {k: v[0] for k, v in parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode()).items()}
+            calls.append((self.path, form))
+            if self.path.endswith("/esearch.fcgi"):
+                body, content_type = esearch, "application/json"
+            else:
+                start, size = int(form["retstart"]), int(form["retmax"])
+                page = ET.Element("PubmedArticleSet")
+                page.extend(articles[start:start + size])
+                body, content_type = ET.tostring(page, xml_declaration=True, encoding="utf-8"), "text/xml"
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/entrez/eutils", calls
+    server.shutdown()
+    server.server_close()
+
+def test_name_key_strips_titles_and_degrees():
+    assert name_key("Dr. Jane Smith, MD") == ("smith", "j")
+    assert name_key("Prof John Doe") == ("doe", "j")
+    assert name_key("Madonna") is None
+
+def test_harvest_uses_history_server_and_dedupes_across_batches(eutils_server):
+    """Each batch runs one esearch then pages efetch by WebEnv; a link found by two batches is yielded once."""
+    base_url, calls = eutils_server
+    harvester = CollaborationHarvester(
+        base_url=base_url, limiter=TokenBucket(rate=1000, capacity=1000),
+        authors_per_search=2, page_size=2, concurrency=2
+    )
+
+    links = set(harvester.harvest([(JANE, "Dr. Jane Smith"), (JOHN, "Dr. John Doe"), (ANA, "Ana Lopez")]))
+
+    assert links == {(111, JANE, JOHN), (222, JANE, JOHN), (222, JANE, ANA), (222, JOHN, ANA)}
+    searches = [form for path, form in calls if path.endswith("/esearch.fcgi")]
+    fetches = [form for path, form in calls if path.endswith("/efetch.fcgi")]
+    assert len(searches) == 2 and all(form["usehistory"] == "y" for form in searches)
+    assert sorted(int(form["retstart"]) for form in fetches) == [0, 0, 2, 2]
+    assert all(form["WebEnv"] == "MCID_fixture_webenv" for form in fetches)
+
+def test_store_collaborations_upserts_in_chunks():
+    db = MagicMock()
+    db.execute.return_value.one.side_effect = [(2, 1), (1, 1)]
+
+    totals = store_collaborations(db, [(111, JANE, JOHN), (222, JANE, JOHN), (222, JANE, ANA)], chunk_size=2)
+
+    assert totals == {"new_links": 3, "pairs_updated": 2}
+    first_params = db.execute.call_args_list[0][0][1]
+    assert first_params == {"pmids": [111, 222], "a_ids": [JANE, JANE], "b_ids": [JOHN, JOHN]}
+
+class SplittingHarvester(CollaborationHarvester):
+    """Answers esearch from a per-author article count spread evenly over 2001-2020, and records every efetch."""
+    def __init__(self, articles_per_author, **kwargs):
+        super().__init__(limiter=TokenBucket(rate=1000, capacity=1000), **kwargs)
+        self.articles_per_author = articles_per_author
+        self.fetches = []
+
+    def _search(self, author_keys, years=None):
+        first, last = years or (2001, 2020)
+        share = (min(last, 2020) - max(first, 2001) + 1) / 20
+        count = int(sum(self.articles_per_author[key] for key in author_keys) * max(share, 0))
+        return count, f"webenv-{'+'.join(last for last, _ in author_keys)}-{years}", "1"
+
+    def _fetch_page(self, webenv, query_key, retstart):
+        self.fetches.append((webenv, retstart))
+        return iter(())
+
+def test_searches_past_the_eutils_record_limit_are_split():
+    """Over 10k matches: a batch splits by investigator, and a lone prolific investigator by publication year."""
+    keys = [("smith", "j"), ("doe", "j"), ("lopez", "a"), ("kim", "s")]
+    harvester = SplittingHarvester({key: 6000 for key in keys[:3]} | {keys[3]: 30000}, authors_per_search=4)
+
+    list(harvester.harvest([(str(i), f"{first} {last}") for i, (last, first) in enumerate(keys)]))
+
+    assert all(retstart < EUTILS_MAX_RECORDS for _, retstart in harvester.fetches)
+    webenvs = {webenv for webenv, _ in harvester.fetches}
+    assert {"webenv-doe-None", "webenv-lopez-None", "webenv-smith-None"} <= webenvs
+    kim_searches = {webenv for webenv in webenvs if webenv.startswith("webenv-kim-")}
+    assert len(kim_searches) > 1 and "webenv-kim-None" not in kim_searches
+
+def test_harvest_collaborations_keeps_batches_around_a_failed_one():
+    harvester = MagicMock()
+    harvester.harvest_batches.return_value = iter([
+        ([(111, JANE, JOHN)], None), ([], ScrapeError("efetch timed out")), ([(222, JANE, ANA)], None),
+    ])
+    db = MagicMock()
+    db.execute.return_value.__iter__.return_value = iter([(JANE, "Jane Smith")])
+    db.execute.return_value.one.return_value = (1, 1)
+
+    totals = harvest_collaborations(db, harvester)
+
+    assert totals == {"new_links": 2, "pairs_updated": 2, "failed_batches": 1}
+    assert db.commit.call_count == 2